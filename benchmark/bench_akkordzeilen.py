@@ -0,0 +1,86 @@
+# bench_akkordzeilen.py
+# Misst die Erkennung von Akkordzeilen (ist_akkordzeile) für bösartige und sehr lange Zeilen, die erst am Ende scheitern,
+# z.B. viele "|: A :|" und dann ein Wort. Die Zeit je Zeichen muss dabei gleich bleiben, egal wie lang die Zeile ist.
+# Zum Vergleich wird akkord_zeilen_regex mit re gemessen, aber nur, solange ein Aufruf unter --regex-limit bleibt:
+# Dort wächst die Zeit mit jeder Wiederholung um ein Vielfaches.
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_akkordzeilen [--laengen 10 100 1000 10000] [--regex-limit 0.2]
+#                                   [--regex-bis 40]
+import argparse
+import re
+import time
+
+from lib.Heuristik import Heuristik
+
+# Name -> (Baustein, Ende): Die Zeile ist Baustein * n + Ende. Ohne Ende ist es eine echte Akkordzeile.
+MUSTER = {
+    "wiederholung": ("|: A :| ", "x"),
+    "ohne Leerzeichen": ("A", "!"),
+    "Ab / A b": ("Ab", "z"),
+    "Akkorde": ("A7 ", "x"),
+    "Striche": ("|:", "x"),
+    "Bass": ("(a/C) ", "%"),
+    "gültig": ("a/C G7 |: ", ""),
+}
+
+
+def messen(funktion, zeile, mindestens=0.05):
+    # Zeit je Aufruf in s, so oft wiederholt, dass insgesamt mindestens `mindestens` Sekunden gemessen werden
+    anzahl = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(anzahl):
+            funktion(zeile)
+        dauer = time.perf_counter() - start
+        if dauer >= mindestens or dauer > 0 and anzahl * mindestens / dauer > 1e7:
+            return dauer / anzahl
+        anzahl *= 10
+
+
+def automat(zeile):
+    # ohne zwischengespeicherte Wörter, gemessen wird der ungünstigste Fall
+    Heuristik._akkordwort_cache.clear()
+    return Heuristik.ist_akkordzeile(zeile)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst die Erkennung von Akkordzeilen für bösartige und lange Zeilen.")
+    parser.add_argument('--laengen', type=int, nargs='+', default=[10, 100, 1000, 10000], metavar='N',
+                        help="Anzahl der Wiederholungen des Bausteins je Zeile (Standard: 10 100 1000 10000)")
+    parser.add_argument('--regex-limit', type=float, default=0.2, metavar='SEK',
+                        help="re nur messen, solange ein Aufruf kürzer ist (Standard: 0.2)")
+    parser.add_argument('--regex-bis', type=int, default=40, metavar='N',
+                        help="re höchstens bis zu N Wiederholungen messen (Standard: 40)")
+    args = parser.parse_args(argv)
+    regex = re.compile(Heuristik.akkord_zeilen_regex)
+
+    print("ist_akkordzeile, ohne Zwischenspeicher (µs je Zeile / ns je Zeichen):")
+    print("{:<18}".format("Muster") + "".join("{:>22}".format("n = {}".format(n)) for n in args.laengen))
+    for name, (baustein, ende) in MUSTER.items():
+        zeile = [name.ljust(18)]
+        for n in args.laengen:
+            text = baustein * n + ende
+            assert automat(text) == (not ende)
+            dauer = messen(automat, text)
+            zeile.append("{:>12.1f} / {:>7.1f}".format(dauer * 1e6, dauer / len(text) * 1e9))
+        print("".join(zeile))
+
+    print()
+    print("re mit akkord_zeilen_regex, bis ein Aufruf länger als {} s dauert (höchstens n = {}):".format(
+        args.regex_limit, args.regex_bis))
+    print("{:<18} {:>8} {:>8} {:>14} {:>10}".format("Muster", "n", "Zeichen", "Dauer [ms]", "Faktor"))
+    for name, (baustein, ende) in MUSTER.items():
+        n, vorher, dauer = 0, None, 0.0
+        while dauer < args.regex_limit and n < args.regex_bis:
+            n += 1
+            text = baustein * n + ende
+            start = time.perf_counter()
+            erg = regex.fullmatch(text) is not None
+            dauer = time.perf_counter() - start
+            assert erg == automat(text)
+            faktor = "" if vorher is None or vorher == 0 else "{:.1f}".format(dauer / vorher)
+            vorher = dauer
+        print("{:<18} {:>8} {:>8} {:>14.3f} {:>10}".format(name, n, len(text), dauer * 1000, faktor))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# bench_bloecke.py
+# Misst makelatexdata (Akkord- und Textzeilen zusammensetzen, Label finden und entfernen) für Lieder mit vielen Akkorden.
+# Die Zeilentypen werden vorher einmal bestimmt, gemessen wird nur das Aufbereiten der Blöcke.
+# Mit --akkorde SCHEMA werden die Akkorde dabei zusätzlich umgeschrieben (und mit --transponieren N transponiert).
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_bloecke [--lieder N] [--akkordquote 1.0] [--akkorde SCHEMA] ...
+import argparse
+import contextlib
+import io
+import random
+import sys
+import time
+
+from benchmark import korpus
+from lib.Heuristik.Grammatik import Grammatik
+from lib.akkorde.akkorde import SCHEMATA, Umschreiber
+from song_converter import laTexttype
+
+
+def bloecke_aufbereiten(lieder, umschreiben=None):
+    # Blöcke für jede Messung neu teilen, makelatexdata soll nicht auf schon aufbereiteten Blöcken laufen
+    for texttyp in lieder:
+        for block in texttyp.split('Leer')[1:]:
+            block.makelatexdata(umschreiben)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst makelatexdata für Lieder mit vielen Akkorden.")
+    korpus.add_arguments(parser)
+    parser.set_defaults(akkordquote=1.0, zeilen=8)
+    parser.add_argument('--wiederholungen', type=int, default=10,
+                        help="Anzahl der Messungen, die beste zählt (Standard: 10)")
+    parser.add_argument('--akkorde', choices=sorted(SCHEMATA), help="Akkorde in diesem Schema schreiben")
+    parser.add_argument('--transponieren', type=int, default=0, metavar='N', help="um N Halbtöne transponieren")
+    args = parser.parse_args(argv)
+    umschreiben = None
+    if args.akkorde is not None or args.transponieren:
+        umschreiben = Umschreiber(args.akkorde, args.transponieren)
+
+    rnd = random.Random(args.seed)
+    lieder = []
+    zeilen = 0
+    bloecke = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for nr in range(args.lieder):
+            typen = Grammatik(korpus.lied(rnd, nr, **korpus.lied_optionen(args)).split('\n'))
+            texttyp = laTexttype(typen, gew_typ=[frame[1] for frame in typen])
+            lieder.append(texttyp)
+            zeilen += len(texttyp)
+            bloecke += len(texttyp.split('Leer')) - 1
+    beste = float('inf')
+    for _ in range(args.wiederholungen):
+        start = time.perf_counter()
+        bloecke_aufbereiten(lieder, umschreiben)
+        beste = min(beste, time.perf_counter() - start)
+    print("{} Lieder, {} Blöcke, {} Zeilen, Akkordquote {}".format(args.lieder, bloecke, zeilen, args.akkordquote))
+    print("{:.4f} s, {:.1f} µs/Block, {:.0f} Zeilen/s".format(beste, beste / bloecke * 1e6, zeilen / beste))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,68 @@
+# bench_grammatik.py
+# Vergleicht die Laufzeit der Zeilenklassifikation für sehr lange Lieder:
+#   rescan:    wie früher: für jede Zeile wird die Menge der Typen aller vorherigen Zeilen gebildet (O(n²))
+#   greedy:    Heuristik() mit mitgeführtem Kontext und anschließender Typwahl je Zeile (O(n))
+#   viterbi:   Grammatik(), wahrscheinlichster Pfad durch das Übergangsmodell (O(n·k²))
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_grammatik [Zeilenzahlen...]
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+from lib.Heuristik.Heuristik import Heuristik, Line_Heuristik, Zeilenmerkmale
+from lib.Heuristik.Grammatik import Grammatik
+
+_beispiel = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Beispiele", "Skelett.txt")
+
+
+def synthetisches_lied(zeilen: int):
+    """Lied mit dem Kopf aus Beispiele/Skelett.txt, die Strophen werden wiederholt, bis es zeilen Zeilen hat"""
+    with open(_beispiel, encoding='utf-8') as file:
+        vorlage = file.read().split('\n')
+    kopf, rumpf = vorlage[:18], vorlage[18:]
+    lied = list(kopf)
+    while len(lied) < zeilen:
+        lied.extend(rumpf)
+    return lied[:zeilen]
+
+
+def rescan(zeilen):
+    erg = []
+    for nr, zeile in enumerate(zeilen):
+        # so wurde früher in p_Ueberschrift (zweimal je Zeile) geprüft, ob das Lied begonnen hat
+        for _ in range(2):
+            begonnen = 0 != len(set(erg[i][1] for i in range(len(erg))).difference({"Überschrift", None}))
+        erg.append(Line_Heuristik(Zeilenmerkmale(zeile), nr, prev=erg, begonnen=begonnen))
+    return erg
+
+
+def greedy(zeilen):
+    return [t[1] if t[1] is not None else (t[2] or "Leer") for t in Heuristik(zeilen)]
+
+
+def messen(funktion, zeilen, wiederholungen=1):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(wiederholungen):
+            funktion(zeilen)
+    return (time.perf_counter() - start) / wiederholungen
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vergleicht die Laufzeit der Zeilenklassifikation für sehr lange Lieder.")
+    parser.add_argument('groessen', type=int, nargs='*', default=[100, 1000, 10000], metavar='ZEILEN',
+                        help="Anzahl der Zeilen je Lied (Standard: 100 1000 10000)")
+    groessen = parser.parse_args(argv).groessen
+    print("{:>8} {:>12} {:>12} {:>12} {:>14}".format("Zeilen", "rescan [s]", "greedy [s]", "viterbi [s]", "viterbi µs/Z."))
+    for n in groessen:
+        lied = synthetisches_lied(n)
+        t_rescan = messen(rescan, lied)
+        t_greedy = messen(greedy, lied)
+        t_viterbi = messen(Grammatik, lied)
+        print("{:>8} {:>12.4f} {:>12.4f} {:>12.4f} {:>14.1f}".format(n, t_rescan, t_greedy, t_viterbi, t_viterbi / n * 1e6))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
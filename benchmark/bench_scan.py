@@ -0,0 +1,75 @@
+# bench_scan.py
+# Misst das Lesen des Eingabeverzeichnisses und die Prüfung der Ausgabedateien vor dem Umwandeln,
+# für ein Verzeichnis mit sehr vielen (leeren) Liedern. Die Hälfte der Ausgabedateien existiert schon.
+#   bisher:  Menge aller DirEntry, os.access je Datei, sortieren, dann os.path.exists/isfile und os.access je Ausgabe
+#   scannen: lib.scan.scannen (ein stat je Datei, sortiert) und lib.scan.Ausgaben (jedes Ausgabeverzeichnis einmal lesen)
+# Mit --verzeichnisse K liegen die Lieder in K Unterverzeichnissen, gelesen wird dann rekursiv (converter.py --rekursiv).
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_scan [--dateien 100000] [--verzeichnisse 0] [--runden 3]
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from converter import fileIsWriteable, get_outfilename, insuffixes, outsuffix
+from lib.scan.scan import Ausgaben, scannen
+
+
+def anlegen(eingabe, ausgabe, dateien, verzeichnisse):
+    # dateien leere Lieder, verteilt auf verzeichnisse Unterverzeichnisse (0: alle direkt in eingabe)
+    for nr in range(dateien):
+        unter = "kapitel-{:03d}".format(nr % verzeichnisse) if verzeichnisse else ""
+        os.makedirs(os.path.join(eingabe, unter), exist_ok=True)
+        os.makedirs(os.path.join(ausgabe, unter), exist_ok=True)
+        open(os.path.join(eingabe, unter, "lied-{:06d}.txt".format(nr)), 'w').close()
+        if nr % 2:
+            open(os.path.join(ausgabe, unter, "lied-{:06d}.tex".format(nr)), 'w').close()
+
+
+def bisher(eingabe, ausgabe):
+    # wie getInfiles und die Schleife in converter.main vor lib.scan (nur flach)
+    with os.scandir(eingabe) as listing:
+        inhalt = set(listing)
+    infiles = sorted((entry for entry in inhalt if entry.is_file() and os.access(entry, os.R_OK)), key=lambda e: e.name)
+    return sum(fileIsWriteable(os.path.join(ausgabe, get_outfilename(infile.name, outsuffix, insuffixes)))
+               for infile in infiles)
+
+
+def neu(eingabe, ausgabe, rekursiv):
+    ausgaben = Ausgaben()
+    return sum(ausgaben.schreibbar(os.path.join(ausgabe, get_outfilename(infile.name, outsuffix, insuffixes)))
+               for infile in scannen(eingabe, rekursiv))
+
+
+def messen(funktion, runden, *args):
+    zeiten = []
+    for _ in range(runden):
+        start = time.perf_counter()
+        ergebnis = funktion(*args)
+        zeiten.append(time.perf_counter() - start)
+    return min(zeiten), ergebnis
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst das Lesen der Eingabe- und Ausgabeverzeichnisse.")
+    parser.add_argument('--dateien', type=int, default=100000, help="Anzahl der Lieder (Standard: 100000)")
+    parser.add_argument('--verzeichnisse', type=int, default=0, metavar='K',
+                        help="Lieder auf K Unterverzeichnisse verteilen und rekursiv lesen (Standard: 0, alle in einem)")
+    parser.add_argument('--runden', type=int, default=3, help="so oft messen, die schnellste Runde zählt (Standard: 3)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        eingabe, ausgabe = os.path.join(tmp, "ein"), os.path.join(tmp, "aus")
+        anlegen(eingabe, ausgabe, args.dateien, args.verzeichnisse)
+        print("{} Lieder in {} Verzeichnissen, {} Ausgaben vorhanden".format(
+            args.dateien, max(args.verzeichnisse, 1), args.dateien // 2))
+        print("{:>10} {:>10} {:>14}".format("", "Dauer [s]", "schreibbar"))
+        if not args.verzeichnisse:
+            dauer, schreibbar = messen(bisher, args.runden, eingabe, ausgabe)
+            print("{:>10} {:>10.3f} {:>14}".format("bisher", dauer, schreibbar))
+        dauer, schreibbar = messen(neu, args.runden, eingabe, ausgabe, args.verzeichnisse > 0)
+        print("{:>10} {:>10.3f} {:>14}".format("scannen", dauer, schreibbar))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,73 @@
+# bench_start.py
+# Misst, wie lange ein Aufruf von converter.py für ein einzelnes Lied insgesamt dauert (Start des Interpreters,
+# Importe, Template laden, Umwandeln). Wichtig für viele kurze Aufrufe, z.B. aus dem Editor oder in CI.
+#   python:          nur der Interpreter (python -c pass), Untergrenze für alle anderen
+#   --help:          Importe ohne Umwandlung
+#   unverändert:     das Lied ist laut Manifest aktuell, es wird nichts umgewandelt
+#   ohne Cache:      Umwandlung, das Template wird jedes Mal übersetzt (Standard)
+#   Cache kalt:      Umwandlung mit --template-cache und leerem Template-Cache
+#   Cache warm:      Umwandlung mit --template-cache, das übersetzte Template liegt schon im Cache
+# Für das mitgelieferte, kleine Template ist "Cache warm" kaum schneller als "ohne Cache", deshalb ist der
+# Template-Cache nicht der Standard.
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_start [--wiederholungen N]
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+_hauptverzeichnis = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_beispiel = os.path.join(_hauptverzeichnis, "Beispiele", "Skelett.txt")
+
+
+def aufruf(argumente, env):
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + argumente, cwd=_hauptverzeichnis, env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst die Startzeit von converter.py für ein einzelnes Lied.")
+    parser.add_argument('--wiederholungen', type=int, default=10, help="Aufrufe je Messung (Standard: 10)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        indir = os.path.join(tmp, "in")
+        outdir = os.path.join(tmp, "out")
+        cache = os.path.join(tmp, "cache")
+        os.mkdir(indir)
+        os.mkdir(outdir)
+        shutil.copy(_beispiel, indir)
+        umwandeln = ["converter.py", "-o", "--force", indir, outdir]
+        mit_cache = ["converter.py", "-o", "--force", "--template-cache", indir, outdir]
+
+        def env(cache_verzeichnis):
+            erg = dict(os.environ)
+            erg["SONGBOOK_CACHE"] = cache_verzeichnis
+            return erg
+
+        def kalt():
+            shutil.rmtree(cache, ignore_errors=True)
+            return aufruf(mit_cache, env(cache))
+
+        messungen = [
+            ("python", lambda: aufruf(["-c", "pass"], env(cache))),
+            ("--help", lambda: aufruf(["converter.py", "--help"], env(cache))),
+            ("unverändert", lambda: aufruf(["converter.py", "-o", indir, outdir], env(cache))),
+            ("ohne Cache", lambda: aufruf(umwandeln, env(cache))),
+            ("Cache kalt", kalt),
+            ("Cache warm", lambda: aufruf(mit_cache, env(cache))),
+        ]
+        aufruf(mit_cache, env(cache))  # Manifest und Cache anlegen
+        print("{:<14} {:>10} {:>10}".format("", "min [ms]", "Median [ms]"))
+        for name, messen in messungen:
+            zeiten = [messen() for _ in range(args.wiederholungen)]
+            print("{:<14} {:>10.1f} {:>10.1f}".format(name, min(zeiten) * 1000, statistics.median(zeiten) * 1000))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,134 @@
+# bench_stufen.py
+# Misst die Laufzeit der einzelnen Stufen der Umwandlung für einen synthetischen Korpus (siehe korpus.py):
+#   lesen:         Datei lesen (readfile)
+#   heuristik:     Bewertung aller Zeilen (Heuristik). Nur zum Vergleich, convert verwendet Grammatik.
+#   grammatik:     Wahl der Zeilentypen (Grammatik, enthält die Bewertung der Zeilen)
+#   split:         laTexttype erzeugen und an Leerzeilen teilen
+#   metadaten:     Titel und Metadaten aus dem ersten Block lesen
+#   makelatexdata: Blöcke für latex aufbereiten (inkl. squashChords)
+#   render:        Template füllen
+#   schreiben:     Ausgabedatei schreiben (writefile)
+# Aufruf aus dem Hauptverzeichnis:
+#   python3 -m benchmark.bench_stufen [--lieder N ...] [--json ergebnis.json] [--vergleich alt.json]
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+
+from benchmark import korpus
+from converter import readfile, writefile, template_file
+from lib.Heuristik.Heuristik import Heuristik
+from lib.Heuristik.Grammatik import Grammatik
+from song_converter import SongConverter, laTexttype, VERSION
+
+stufen = ("lesen", "heuristik", "grammatik", "split", "metadaten", "makelatexdata", "render", "schreiben")
+# Stufen, die nicht zur eigentlichen Umwandlung gehören und nicht in die Gesamtzeit eingehen
+nur_vergleich = {"heuristik"}
+
+
+def gesamtzeit(zeiten):
+    return sum(dauer for stufe, dauer in zeiten.items() if stufe not in nur_vergleich)
+
+
+def messen(pfade, outdir):
+    """Wandelt alle Dateien in pfade um und misst die Zeit jeder Stufe.
+    Gibt (Zeiten je Stufe in Sekunden, Anzahl der Zeilen) zurück."""
+    converter = SongConverter(template_path=template_file)
+    zeiten = OrderedDict((stufe, 0.0) for stufe in stufen)
+    zeilen_gesamt = 0
+    uhr = time.perf_counter
+    for pfad in pfade:
+        t0 = uhr()
+        text = readfile(pfad)
+        t1 = uhr()
+        zeilen = text.split('\n')
+        zeilen_gesamt += len(zeilen)
+        Heuristik(zeilen)
+        t2 = uhr()
+        typen = Grammatik(zeilen)
+        t3 = uhr()
+        bloecke = laTexttype(typen, gew_typ=[frame[1] for frame in typen]).split('Leer')
+        t4 = uhr()
+        metadaten = SongConverter.meta_aus_titel(bloecke[0])
+        titel = metadaten.pop("title")
+        t5 = uhr()
+        inhalt = bloecke[1:]
+        for block in inhalt:
+            block.makelatexdata()
+        t6 = uhr()
+        latex = converter.fill_template(titel, metadaten, inhalt)
+        t7 = uhr()
+        writefile(os.path.join(outdir, os.path.basename(pfad) + ".tex"), latex)
+        t8 = uhr()
+        for stufe, dauer in zip(stufen, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t6 - t5, t7 - t6, t8 - t7)):
+            zeiten[stufe] += dauer
+    return zeiten, zeilen_gesamt
+
+
+def bericht(ergebnis, vergleich=None):
+    """Gibt eine Tabelle der Stufen aus, mit vergleich (älteres Ergebnis) auch das Verhältnis der Zeiten."""
+    zeiten = ergebnis["stufen"]
+    gesamt = gesamtzeit(zeiten)
+    kopf = "{:<14} {:>10} {:>7}".format("Stufe", "Zeit [s]", "Anteil")
+    if vergleich:
+        kopf += " {:>10} {:>8}".format("vorher [s]", "Faktor")
+    print(kopf)
+    for stufe, dauer in zeiten.items():
+        if stufe in nur_vergleich:
+            zeile = "{:<14} {:>10.4f} {:>7}".format("(" + stufe + ")", dauer, "")
+        else:
+            zeile = "{:<14} {:>10.4f} {:>6.1f}%".format(stufe, dauer, 100 * dauer / gesamt if gesamt else 0)
+        if vergleich:
+            alt = vergleich["stufen"].get(stufe)
+            if alt:
+                zeile += " {:>10.4f} {:>7.2f}x".format(alt, alt / dauer if dauer else float('inf'))
+        print(zeile)
+    print("{:<14} {:>10.4f}".format("gesamt", gesamt))
+    print("{:.1f} Lieder/s, {:.0f} Zeilen/s".format(ergebnis["lieder_pro_s"], ergebnis["zeilen_pro_s"]))
+    if vergleich:
+        print("vorher: {:.1f} Lieder/s, {:.0f} Zeilen/s".format(vergleich["lieder_pro_s"], vergleich["zeilen_pro_s"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst die Laufzeit der Stufen der Umwandlung.")
+    korpus.add_arguments(parser)
+    parser.add_argument('--wiederholungen', type=int, default=3,
+                        help="Anzahl der Messungen, die beste zählt (Standard: 3)")
+    parser.add_argument('--json', metavar='DATEI', help="Ergebnis als JSON speichern")
+    parser.add_argument('--vergleich', metavar='DATEI', help="mit einem früher gespeicherten Ergebnis vergleichen")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as indir, tempfile.TemporaryDirectory() as outdir:
+        pfade = korpus.schreiben(indir, args.lieder, args.seed, **korpus.lied_optionen(args))
+        beste = None
+        for _ in range(args.wiederholungen):
+            zeiten, zeilen = messen(pfade, outdir)
+            if beste is None or gesamtzeit(zeiten) < gesamtzeit(beste):
+                beste = zeiten
+    gesamt = gesamtzeit(beste)
+    ergebnis = OrderedDict(
+        version=VERSION,
+        python=platform.python_version(),
+        korpus=OrderedDict(lieder=args.lieder, strophen=args.strophen, zeilen=args.zeilen,
+                           akkordquote=args.akkordquote, seed=args.seed, zeilen_gesamt=zeilen),
+        stufen=beste,
+        gesamt=gesamt,
+        lieder_pro_s=args.lieder / gesamt,
+        zeilen_pro_s=zeilen / gesamt,
+    )
+    vergleich = None
+    if args.vergleich:
+        with open(args.vergleich) as file:
+            vergleich = json.load(file)
+    bericht(ergebnis, vergleich)
+    if args.json:
+        with open(args.json, 'w') as file:
+            json.dump(ergebnis, file, indent=2)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
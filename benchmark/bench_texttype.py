@@ -0,0 +1,61 @@
+# bench_texttype.py
+# Misst für sehr lange Lieder, wie teuer laTexttype ist:
+#   bauen:     laTexttype aus der Ausgabe der Grammatik erzeugen
+#   split:     an Leerzeilen teilen (gewählter typ)
+#   split 0:   an Leerzeilen teilen (erster vorgeschlagener typ)
+#   Speicher:  Bytes je Zeile für das objekt und alle Blöcke (tracemalloc, ohne die Zeilen selbst)
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_texttype [Zeilenzahlen...]
+import argparse
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from benchmark.bench_grammatik import synthetisches_lied
+from lib.Heuristik.Grammatik import Grammatik
+from song_converter import laTexttype
+
+
+def bauen(typen):
+    return laTexttype(typen, gew_typ=[frame[1] for frame in typen])
+
+
+def messen(funktion, *args, wiederholungen=5):
+    beste = float('inf')
+    for _ in range(wiederholungen):
+        start = time.perf_counter()
+        funktion(*args)
+        beste = min(beste, time.perf_counter() - start)
+    return beste
+
+
+def speicher(typen):
+    tracemalloc.start()
+    texttyp = bauen(typen)
+    bloecke = texttyp.split('Leer')
+    groesse, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del texttyp, bloecke
+    return groesse
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Misst Aufbauen, Teilen und Speicherbedarf von laTexttype für lange Lieder.")
+    parser.add_argument('groessen', type=int, nargs='*', default=[1000, 10000, 100000], metavar='ZEILEN',
+                        help="Anzahl der Zeilen je Lied (Standard: 1000 10000 100000)")
+    groessen = parser.parse_args(argv).groessen
+    print("{:>8} {:>11} {:>11} {:>11} {:>13}".format("Zeilen", "bauen [ms]", "split [ms]", "split 0 [ms]", "Speicher B/Z."))
+    for n in groessen:
+        with contextlib.redirect_stdout(io.StringIO()):
+            typen = Grammatik(synthetisches_lied(n))
+        texttyp = bauen(typen)
+        t_bauen = messen(bauen, typen)
+        t_split = messen(texttyp.split, 'Leer')
+        t_split0 = messen(texttyp.split, 'Leer', 0)
+        print("{:>8} {:>11.3f} {:>11.3f} {:>11.3f} {:>13.1f}".format(
+            n, t_bauen * 1000, t_split * 1000, t_split0 * 1000, speicher(typen) / n))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
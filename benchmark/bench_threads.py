@@ -0,0 +1,75 @@
+# bench_threads.py
+# Belastungstest für SongConverter.umwandeln mit mehreren Threads, die sich einen SongConverter teilen (wie server.py --threads).
+# Jedes Lied wird in jeder Runde von irgendeinem Thread umgewandelt. Latex und Hinweise müssen genau dieselben sein wie
+# bei der Umwandlung nacheinander, und auf stdout/stderr darf dabei nichts erscheinen.
+# Ein Teil der Lieder hat absichtlich Fehler im Kopf (unbekannter Schlüssel, fehlende Klammer), damit es Hinweise gibt.
+# Gemessen wird der Durchsatz je Anzahl Threads. Schneller mit mehr Threads wird es nur mit Python ohne GIL (free-threaded),
+# mit GIL zeigt der Test nur, dass nichts durcheinander kommt.
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.bench_threads [--lieder N] [--threads 1 2 4 8] [--runden 3]
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmark import korpus
+from converter import template_file
+from song_converter import SongConverter
+
+
+def fehlerhaft(lied, rnd):
+    # baut einen Fehler in den Kopf des Liedes ein, der einen Hinweis ergibt
+    zeilen = lied.split('\n')
+    if rnd.random() < 0.5:
+        zeilen.insert(1, "tonart: C-Dur")
+    else:
+        zeilen[0] = zeilen[0].replace(']', '') if ']' in zeilen[0] else zeilen[0] + " [Alternativtitel"
+    return '\n'.join(zeilen)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Belastungstest für SongConverter.umwandeln mit mehreren Threads.")
+    korpus.add_arguments(parser)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8], metavar='N',
+                        help="Anzahl der Threads, die gleichzeitig umwandeln (Standard: 1 2 4 8)")
+    parser.add_argument('--runden', type=int, default=3, help="jedes Lied so oft umwandeln (Standard: 3)")
+    parser.add_argument('--fehlerquote', type=float, default=0.2,
+                        help="Anteil der Lieder mit Fehlern im Kopf (Standard: 0.2)")
+    args = parser.parse_args(argv)
+
+    rnd = random.Random(args.seed)
+    lieder = []
+    for nr in range(args.lieder):
+        lied = korpus.lied(rnd, nr, **korpus.lied_optionen(args))
+        lieder.append(fehlerhaft(lied, rnd) if rnd.random() < args.fehlerquote else lied)
+
+    converter = SongConverter(template_path=os.path.abspath(template_file))
+    erwartet = [converter.umwandeln(lied) for lied in lieder]
+    hinweise = sum(len(diagnosen) for _, diagnosen in erwartet)
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print("{} Lieder, {} Hinweise, {} Runden, Python {} {}".format(
+        len(lieder), hinweise, args.runden, sys.version.split()[0], "mit GIL" if gil else "ohne GIL (free-threaded)"))
+    print("{:>8} {:>10} {:>12} {:>10}".format("Threads", "Dauer [s]", "Lieder/s", "Faktor"))
+
+    jobs = list(range(len(lieder))) * args.runden
+    basis = None
+    for anzahl in args.threads:
+        ausgabe = io.StringIO()
+        with contextlib.redirect_stdout(ausgabe), contextlib.redirect_stderr(ausgabe):
+            with ThreadPoolExecutor(max_workers=anzahl) as pool:
+                start = time.perf_counter()
+                ergebnisse = list(pool.map(lambda i: converter.umwandeln(lieder[i]), jobs))
+                dauer = time.perf_counter() - start
+        assert ausgabe.getvalue() == "", "Ausgabe während der Umwandlung: " + ausgabe.getvalue()[:200]
+        for i, ergebnis in zip(jobs, ergebnisse):
+            assert ergebnis == erwartet[i], "Lied {} mit {} Threads anders als nacheinander".format(i, anzahl)
+        durchsatz = len(jobs) / dauer
+        basis = basis or durchsatz
+        print("{:>8} {:>10.3f} {:>12.0f} {:>10.2f}".format(anzahl, dauer, durchsatz, durchsatz / basis))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
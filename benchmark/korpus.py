@@ -0,0 +1,108 @@
+# korpus.py
+# Erzeugt synthetische Lieder nach dem Vorbild von Beispiele/Skelett.txt:
+# Titelzeile, Metadaten, nummerierte Strophen, Refrains, Akkordzeilen über dem Text und @info-Blöcke.
+# Aufruf aus dem Hauptverzeichnis: python3 -m benchmark.korpus Ausgabeverzeichnis [--lieder N] [--strophen N] ...
+import argparse
+import os
+import random
+from typing import List
+
+from lib.Heuristik.Heuristik import _Ueber_starts
+
+_woerter = ("der die das und ein eine wir ihr sie es ist war kommt geht singt Lied Wind Feuer Nacht Wald "
+            "Weg Lager Sterne Himmel Fahrt Freunde Morgen Abend Land Meer weit hoch leise laut heute nie "
+            "immer wieder zusammen über unter am im zum durch Berge Sonne Regen Straße Zelt Gitarre").split()
+_akkorde = ("C D E F G A H a d e h Esus4 Esus2 G7 C# f# D/F# Dsus2 E5 Hm7 Cmaj7 Fadd9 (G) Bb").split()
+_satzzeichen = ("", "", "", ",", ".", "!", "?", "…")
+# Metadatenschlüssel aus der Heuristik, sortiert, damit die Lieder mit gleichem seed immer gleich sind
+_schluessel = sorted(_Ueber_starts)
+
+
+def _textzeile(rnd: random.Random, woerter: int) -> str:
+    zeile = " ".join(rnd.choice(_woerter) for _ in range(woerter))
+    return zeile[0].upper() + zeile[1:] + rnd.choice(_satzzeichen)
+
+
+def _akkordzeile(rnd: random.Random, laenge: int) -> str:
+    # Akkorde an zufälligen Positionen über einer Textzeile der Länge laenge
+    zeile = ""
+    while True:
+        pos = len(zeile) + rnd.randint(1 if zeile else 0, 8)
+        akkord = rnd.choice(_akkorde)
+        if pos + len(akkord) > laenge + 2:
+            return zeile if zeile else akkord
+        zeile = zeile.ljust(pos) + akkord
+
+
+def _block(rnd: random.Random, label: str, zeilen: int, akkordquote: float) -> List[str]:
+    erg = []
+    for i in range(zeilen):
+        text = _textzeile(rnd, rnd.randint(3, 9))
+        if i == 0 and label:
+            text = label + " " + text
+        if rnd.random() < akkordquote:
+            erg.append(_akkordzeile(rnd, len(text)))
+        erg.append(text)
+    return erg
+
+
+def lied(rnd: random.Random, nr: int, strophen: int = 4, zeilen: int = 4, akkordquote: float = 0.7,
+         refrain: bool = True, info: float = 0.3) -> str:
+    """Erzeugt ein Lied als Text.
+    strophen: Anzahl der Strophen, zeilen: Textzeilen je Strophe,
+    akkordquote: Anteil der Textzeilen mit Akkordzeile darüber, info: Wahrscheinlichkeit für einen @info-Block"""
+    titel = "Lied {} {}".format(nr, _textzeile(rnd, rnd.randint(1, 4)).rstrip(",.!?…"))
+    if rnd.random() < 0.5:
+        titel += " [" + _textzeile(rnd, rnd.randint(2, 4)).rstrip(",.!?…") + "]"
+    erg = [titel]
+    for key in rnd.sample(_schluessel, rnd.randint(1, 5)):
+        erg.append("{}: {}".format(key, _textzeile(rnd, rnd.randint(1, 4))))
+    erg.append("")
+    for s in range(1, strophen + 1):
+        erg.extend(_block(rnd, "{})".format(s), zeilen, akkordquote))
+        erg.append("")
+        if refrain and s == 1:
+            erg.extend(_block(rnd, "Ref.", zeilen, akkordquote))
+            erg.append("")
+    if rnd.random() < info:
+        erg.append("@info: " + _textzeile(rnd, rnd.randint(5, 12)))
+        erg.append(_textzeile(rnd, rnd.randint(5, 12)))
+        erg.append("")
+    return "\n".join(erg)
+
+
+def schreiben(verzeichnis: str, lieder: int, seed: int = 0, **kwargs) -> List[str]:
+    """Schreibt lieder synthetische Lieder nach verzeichnis. Gibt die Dateipfade zurück.
+    kwargs werden an lied() weitergegeben."""
+    rnd = random.Random(seed)
+    pfade = []
+    for nr in range(lieder):
+        pfad = os.path.join(verzeichnis, "lied{:05d}.txt".format(nr))
+        with open(pfad, 'w') as file:
+            file.write(lied(rnd, nr, **kwargs))
+        pfade.append(pfad)
+    return pfade
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Optionen für Anzahl und Größe der Lieder"""
+    parser.add_argument('--lieder', type=int, default=200, help="Anzahl der Lieder (Standard: 200)")
+    parser.add_argument('--strophen', type=int, default=4, help="Strophen je Lied (Standard: 4)")
+    parser.add_argument('--zeilen', type=int, default=4, help="Textzeilen je Strophe (Standard: 4)")
+    parser.add_argument('--akkordquote', type=float, default=0.7,
+                        help="Anteil der Textzeilen mit Akkorden darüber (Standard: 0.7)")
+    parser.add_argument('--seed', type=int, default=0, help="Startwert des Zufallsgenerators (Standard: 0)")
+
+
+def lied_optionen(args: argparse.Namespace) -> dict:
+    return dict(strophen=args.strophen, zeilen=args.zeilen, akkordquote=args.akkordquote)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Erzeugt synthetische Lieder zum Testen und Messen.")
+    parser.add_argument('verzeichnis', help="Ausgabeverzeichnis")
+    add_arguments(parser)
+    args = parser.parse_args()
+    os.makedirs(args.verzeichnis, exist_ok=True)
+    pfade = schreiben(args.verzeichnis, args.lieder, args.seed, **lied_optionen(args))
+    print(len(pfade), "Lieder in", args.verzeichnis, "geschrieben.")
@@ -6,10 +6,30 @@ Created on Mon Mar  9 22:27:10 2020
 @author: paul
 """
 
-from typing import Collection, Set
-from song_converter import SongConverter
+from typing import Any, Callable, Collection, Dict, Iterable, Iterator, List, Optional, Tuple
+from song_converter import SongConverter, VERSION, template_cache_dir
+from lib.manifest.manifest import BuildManifest, file_hash, manifest_name
+from lib.watch.watch import DirWatcher
+from lib.verzeichnis.verzeichnis import sortierschluessel, titelverzeichnis
+from lib.messung.messung import Messung, chrome_trace
+from lib.ausgabe.ausgabe import write_if_changed, write_parts_if_changed, UNVERAENDERT
+from lib.akkorde.akkorde import SCHEMATA, Umschreiber
+from lib.zwischenformat.zwischenformat import Zwischenspeicher
+from lib.anthologie.anthologie import lieder
+from lib.diagnose.diagnose import Diagnose
+from lib.bericht.bericht import Bericht, Datei, zeilen_zaehlen
+from lib.scan.scan import Ausgaben, Eingabe, scannen
+from lib.shard.shard import ShardManifest, aufteilen, korpus_kennung, parse_shard, shard_manifest_name, build_manifest_name
+from collections import deque
+import argparse
+import contextlib
+import io
+import json
 import sys
 import os
+import platform
+import tempfile
+import time
 import typing
 
 # typing: Pfadspezifikation:
@@ -18,23 +38,11 @@ pfad = typing.Union[str, os.DirEntry]
 insuffixes = ['.txt',]
 outsuffix = '.tex'
 template_file = "Template.jinja"
-
-
-def get_dir_content(directory:pfad) -> Set[os.DirEntry]:
-    with os.scandir(directory) as listing:
-        return set(listing)
-
-
-def get_files(dir_content:Set[pfad])-> Set[pfad]:
-    return set(elem for elem in dir_content if elem.is_file)
-
-
-def get_accessable(dir_content:Set[pfad], access=os.R_OK) -> Set[pfad]:
-    return set(elem for elem in dir_content if os.access(elem, access))
-
-
-def get_inaccessable(dir_content:Set[pfad], access=os.R_OK) -> Set[pfad]:
-    return set.difference(dir_content, get_accessable(dir_content, access))
+# SongConverter, wird erst geladen, wenn etwas umgewandelt wird. In Arbeitsprozessen von _init_worker.
+converter: Optional[SongConverter] = None
+# weitere Argumente für SongConverter: akkorde (--akkorde, --transponieren), zwischenspeicher, nur_rendern, template_cache.
+# Werden in main gesetzt und an die Arbeitsprozesse weitergegeben.
+converter_optionen: Dict[str, Any] = dict()
 
 
 def get_outfilename(infilename:str, outending:str, inendings:Collection[str]) -> str:
@@ -50,14 +58,15 @@ def get_outfilename(infilename:str, outending:str, inendings:Collection[str]) ->
 def readfile(filename:pfad, mode='r') -> str:
     # Liest den gesamten inhalt der Datei(auch von langsamen streams)
     chunksize = 10000 #anzahl der zeichen, die auf einemal gelesen werden.
-    data = ''
+    chunks = []  # erst am Ende zusammensetzen, wiederholtes += kopiert alles bisher gelesene jedes Mal
     with open(filename, mode) as file:
         while 1:
             newdata = file.read(chunksize)
-            data += newdata
+            chunks.append(newdata)
             if len(newdata) < chunksize: # wurde das Ende der Datei erreicht? 
                 break
-    return data
+    # chunks[0][:0] ist '' oder b'', je nach mode
+    return chunks[0] if len(chunks) == 1 else chunks[0][:0].join(chunks)
 
 
 def writefile(filename:pfad, data:str, mode='w')->int:
@@ -72,21 +81,59 @@ def build_path(directory:pfad, filename:str)-> pfad:
     return os.path.join(directory, filename)
 
 
-def convertFile(infile:pfad, outfile: pfad)-> None:
+def _anzeigename(datei:Any)-> str:
+    # Name einer Eingabe für die Meldungen und den Bericht: bei Eingaben aus getInfiles der Pfad relativ zum
+    # Eingabeverzeichnis (mit --rekursiv mit Unterverzeichnis), Namen wie "Sammlung.txt:12" bleiben, wie sie sind
+    return getattr(datei, "name", datei)
+
+
+def _datei(name:str, status:Optional[str], start:float, indata:str, outdata:str, diagnosen:List[Diagnose])-> Datei:
+    # Zahlen zu einem umgewandelten Lied für den Bericht, Bytes in UTF-8
+    return Datei(name, status, time.perf_counter() - start, zeilen_zaehlen(indata),
+                 len(indata.encode('utf-8')), len(outdata.encode('utf-8')), diagnosen)
+
+
+def _berichten(bericht:Bericht, name:str, erfolg:bool, datei:Optional[Datei])-> Optional[str]:
+    # trägt das Ergebnis eines Jobs in den Bericht ein. Rückgabe: Status der Ausgabe, None, wenn er fehlgeschlagen ist
+    if not erfolg:
+        bericht.fehler(name)
+        return None
+    bericht.datei(datei)
+    return datei.status
+
+
+def convertFile(infile:pfad, outfile: pfad)-> Datei:
+        """wandelt infile um und schreibt das Ergebnis nach outfile, falls es sich geändert hat.
+        Gibt nichts aus, den Fortschritt meldet der Bericht (lib/bericht) im Hauptprozess.
+        Rückgabe: Zahlen und Hinweise für den Bericht, status ist NEU, AKTUALISIERT oder UNVERAENDERT (siehe lib.ausgabe)"""
+        messung = converter.messung
+        start = time.perf_counter()
         # Datei laden
-        print(infile.name.rjust(30), ' lesen… ', end='')
-        indata = readfile(infile)
+        with messung.stufe("lesen"):
+            indata = readfile(infile)
         # Datei Konvertieren
-        print(' umwandeln… ', end='')
-        outdata = converter.convert(indata)  # multithreading nötig?
+        diagnosen = []
+        outdata = converter.convert(indata, diagnosen)  # parallel siehe convertFilesParallel
         # Datei speichern
-        print(' speichern… ', end='')
-        writefile(outfile, outdata)
-        print("fertig")
+        with messung.stufe("schreiben"):
+            status = write_if_changed(outfile, outdata)
+        return _datei(_anzeigename(infile), status, start, indata, outdata, diagnosen)
+
 
+def convertFileProfiled(infile:pfad, outfile: pfad)-> Tuple[Datei, dict, list]:
+    """wie convertFile, der converter muss eine Messung mit trace haben.
+    Rückgabe: (Ergebnis von convertFile, Zeiten je Stufe für diese Datei, Trace-Ereignisse)"""
+    converter.messung.events_abholen()  # Ereignisse einer fehlgeschlagenen Datei davor verwerfen
+    stand = converter.messung.stand()
+    with converter.messung.stufe("datei", datei=_anzeigename(infile)):
+        datei = convertFile(infile, outfile)
+    return datei, converter.messung.seit(stand), converter.messung.events_abholen()
 
-def getInfiles(directory:pfad) -> Set[pfad]:
-    return get_accessable(get_files(get_dir_content(directory)), os.R_OK)
+
+def getInfiles(directory:pfad, rekursiv:bool=False, auslassen:Collection[pfad]=()) -> Iterator[Eingabe]:
+    """lesbare Dateien in directory, nach Namen sortiert, mit rekursiv auch in allen Unterverzeichnissen (siehe lib.scan).
+    Der Name jeder Eingabe ist ihr Pfad relativ zu directory. auslassen: diese Verzeichnisse nicht durchsuchen."""
+    return scannen(directory, rekursiv, [os.fspath(a) for a in auslassen])
 
 
 def fileIsWriteable(datei:pfad, allow_overwrite=False)->bool:
@@ -106,37 +153,648 @@ def fileIsWriteable(datei:pfad, allow_overwrite=False)->bool:
     return os.access(pdir, os.W_OK)
 
 
-if __name__== "__main__":
-    # Aufrufparameter lesen
-    if len(sys.argv) >= 3:
-        indir, outdir = sys.argv[-2:]
-        if len(sys.argv) > 3 and '-o' in sys.argv[1:-2]:
-            overwrite = True
+def _init_worker(template_path:pfad, profile:bool=False, optionen:Optional[Dict[str, Any]]=None)-> None:
+    """Initialisiert einen Arbeitsprozess. Das Template wird dabei nur einmal pro Prozess geladen.
+    profile: die Zeiten der Stufen messen (siehe --profile)
+    optionen: weitere Argumente für SongConverter (siehe converter_optionen)"""
+    global converter
+    converter = SongConverter(template_path=template_path, messung=Messung(trace=True) if profile else None,
+                              **(optionen or {}))
+
+
+def _captured(funktion:Callable, *args)-> Tuple[str, str, Optional[str], Any]:
+    """Ruft funktion(*args) in einem Arbeitsprozess auf.
+    Die Ausgaben werden gesammelt und zurückgegeben, damit der Hauptprozess sie in der richtigen Reihenfolge ausgibt.
+    Fehler werden nicht weitergereicht, damit ein fehlerhaftes Lied die anderen nicht aufhält.
+    Rückgabe: (stdout, stderr, Fehlermeldung oder None, Rückgabewert der funktion)"""
+    out, err = io.StringIO(), io.StringIO()
+    fehler = None
+    ergebnis = None
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        try:
+            ergebnis = funktion(*args)
+        except Exception as e:
+            fehler = str(e)
+    return out.getvalue(), err.getvalue(), fehler, ergebnis
+
+
+def runParallel(funktion:Callable, jobs:List[tuple], processes:int, template_path:pfad,
+                profile:bool=False)-> List[Tuple[bool, Any]]:
+    """Ruft funktion(*args) für alle args in jobs mit mehreren Prozessen auf. Das erste Argument ist jeweils die Eingabedatei.
+    Die Meldungen erscheinen in der Reihenfolge von jobs, unabhängig davon, welcher Prozess zuerst fertig ist.
+    Gibt für jeden Job (erfolgreich, Rückgabewert) zurück."""
+    from concurrent.futures import ProcessPoolExecutor  # erst hier importieren, das dauert beim Start
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(template_path, profile, converter_optionen)) as pool:
+        futures = [pool.submit(_captured, funktion, *args) for args in jobs]
+        return [_abholen(args, future) for args, future in zip(jobs, futures)]
+
+
+def _abholen(args:tuple, future)-> Tuple[bool, Any]:
+    # wartet auf das Ergebnis eines Jobs von runParallel oder runStreaming und gibt seine Meldungen aus
+    out, err, fehler, ergebnis = future.result()
+    sys.stdout.write(out)
+    sys.stdout.flush()
+    sys.stderr.write(err)
+    if fehler is not None:
+        print('FEHLER bei Datei', _anzeigename(args[0]), fehler, file=sys.stderr)
+    return fehler is None, ergebnis
+
+
+def runSequential(funktion:Callable, jobs:Iterable[tuple])-> Iterator[Tuple[bool, Any]]:
+    """wie runStreaming, aber im eigenen Prozess, der converter muss geladen sein"""
+    for args in jobs:
+        try:
+            yield True, funktion(*args)
+        except Exception as e:
+            print('FEHLER bei Datei', _anzeigename(args[0]), e, file=sys.stderr)
+            yield False, None
+
+
+def runStreaming(funktion:Callable, jobs:Iterable[tuple], processes:int, template_path:pfad)-> Iterator[Tuple[bool, Any]]:
+    """wie runParallel, aber jobs darf ein Generator sein und wird erst nach und nach gelesen.
+    Es sind höchstens 2 * processes Jobs gleichzeitig unterwegs, der Speicherbedarf wächst also nicht mit ihrer Anzahl.
+    Liefert (erfolgreich, Rückgabewert) in der Reihenfolge von jobs."""
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(template_path, False, converter_optionen)) as pool:
+        unterwegs = deque()
+        for args in jobs:
+            unterwegs.append((args, pool.submit(_captured, funktion, *args)))
+            if len(unterwegs) >= 2 * processes:
+                yield _abholen(*unterwegs.popleft())
+        while unterwegs:
+            yield _abholen(*unterwegs.popleft())
+
+
+def convertFilesParallel(jobs:List[Tuple[pfad, pfad]], processes:int, template_path:pfad,
+                         bericht:Bericht)-> List[Optional[str]]:
+    """Wandelt alle (Eingabe, Ausgabe)-Paare in jobs mit mehreren Prozessen um und trägt jedes Lied in den bericht ein.
+    Gibt für jedes Paar den Status der Ausgabe (wie convertFile) zurück, None, wenn die Umwandlung fehlgeschlagen ist."""
+    # DirEntry-Objekte lassen sich nicht an andere Prozesse übergeben, Eingaben aus getInfiles schon (mit ihrem Namen)
+    jobs = [(infile if isinstance(infile, Eingabe) else os.fspath(infile), os.fspath(outfile)) for infile, outfile in jobs]
+    return [_berichten(bericht, _anzeigename(infile), erfolg, datei)
+            for (infile, _), (erfolg, datei) in zip(jobs, runStreaming(convertFile, jobs, processes, template_path))]
+
+
+def _convertTextFuerBericht(text:str)-> Tuple[str, Datei]:
+    start = time.perf_counter()
+    diagnosen = []
+    outdata = converter.convert(text, diagnosen)
+    # Name und Status trägt der Hauptprozess ein, die Zeit ist nur die der Umwandlung
+    return outdata, _datei("", None, start, text, outdata, diagnosen)
+
+
+def convertText(text:str)-> Tuple[str, str, Optional[str], Any]:
+    """wandelt text in einem Arbeitsprozess um. Rückgabe wie _captured, der Rückgabewert ist (latex, Datei für den Bericht)"""
+    return _captured(_convertTextFuerBericht, text)
+
+
+def _schreibeErgebnis(job:Tuple[str, str], ergebnis:Tuple[str, str, Optional[str], Any])-> str:
+    # schreibt das Ergebnis von convertText, Rückgabe wie write_if_changed
+    _, _, fehler, umgewandelt = ergebnis
+    if fehler is not None:
+        raise Exception(fehler)  # nichts zu schreiben, die Umwandlung ist fehlgeschlagen
+    return write_if_changed(job[1], umgewandelt[0])
+
+
+def convertFilesPipeline(jobs:List[Tuple[pfad, pfad]], processes:int, template_path:pfad,
+                         io_threads:int, puffer:int, bericht:Bericht)-> List[Optional[str]]:
+    """--pipeline: Lesen, Umwandeln (processes Prozesse) und Schreiben laufen gleichzeitig.
+    Die Meldungen erscheinen in der Reihenfolge, in der die Lieder fertig werden.
+    Gibt für jedes Paar den Status der Ausgabe zurück, None, wenn die Umwandlung fehlgeschlagen ist."""
+    # erst hier importieren, asyncio und die Prozesse brauchen beim Start Zeit
+    from concurrent.futures import ProcessPoolExecutor
+    from lib.pipeline.pipeline import Pipeline
+
+    def fertig(nr:int, ergebnis, fehler:Optional[str], status:Optional[str])-> None:
+        if ergebnis is not None:
+            sys.stdout.write(ergebnis[0])
+            sys.stderr.write(ergebnis[1])
+        name = _anzeigename(jobs[nr][0])
+        if fehler is None:
+            bericht.datei(ergebnis[3][1]._replace(name=name, status=status))
         else:
-            overwrite = False
+            print('FEHLER bei Datei', name, fehler, file=sys.stderr)
+            bericht.fehler(name)
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(template_path, False, converter_optionen)) as pool:
+        pipeline = Pipeline(lambda job: readfile(job[0]), convertText, _schreibeErgebnis, pool,
+                            arbeiter=processes, io_threads=io_threads, puffer=puffer, fertig=fertig)
+        ergebnisse = pipeline.run(jobs)
+    if jobs and not bericht.leise:  # mit -q nur die Zusammenfassung
+        print("Warteschlangen (Mittel / Maximum / Größe):")
+        for name, (mittel, maximum, groesse) in pipeline.tiefen().items():
+            print("  vor {:<10} {:5.1f} / {} / {}".format(name, mittel, maximum, groesse))
+        print("Engpass vermutlich:", pipeline.engpass())
+    return [status if fehler is None else None for fehler, status in ergebnisse]
+
+
+def kopfdaten(infile:pfad)-> Tuple[str, Optional[str]]:
+    """Titel und Alternativtitel eines umgewandelten Liedes für das Liederbuch (siehe --shard).
+    Aus dem Zwischenformat, wenn das Lied im Zwischenspeicher liegt, sonst werden nur die Metadaten gelesen."""
+    lied = readfile(infile)
+    speicher = converter_optionen.get("zwischenspeicher")
+    eintrag = None if speicher is None else speicher.laden(lied)
+    if eintrag is None:
+        meta = SongConverter.metadaten(lied)
+        return meta["title"], meta.get("index")
+    zwischen = eintrag[0]
+    return zwischen["title"], zwischen["metadata"].get("index")
+
+
+profil_stufen = ("lesen", "zwischenspeicher", "grammatik", "split", "metadaten", "makelatexdata", "render", "schreiben")
+
+
+def profilBericht(dateien:List[Tuple[str, dict]], events:list)-> None:
+    """Gibt eine Tabelle mit den Zeiten je Datei und Stufe in ms aus, darunter Gesamtzeit und Aufrufe je Stufe.
+    dateien: (Dateiname, Zeiten je Stufe in s) je umgewandelter Datei"""
+    breite = max([len(name) for name, _ in dateien] + [5])
+    kopf = ["Datei".ljust(breite)] + [stufe.rjust(max(len(stufe), 9)) for stufe in profil_stufen] + ["gesamt".rjust(9)]
+    print(" ".join(kopf))
+    summe = dict.fromkeys(profil_stufen, 0.0)
+    for name, zeiten in dateien:
+        zeile = [name.ljust(breite)]
+        for stufe, spalte in zip(profil_stufen, kopf[1:]):
+            zeile.append("{:.2f}".format(zeiten.get(stufe, 0.0) * 1000).rjust(len(spalte)))
+            summe[stufe] += zeiten.get(stufe, 0.0)
+        zeile.append("{:.2f}".format(zeiten.get("datei", 0.0) * 1000).rjust(9))
+        print(" ".join(zeile))
+    aufrufe = dict.fromkeys(profil_stufen, 0)
+    for event in events:
+        if event["name"] in aufrufe:
+            aufrufe[event["name"]] += 1
+    gesamt = sum(zeiten.get("datei", 0.0) for _, zeiten in dateien)
+    print(" ".join(["Summe".ljust(breite)] + ["{:.2f}".format(summe[stufe] * 1000).rjust(len(spalte))
+                                              for stufe, spalte in zip(profil_stufen, kopf[1:])]
+                   + ["{:.2f}".format(gesamt * 1000).rjust(9)]))
+    print(" ".join(["Aufrufe".ljust(breite)] + [str(aufrufe[stufe]).rjust(len(spalte))
+                                                for stufe, spalte in zip(profil_stufen, kopf[1:])]))
+
+
+def convertFilesProfiled(jobs:List[Tuple[pfad, pfad]], processes:int, template_path:pfad, trace_file:pfad,
+                         bericht:Bericht)-> List[Optional[str]]:
+    """--profile: wandelt alle Paare in jobs um (mit processes > 1 parallel) und misst dabei die Stufen.
+    Gibt die Tabelle aus und schreibt alle Ereignisse als Chrome-Trace nach trace_file.
+    Gibt für jedes Paar den Status der Ausgabe zurück, None, wenn die Umwandlung fehlgeschlagen ist."""
+    global converter
+    jobs = [(infile if isinstance(infile, Eingabe) else os.fspath(infile), os.fspath(outfile)) for infile, outfile in jobs]
+    if processes > 1:
+        ergebnisse = runParallel(convertFileProfiled, jobs, processes, template_path, profile=True)
     else:
-        print("Benutzung: converter.py [-o] Eingabeverzeichnis Ausgabeverzeichnis", file=sys.stderr)
+        _init_worker(template_path, profile=True, optionen=converter_optionen)
+        ergebnisse = []
+        for infile, outpath in jobs:
+            try:
+                ergebnisse.append((True, convertFileProfiled(infile, outpath)))
+            except Exception as e:
+                print('FEHLER bei Datei', _anzeigename(infile), e, file=sys.stderr)
+                ergebnisse.append((False, None))
+    dateien = []
+    events = []
+    ausgaben = []
+    for (infile, _), (erfolg, ergebnis) in zip(jobs, ergebnisse):
+        ausgaben.append(_berichten(bericht, _anzeigename(infile), erfolg, ergebnis and ergebnis[0]))
+        if erfolg:
+            _, zeiten, datei_events = ergebnis
+            dateien.append((_anzeigename(infile), zeiten))
+            events.extend(datei_events)
+    profilBericht(dateien, events)
+    with open(trace_file, 'w') as file:
+        json.dump(chrome_trace(events, dict(version=VERSION, prozesse=processes)), file)
+    print("Trace in", trace_file, "geschrieben.")
+    return ausgaben
+
+
+def convertLiedForBundle(name:str, lied:str)-> Tuple[str, Optional[str], str, Datei]:
+    """wandelt ein Lied für das Liederbuch um. Rückgabe: (Titel, Alternativtitel oder None, latex, Datei für den Bericht)"""
+    start = time.perf_counter()
+    diagnosen = []
+    zwischen = converter.zwischenformat(lied, diagnosen)
+    latex = converter.render(zwischen)
+    return zwischen["title"], zwischen["metadata"].get("index"), latex, _datei(name, None, start, lied, latex, diagnosen)
+
+
+def convertForBundle(infile:pfad)-> Tuple[str, Optional[str], str, Datei]:
+    """liest und wandelt eine Datei für das Liederbuch um. Rückgabe wie convertLiedForBundle"""
+    return convertLiedForBundle(_anzeigename(infile), readfile(infile))
+
+
+def convertLied(name:str, lied:str, outfile:pfad)-> Datei:
+    """wandelt ein Lied aus einer Sammlung (--anthologie) um und schreibt es nach outfile, falls es sich geändert hat.
+    Rückgabe wie convertFile"""
+    start = time.perf_counter()
+    diagnosen = []
+    latex = converter.convert(lied, diagnosen)
+    return _datei(name, write_if_changed(outfile, latex), start, lied, latex, diagnosen)
+
+
+def writeBundle(bundle:pfad, lieder:List[Tuple[Any, str, Optional[str], Any]], with_index:bool,
+                lesen:Optional[Callable[[Any], str]]=None)-> str:
+    """Schreibt alle Lieder nach Titel sortiert in eine Datei, falls sich der Inhalt geändert hat.
+    lieder: (Schlüssel, Titel, Alternativtitel, latex) je Lied. Bei gleichen Titeln entscheidet der Schlüssel,
+    z.B. der Dateiname oder (--anthologie) die Nummer des Liedes.
+    with_index: am Ende ein Titelverzeichnis anhängen
+    lesen: wenn angegeben, steht statt latex nur ein Verweis in lieder, lesen(verweis) liefert den latex code.
+    Dann liegt immer nur ein Lied im Speicher.
+    Rückgabe: NEU, AKTUALISIERT oder UNVERAENDERT (siehe lib.ausgabe)"""
+    lieder = sorted(lieder, key=lambda lied: (sortierschluessel(lied[1]), lied[0]))
+
+    def teile()-> Iterator[str]:
+        for _, _, _, latex in lieder:
+            yield latex if lesen is None else lesen(latex)
+            yield '\n'
+        if with_index:
+            yield titelverzeichnis((titel, alttitel) for _, titel, alttitel, _ in lieder)
+    return write_parts_if_changed(bundle, teile())
+
+
+def parse_args(argv:Optional[List[str]]=None)-> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        usage="converter.py [-o] [-j N] [--force] [--watch [--interval SEK]] [--profile DATEI | --pipeline [--io N] [--puffer N]]\n"
+              "                    [--akkorde SCHEMA] [--transponieren N] [--zwischenspeicher | --nur-rendern] [--shard I/N]\n"
+              "                    [-r] [-q] [--bericht DATEI] [--langsamste N] [--template-cache] Eingabeverzeichnis Ausgabeverzeichnis\n"
+              "       converter.py [-o] [-j N] --bundle DATEI [--index] [--akkorde SCHEMA] [--transponieren N]\n"
+              "                    [--zwischenspeicher | --nur-rendern]\n"
+              "                    [-r] [-q] [--bericht DATEI] [--langsamste N] [--template-cache] Eingabeverzeichnis\n"
+              "       converter.py [-o] [-j N] --anthologie [--bundle DATEI [--index]] [--akkorde SCHEMA] [--transponieren N]\n"
+              "                    [-r] [-q] [--bericht DATEI] [--langsamste N] [--template-cache]\n"
+              "                    Eingabeverzeichnis [Ausgabeverzeichnis]",
+        description="Konvertiert Lieder aus Textdateien in Latex.")
+    parser.add_argument('-o', dest='overwrite', action='store_true',
+                        help="Dateien im Ausgabeverzeichnis überschreiben")
+    parser.add_argument('-j', dest='jobs', type=int, default=1, metavar='N',
+                        help="Anzahl der Prozesse, die gleichzeitig umwandeln. 0: ein Prozess je Prozessorkern")
+    parser.add_argument('--force', action='store_true',
+                        help="alle Lieder umwandeln, auch die, die sich seit dem letzten Lauf nicht geändert haben")
+    parser.add_argument('--watch', action='store_true',
+                        help="nach dem Umwandeln das Eingabeverzeichnis beobachten und geänderte Lieder sofort umwandeln")
+    parser.add_argument('--interval', type=float, default=0.5, metavar='SEK',
+                        help="Abstand zwischen zwei Abfragen des Eingabeverzeichnisses im --watch-Modus (Standard: 0.5)")
+    parser.add_argument('--bundle', metavar='DATEI',
+                        help="alle Lieder nach Titel sortiert in eine einzige Datei schreiben statt eine Datei je Lied")
+    parser.add_argument('--index', action='store_true',
+                        help="mit --bundle: ein Verzeichnis aller Titel und Alternativtitel anhängen")
+    parser.add_argument('--profile', metavar='DATEI',
+                        help="Zeit jeder Stufe je Datei messen, als Tabelle ausgeben und als Chrome-Trace (JSON) nach DATEI schreiben")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Lesen, Umwandeln und Schreiben gleichzeitig, z.B. für Dateien auf einem Netzlaufwerk")
+    parser.add_argument('--io', type=int, default=4, metavar='N',
+                        help="mit --pipeline: Anzahl der Threads zum Lesen und zum Schreiben (Standard: 4)")
+    parser.add_argument('--puffer', type=int, default=8, metavar='N',
+                        help="mit --pipeline: höchstens N Lieder je Warteschlange (Standard: 8)")
+    parser.add_argument('--akkorde', choices=sorted(SCHEMATA), metavar='SCHEMA',
+                        help="alle Akkorde einheitlich schreiben: " + ", ".join(sorted(SCHEMATA))
+                             + " (deutsch: H und B, englisch: B und Bb, deutsch-klein: Moll mit kleinen Buchstaben)")
+    parser.add_argument('--transponieren', type=int, default=0, metavar='N',
+                        help="alle Akkorde um N Halbtöne transponieren (negativ: nach unten)")
+    parser.add_argument('--akkorde-eingabe', choices=("deutsch", "englisch"), default="deutsch",
+                        help="Schema, in dem die Akkorde der Lieder geschrieben sind. deutsch (Standard): B bedeutet Bb, "
+                             "englisch: B bedeutet H")
+    parser.add_argument('--zwischenspeicher', action='store_true',
+                        help="das Ergebnis der Zeilenerkennung jedes Liedes im Cache speichern und wiederverwenden, "
+                             "ändert sich nur das Template, wird nur noch das Template gefüllt. Wird nicht aufgeräumt")
+    parser.add_argument('--template-cache', action='store_true',
+                        help="das übersetzte Template im Cache speichern und beim nächsten Aufruf von dort laden. "
+                             "Lohnt sich nur für große Templates")
+    parser.add_argument('--nur-rendern', action='store_true',
+                        help="nur das Template neu füllen: Lieder, die nicht schon einmal mit --zwischenspeicher "
+                             "umgewandelt wurden, schlagen fehl")
+    parser.add_argument('--shard', metavar='I/N',
+                        help="nur den I-ten von N Teilen der Lieder umwandeln, z.B. auf mehreren Rechnern. "
+                             "Die Teile werden nach Dateigröße ausgeglichen und mit merge.py zusammengeführt")
+    parser.add_argument('--anthologie', action='store_true',
+                        help="jede Eingabedatei ist eine Sammlung vieler Lieder. Jedes Lied wird einzeln umgewandelt, "
+                             "nach Name-001.tex, Name-002.tex, ... oder mit --bundle in eine Datei")
+    parser.add_argument('-r', '--rekursiv', action='store_true',
+                        help="auch die Lieder in allen Unterverzeichnissen umwandeln (z.B. Kapitel), die Ausgaben landen "
+                             "in denselben Unterverzeichnissen des Ausgabeverzeichnisses")
+    parser.add_argument('-q', '--leise', action='store_true',
+                        help="keine Zeile je Lied und keine Hinweise ausgeben, nur Fehler und die Zusammenfassung "
+                             "(mit der Anzahl der Hinweise)")
+    parser.add_argument('--bericht', metavar='DATEI',
+                        help="Zusammenfassung des Laufes (Anzahlen, Zeilen, Bytes, Lieder/s, langsamste Lieder) als JSON "
+                             "nach DATEI schreiben, z.B. um den Durchsatz in der CI zu verfolgen")
+    parser.add_argument('--langsamste', type=int, default=5, metavar='N',
+                        help="die N langsamsten Lieder in der Zusammenfassung nennen (Standard: 5)")
+    parser.add_argument('indir', help="Eingabeverzeichnis")
+    parser.add_argument('outdir', nargs='?', help="Ausgabeverzeichnis")
+    args = parser.parse_args(argv)
+    if args.bundle is None and args.outdir is None:
+        parser.error("Ausgabeverzeichnis fehlt")
+    if args.bundle is not None and args.watch:
+        parser.error("--bundle und --watch können nicht zusammen verwendet werden")
+    if args.index and args.bundle is None:
+        parser.error("--index geht nur zusammen mit --bundle")
+    if args.profile is not None and args.bundle is not None:
+        parser.error("--profile und --bundle können nicht zusammen verwendet werden")
+    if args.pipeline and (args.bundle is not None or args.profile is not None):
+        parser.error("--pipeline geht nicht zusammen mit --bundle oder --profile")
+    if args.nur_rendern and args.watch:
+        parser.error("--nur-rendern und --watch können nicht zusammen verwendet werden")
+    if args.nur_rendern and args.zwischenspeicher:
+        parser.error("--nur-rendern liest nur aus dem Zwischenspeicher, --zwischenspeicher ist dafür nicht nötig")
+    if args.shard is not None:
+        if args.bundle is not None or args.watch:
+            parser.error("--shard geht nicht zusammen mit --bundle oder --watch, das Liederbuch entsteht mit merge.py")
+        try:
+            args.shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error("--shard: " + str(e))
+    if args.anthologie and (args.watch or args.profile is not None or args.pipeline or args.shard is not None):
+        parser.error("--anthologie geht nicht zusammen mit --watch, --profile, --pipeline oder --shard")
+    if args.io < 1 or args.puffer < 1:
+        parser.error("--io und --puffer müssen mindestens 1 sein")
+    if args.jobs < 0:
+        parser.error("-j muss mindestens 0 sein")
+    if args.langsamste < 0:
+        parser.error("--langsamste muss mindestens 0 sein")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def watch(indir:pfad, outdir:pfad, manifest:BuildManifest, overwrite:bool, interval:float, rekursiv:bool=False)-> None:
+    """Beobachtet indir und wandelt neue und geänderte Lieder sofort um.
+    Der Converter bleibt dabei geladen. Zu gelöschten Liedern wird die Ausgabe ebenfalls gelöscht.
+    rekursiv: auch die Unterverzeichnisse beobachten, die Ausgaben landen in denselben Unterverzeichnissen von outdir.
+    Läuft, bis das Programm mit Strg+C beendet wird."""
+    watcher = DirWatcher(indir, rekursiv, [outdir])
+    print("Beobachte", indir, "(Beenden mit Strg+C)")
+    try:
+        while True:
+            time.sleep(interval)
+            geaendert, geloescht = watcher.poll()
+            for name in geloescht:
+                outpath = build_path(outdir, get_outfilename(name, outsuffix, insuffixes))
+                # nur Dateien löschen, die der Konverter selbst erzeugt hat
+                if name in manifest.files and os.path.isfile(outpath):
+                    os.remove(outpath)
+                    print(os.path.basename(outpath), "gelöscht, weil", name, "gelöscht wurde")
+                manifest.forget(name)
+            for name in geaendert:
+                infile = build_path(indir, name)
+                outpath = build_path(outdir, get_outfilename(name, outsuffix, insuffixes))
+                if rekursiv:
+                    os.makedirs(os.path.dirname(outpath), exist_ok=True)
+                # Eigene Ausgaben dürfen immer überschrieben werden
+                if not fileIsWriteable(outpath, overwrite or name in manifest.files):
+                    print(os.path.basename(outpath), ' darf nicht überschrieben werden. ', name, " wird übersprungen.", file=sys.stderr)
+                    continue
+                start = time.perf_counter()
+                try:
+                    inhash = file_hash(infile)
+                    datei = convertFile(infile, outpath)
+                except Exception as e:
+                    print('FEHLER bei Datei', name, e, file=sys.stderr)
+                    manifest.forget(name)
+                    continue
+                dauer = time.perf_counter() - start
+                # Zeit vom Speichern der Eingabe bis zur fertigen Ausgabe
+                latenz = time.time() - os.stat(infile).st_mtime
+                print("  {} in {:.1f} ms umgewandelt, {:.1f} ms nach dem Speichern".format(name, dauer*1000, latenz*1000))
+                for diagnose in datei.hinweise:
+                    print("    Hinweis:", diagnose)
+                manifest.record(name, inhash, outpath)
+            if geaendert or geloescht:
+                manifest.save()
+    except KeyboardInterrupt:
+        manifest.save()
+
+
+def main_bundle(args:argparse.Namespace, infiles:List[Eingabe], bericht:Bericht)-> None:
+    """--bundle: alle Lieder in eine Datei"""
+    global converter
+    if not fileIsWriteable(args.bundle, args.overwrite):
+        print(args.bundle, ' darf nicht überschrieben werden.', file=sys.stderr)
         sys.exit(1)
-    if not (os.path.isdir(indir) and os.path.isdir(outdir)):
+    jobs = [(infile,) for infile in infiles]
+    if args.jobs > 1:
+        ergebnisse = runStreaming(convertForBundle, jobs, args.jobs, template_file)
+    else:
+        converter = SongConverter(template_path=template_file, **converter_optionen)
+        ergebnisse = runSequential(convertForBundle, jobs)
+    lieder = []
+    for infile, (erfolg, ergebnis) in zip(infiles, ergebnisse):
+        _berichten(bericht, infile.name, erfolg, ergebnis and ergebnis[3])
+        if erfolg:
+            lieder.append((infile.name,) + ergebnis[:3])
+    if writeBundle(args.bundle, lieder, args.index) == UNVERAENDERT:
+        print(args.bundle, "ist unverändert,", len(lieder), "Lieder.")
+    else:
+        print(len(lieder), "Lieder in", args.bundle, "geschrieben.")
+
+
+def liedJobs(infiles:Iterable[Eingabe], outdir:Optional[pfad]=None, overwrite:bool=False)-> Iterator[tuple]:
+    """--anthologie: teilt alle Eingabedateien in Lieder, die Dateien werden dabei zeilenweise gelesen.
+    Liefert (Name, Lied) je Lied, mit outdir (Name, Lied, Ausgabepfad). Name ist Datei:Zeile, für die Meldungen.
+    Die Ausgabedateien heißen wie die Eingabe mit der Nummer des Liedes: Sammlung.txt -> Sammlung-001.tex, ..."""
+    ausgaben = Ausgaben()
+    for infile in infiles:
+        with open(infile, 'r') as file:
+            for nr, (zeile, lied) in enumerate(lieder(file), 1):
+                name = "{}:{}".format(infile.name, zeile)
+                if outdir is None:
+                    yield name, lied
+                    continue
+                outfilename = get_outfilename(infile.name, "-{:03d}{}".format(nr, outsuffix), insuffixes)
+                outpath = build_path(outdir, outfilename)
+                if not ausgaben.schreibbar(outpath, overwrite):
+                    print(outfilename, ' darf nicht überschrieben werden. ', name, " wird übersprungen.", file=sys.stderr)
+                    continue
+                ausgaben.anlegen(outpath)
+                yield name, lied, outpath
+
+
+def main_anthologie(args:argparse.Namespace, infiles:Iterable[Eingabe], bericht:Bericht)-> None:
+    """--anthologie: jede Eingabedatei ist eine Sammlung von Liedern, jedes Lied wird einzeln umgewandelt.
+    Eingabe und Umwandlung laufen gleichzeitig, im Speicher liegen nur die Lieder, die gerade umgewandelt werden.
+    Mit --bundle wird der latex code bis zum Sortieren in einer temporären Datei abgelegt."""
+    global converter
+    bundle = args.bundle is not None
+    if bundle and not fileIsWriteable(args.bundle, args.overwrite):
+        print(args.bundle, ' darf nicht überschrieben werden.', file=sys.stderr)
+        sys.exit(1)
+    namen = deque()  # Namen der Lieder, deren Ergebnis noch aussteht, für den Bericht
+
+    def jobs()-> Iterator[tuple]:
+        for job in liedJobs(infiles, None if bundle else args.outdir, args.overwrite):
+            namen.append(job[0])
+            yield job
+
+    funktion = convertLiedForBundle if bundle else convertLied
+    if args.jobs > 1:
+        ergebnisse = runStreaming(funktion, jobs(), args.jobs, template_file)
+    else:
+        converter = SongConverter(template_path=template_file, **converter_optionen)
+        ergebnisse = runSequential(funktion, jobs())
+
+    if not bundle:
+        for erfolg, datei in ergebnisse:
+            _berichten(bericht, namen.popleft(), erfolg, datei)
+        return
+
+    with tempfile.TemporaryFile() as spool:
+        eintraege = []  # (Nummer, Titel, Alternativtitel, (Position, Länge) im spool)
+        fehlgeschlagen = 0
+        for nr, (erfolg, ergebnis) in enumerate(ergebnisse):
+            name = namen.popleft()
+            if not erfolg:
+                fehlgeschlagen += 1
+                bericht.fehler(name)
+                continue
+            titel, alttitel, latex, datei = ergebnis
+            bericht.datei(datei)
+            daten = latex.encode('utf-8')
+            eintraege.append((nr, titel, alttitel, (spool.tell(), len(daten))))
+            spool.write(daten)
+
+        def lesen(verweis:Tuple[int, int])-> str:
+            spool.seek(verweis[0])
+            return spool.read(verweis[1]).decode('utf-8')
+
+        status = writeBundle(args.bundle, eintraege, args.index, lesen)
+    ergaenzung = ", {} fehlgeschlagen".format(fehlgeschlagen) if fehlgeschlagen else ""
+    if status == UNVERAENDERT:
+        print(args.bundle, "ist unverändert,", len(eintraege), "Lieder" + ergaenzung + ".")
+    else:
+        print(len(eintraege), "Lieder in", args.bundle, "geschrieben" + ergaenzung + ".")
+
+
+def berichtAbschliessen(args:argparse.Namespace, bericht:Bericht, version:str)-> None:
+    """gibt die Zusammenfassung aus und schreibt den Bericht mit --bericht als JSON"""
+    bericht.beenden()
+    print(bericht.zusammenfassung())
+    if args.bericht is not None:
+        bericht.speichern(args.bericht, version=version, prozesse=args.jobs, python=platform.python_version())
+
+
+def main(argv:Optional[List[str]]=None)-> None:
+    global converter
+    # Aufrufparameter lesen
+    args = parse_args(argv)
+    umschreiber = None
+    if args.akkorde is not None or args.transponieren:
+        umschreiber = Umschreiber(args.akkorde, args.transponieren, args.akkorde_eingabe)
+    # Mit umgeschriebenen Akkorden ist die Ausgabe eine andere, ändern sich die Einstellungen, wird alles neu umgewandelt.
+    version = VERSION if umschreiber is None else VERSION + "-" + umschreiber.kennung()
+    # Zwischenformat der Lieder im Cache: Ändert sich nur das Template, wird für jedes Lied nur das Template neu gefüllt.
+    # Nur auf Wunsch, der Speicher wird nicht aufgeräumt.
+    zwischenspeicher = None
+    if args.zwischenspeicher or args.nur_rendern:
+        cache = template_cache_dir()
+        if cache is None:
+            raise Exception("--zwischenspeicher und --nur-rendern brauchen den Cache, SONGBOOK_CACHE ist leer")
+        zwischenspeicher = Zwischenspeicher(os.path.join(cache, "zwischenformat"), version)
+    converter_optionen.update(akkorde=umschreiber, nur_rendern=args.nur_rendern, zwischenspeicher=zwischenspeicher,
+                              template_cache=args.template_cache)
+    indir, outdir, overwrite = args.indir, args.outdir, args.overwrite
+    if not (os.path.isdir(indir) and (args.bundle is not None or os.path.isdir(outdir))):
         raise Exception("dirctory not found")
 
-    # Dateien, die gelesen werden können
-    infiles = getInfiles(indir)
+    # Dateien, die gelesen werden können. Sortiert, damit die Reihenfolge der Ausgaben immer gleich ist.
+    # Mit --rekursiv auch aus den Unterverzeichnissen, aber nicht aus dem Ausgabeverzeichnis, falls es darin liegt.
+    infiles = getInfiles(indir, args.rekursiv, [] if outdir is None else [outdir])
+    bericht = Bericht(args.leise, args.langsamste)
+
+    if args.anthologie:
+        # die Lieder werden schon umgewandelt, während die Verzeichnisse noch gelesen werden
+        main_anthologie(args, infiles, bericht)
+        berichtAbschliessen(args, bericht, version)
+        return
+    infiles = list(infiles)
+    if args.bundle is not None:
+        main_bundle(args, infiles, bericht)
+        berichtAbschliessen(args, bericht, version)
+        return
+
+    template_hash = file_hash(template_file)
+    shard_manifest = None
+    if args.shard is not None:
+        # nur der eigene Teil, die Aufteilung hängt nur von Namen und Größen ab (DirEntry.stat ist zwischengespeichert)
+        nummer, anzahl = args.shard
+        groessen = [(infile.name, infile.stat().st_size) for infile in infiles]
+        teil = aufteilen(groessen, anzahl)[nummer - 1]
+        shard_manifest = ShardManifest(build_path(outdir, shard_manifest_name(nummer, anzahl)), nummer, anzahl,
+                                       version, template_hash, korpus_kennung(groessen), teil)
+        teil = set(teil)
+        print("Teil {}/{}: {} von {} Liedern, {} von {} Bytes".format(
+            nummer, anzahl, len(teil), len(infiles),
+            sum(groesse for name, groesse in groessen if name in teil), sum(groesse for _, groesse in groessen)))
+        infiles = [infile for infile in infiles if infile.name in teil]
 
-    # Converter laden:
-    converter = SongConverter(template_path=template_file)
-    
+    # Manifest der letzten Läufe: Lieder, deren Eingabe sich nicht geändert hat, werden übersprungen.
+    # Mit --shard hat jeder Teil ein eigenes, die Teile dürfen in dasselbe Ausgabeverzeichnis schreiben.
+    manifest = BuildManifest(build_path(outdir, manifest_name if args.shard is None else build_manifest_name(*args.shard)),
+                             version, template_hash)
+    manifest.prune(infile.name for infile in infiles)
+
+    jobs = []
+    hashes = []
+    aktuell = []  # (Eingabe, Hash, Ausgabepfad) der übersprungenen Lieder, für das Shard-Manifest
+    ausgaben = Ausgaben()  # liest jedes Ausgabeverzeichnis einmal, statt jede Ausgabedatei einzeln zu prüfen
     for infile in infiles:
         outfilename = get_outfilename(infile.name, outsuffix, insuffixes) # Dateiname für die Ausgabe
         outpath = build_path(outdir, outfilename)                         # Ausgabepfad 
 
+        inhash = file_hash(infile)
+        if not args.force and manifest.is_current(infile.name, inhash, outpath, ausgaben.vorhanden):
+            aktuell.append((infile, inhash, outpath))
+            continue # Ausgabe ist noch aktuell
+
         # Prüfen, ob ausgabedatei geschrieben werden kann / darf.
-        if not fileIsWriteable(outpath, overwrite):
+        if not ausgaben.schreibbar(outpath, overwrite):
             print(outfilename, ' darf nicht überschrieben werden. ', infile.name, " wird übersprungen.", file=sys.stderr)
+            bericht.ueberspringen("nicht überschreibbar")
+            if shard_manifest is not None:
+                shard_manifest.fehlgeschlagen(infile.name, outfilename + " darf nicht überschrieben werden")
             continue # Datei überspringen
-        
-        try:
-            convertFile(infile, outpath)
-        except Exception as e:
-            print('FEHLER bei Datei', infile, e, file=sys.stderr)
-     
+        ausgaben.anlegen(outpath)  # mit --rekursiv die Unterverzeichnisse der Ausgabe
+        jobs.append((infile, outpath))
+        hashes.append(inhash)
+
+    if aktuell:
+        bericht.ueberspringen("aktuell", len(aktuell))
+    if args.pipeline:
+        ausgaben = convertFilesPipeline(jobs, args.jobs, template_file, args.io, args.puffer, bericht)
+    elif args.profile is not None:
+        ausgaben = convertFilesProfiled(jobs, args.jobs, template_file, args.profile, bericht)
+    elif args.jobs > 1:
+        ausgaben = convertFilesParallel(jobs, args.jobs, template_file, bericht)
+    else:
+        # Converter nur laden, wenn es etwas umzuwandeln gibt
+        if jobs:
+            converter = SongConverter(template_path=template_file, **converter_optionen)
+        ausgaben = [_berichten(bericht, infile.name, erfolg, datei)
+                    for (infile, _), (erfolg, datei) in zip(jobs, runSequential(convertFile, jobs))]
+
+    # ausgaben: Status der Ausgabedatei (neu, aktualisiert, unverändert) oder None bei einem Fehler
+    for (infile, outpath), inhash, status in zip(jobs, hashes, ausgaben):
+        if status is not None:
+            manifest.record(infile.name, inhash, outpath)
+        else:
+            manifest.forget(infile.name)
+    manifest.save()
+    if shard_manifest is not None:
+        fertig = aktuell + [(infile, inhash, outpath) for (infile, outpath), inhash, status in zip(jobs, hashes, ausgaben)
+                            if status is not None]
+        for infile, inhash, outpath in fertig:
+            try:
+                shard_manifest.eintragen(infile.name, inhash, outpath, *kopfdaten(infile))
+            except Exception as e:
+                shard_manifest.fehlgeschlagen(infile.name, "Titel nicht lesbar: {}".format(e))
+        for (infile, _), status in zip(jobs, ausgaben):
+            if status is None:
+                shard_manifest.fehlgeschlagen(infile.name, "Umwandlung fehlgeschlagen")
+        shard_manifest.save()
+    berichtAbschliessen(args, bericht, version)
+
+    if args.watch:
+        if converter is None or args.profile is not None:
+            converter = SongConverter(template_path=template_file, **converter_optionen)
+        watch(indir, outdir, manifest, overwrite, args.interval, args.rekursiv)
+
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Grammatik.py
+# Bestimmt die Typen aller Zeilen eines Liedes gemeinsam statt Zeile für Zeile.
+# Die Zeilentypen bilden eine Markow-Kette (Überschrift -> Metadaten -> Akkord-/Textblöcke -> Info),
+# die (nicht normierten) Bewertungen aus Heuristik.py dienen als Emissionen. Nicht normiert, weil
+# der Kontext (z.B. nach einer Infozeile) sonst die Werte aller Typen der Zeile verschiebt.
+# Der wahrscheinlichste Pfad wird mit dem Viterbi-Algorithmus in O(n·k²) bestimmt (n Zeilen, k Typen).
+import math
+from typing import List, Optional, Tuple
+
+from lib.Heuristik.Heuristik import Lied_Merkmale, Typ_Wahrscheinlichkeiten, Zeilenmerkmale
+from lib.diagnose.diagnose import Diagnose, UNBESTIMMT, melden
+
+# Zustände. Die Reihenfolge entscheidet bei Gleichstand, wie bei max() in Line_Heuristik.
+zustaende = ("Überschrift", "Leer", "Akkordzeile", "Textzeile", "Info")
+_UEBER = 0
+_LEER = 1
+_INFO = 4
+_k = len(zustaende)
+
+_minus_unendlich = float("-inf")
+
+# Übergangsgewichte (nicht normiert, 0 = verboten) von Zeile i-1 (Zeile) zu Zeile i (Spalte).
+# Die Überschrift samt Metadaten steht am Anfang, danach kann sie nicht mehr vorkommen.
+# Auf die Überschrift folgt normalerweise eine Leerzeile. Das leicht geringere Gewicht für andere Typen
+# entscheidet, wenn eine Metadatenzeile genauso gut eine Textzeile sein könnte.
+# Ebenso wird eine unmarkierte Zeile nach einer Infozeile nur dann zur Info, wenn sie als Info besser passt als als Text.
+uebergaenge = (
+    #  Überschrift Leer Akkordzeile Textzeile Info
+    (1, 1, 0.99, 0.99, 0.99),  # Überschrift
+    (0, 1, 1, 1, 1),  # Leer
+    (0, 1, 1, 1, 1),  # Akkordzeile
+    (0, 1, 1, 1, 1),  # Textzeile
+    (0, 1, 1, 1, 0.99),  # Info
+)
+
+
+def _log(p: float) -> float:
+    return math.log(p) if p > 0 else _minus_unendlich
+
+
+_log_uebergaenge = tuple(tuple(_log(p) for p in zeile) for zeile in uebergaenge)
+
+
+def _bewertung(m: Zeilenmerkmale, lineNr: int, begonnen: bool, leer_davor: bool, nach_info: bool) -> dict:
+    return Typ_Wahrscheinlichkeiten(m, lineNr, (), begonnen=begonnen, leer_davor=leer_davor, nach_info=nach_info,
+                                    normieren=False)
+
+
+def _emission(p: dict) -> Tuple[List[float], List[str]]:
+    # log-Wahrscheinlichkeiten aller Zustände und die Rangfolge aller Typen in diesem Kontext
+    return [_log(p[typ]) for typ in zustaende], sorted(p, key=p.get, reverse=True)
+
+
+def Grammatik(zeilen: List[str], erste_nr: int = 0, nach_leerzeile: bool = False,
+              diagnosen: Optional[List[Diagnose]] = None) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """Eingabe: liste aus Strings, jeder string entspricht einer Zeile
+    Ausgabe: wie Heuristik(), also [(zeile, typ, zweitwahrscheinlichster typ), ...].
+    typ ist der gewählte Typ auf dem wahrscheinlichsten Pfad und nie None.
+
+    Ein Lied kann auch abschnittsweise bestimmt werden, jeweils bis einschließlich einer leeren Zeile ('').
+    Eine leere Zeile kann nur vom typ Leer sein, deshalb ist das Ergebnis dasselbe wie für das ganze Lied.
+    erste_nr: Zeilennummer der ersten Zeile im Lied
+    nach_leerzeile: True, wenn die Zeile vor der ersten Zeile leer ('') ist
+    diagnosen: optional eine Liste (siehe lib/diagnose). Für jede Zeile, die nach der Heuristik zu keinem Typ passt
+               ("none" vorne) und nur wegen des Pfades einen Typ bekommt, wird ein Hinweis angehängt."""
+    n = len(zeilen)
+    if n == 0:
+        return []
+    merkmale = Lied_Merkmale(zeilen)
+
+    # Für die Strophennummer reicht es zu wissen, ob eine der beiden vorherigen Zeilen leer sein könnte.
+    # Das wird ohne Kontext bestimmt, so bleibt das Modell erster Ordnung.
+    # Die Bewertung im Lied ohne Leerzeile davor wird außerdem als Emission wiederverwendet.
+    leer_moeglich = []
+    im_lied = []
+    for nr, m in enumerate(merkmale):
+        p = _bewertung(m, erste_nr + nr, True, False, False)
+        im_lied.append(p)
+        leer_moeglich.append("Leer" in sorted(p, key=p.get, reverse=True)[:2])
+
+    # Die Emissionen hängen davon ab, ob die vorherige Zeile zur Überschrift gehört (Lied hat noch nicht begonnen),
+    # eine Infozeile ist (unmarkierte Fortsetzung möglich) oder etwas anderes.
+    delta = [_minus_unendlich] * _k   # log-Wahrscheinlichkeit des besten Pfades, der im Zustand endet
+    if nach_leerzeile:
+        delta[_LEER] = 0.0
+        leer_moeglich.insert(0, True)  # die leere Zeile davor
+    zurueck = []                      # je Zeile und Zustand: bester vorheriger Zustand
+    rangfolgen = []                   # je Zeile und Zustand: Rangfolge der Typen im verwendeten Kontext
+    for nr in range(n):
+        m = merkmale[nr]
+        lineNr = erste_nr + nr
+        i = nr + nach_leerzeile  # Index der Zeile in leer_moeglich
+        leer_davor = lineNr > 1 and (leer_moeglich[i - 1] or (i > 1 and leer_moeglich[i - 2]))
+        if nr == 0 and not nach_leerzeile:
+            e, rang = _emission(_bewertung(m, lineNr, False, leer_davor, False))
+            delta = e
+            zurueck.append([None] * _k)
+            rangfolgen.append([rang] * _k)
+            continue
+        kontexte = dict()  # Kontext -> (Emission, Rangfolge), nur berechnet, wenn ein Vorgänger erreichbar ist
+        neu = [_minus_unendlich] * _k
+        bester_vorgaenger = [0] * _k
+        rang_je_zustand = [None] * _k
+        for z in range(_k):
+            for v in range(_k):
+                if delta[v] == _minus_unendlich or _log_uebergaenge[v][z] == _minus_unendlich:
+                    continue
+                kontext = 'kopf' if v == _UEBER else 'info' if v == _INFO else 'lied'
+                if kontext not in kontexte:
+                    if kontext == 'lied' and not (leer_davor and m.strophennummer >= 0):
+                        p = im_lied[nr]  # leer_davor spielt nur für Strophennummern eine Rolle
+                    else:
+                        p = _bewertung(m, lineNr, kontext != 'kopf', leer_davor, kontext == 'info')
+                    kontexte[kontext] = _emission(p)
+                e, rang = kontexte[kontext]
+                wert = delta[v] + _log_uebergaenge[v][z] + e[z]
+                if wert > neu[z]:
+                    neu[z] = wert
+                    bester_vorgaenger[z] = v
+                    rang_je_zustand[z] = rang
+        delta = neu
+        zurueck.append(bester_vorgaenger)
+        rangfolgen.append(rang_je_zustand)
+
+    # Pfad zurückverfolgen
+    z = max(range(_k), key=lambda i: delta[i])
+    pfad = [0] * n
+    for nr in range(n - 1, -1, -1):
+        pfad[nr] = z
+        z = zurueck[nr][z]
+
+    erg = []
+    for nr in range(n):
+        typ = zustaende[pfad[nr]]
+        rang = rangfolgen[nr][pfad[nr]] or []
+        zweite = next((t for t in rang if t != typ), "none")
+        if rang and rang[0] == "none":
+            melden(diagnosen, UNBESTIMMT, erste_nr + nr + 1, "Typ der Zeile unklar, verwendet als {}".format(typ))
+        erg.append((merkmale[nr].line, typ, zweite if zweite != "none" else None))
+    return erg
@@ -1,6 +1,10 @@
 # Heuristik.py
 # Dieses Skript bestimmt die Warscheinlichkeit, dass eine Zeile eine Textzeile, überschrift, etc ist.
 import re
+from operator import methodcaller
+
+# Version der Heuristik. Muss erhöht werden, wenn sich die Klassifikation gleicher Zeilen ändert.
+VERSION = "4"
 
 _typen = dict(Überschrift="Überschrift", Leer="Leer", Akkordzeile="Akkordzeile", Textzeile="Textzeile",
               Info="Info")
@@ -10,6 +14,224 @@ _Ueber_starts = set("wuw jahr j mel melodie weise melj meljahr txt worte text tx
 # Regex - Ausdrücke, die für die erkennung gebraucht werden.
 akkord_zeilen_regex = r"( *([:|]+|(\(?([A-Ha-h](#|b)?(sus|dim|add|maj)?\d*)(\/([A-Ha-h](#|b)?(sus|dim|add|maj)?\d*))*\)?)))+ *"
 akkord_regex = r"(\(?([A-Ha-h](#|b)?(sus|dim|add|maj)?\d*)(\/([A-Ha-h](#|b)?(sus|dim|add|maj)?\d*))*\)?)"
+# Vorkompiliert, der Ausdruck wird für jedes Wort gebraucht. Akkordzeilen erkennt ist_akkordzeile.
+_akkord_re = re.compile(akkord_regex)
+_strophennummer_re = re.compile(r"^\d*\)")
+
+
+# Akkordzeilen werden nicht mit akkord_zeilen_regex erkannt, sondern mit einem endlichen Automaten für dieselbe Sprache.
+# Die verschachtelten Wiederholungen im Ausdruck lassen re bei Zeilen, die erst am Ende scheitern
+# (z.B. viele "|: A :|" und dann ein Wort), exponentiell viele Zerlegungen ausprobieren. Der Automat liest jedes Zeichen
+# genau einmal. Er wird beim Import aus dem nichtdeterministischen Automaten unten gebaut (Potenzmengenkonstruktion).
+_gross = "ABCDEFGH"
+_klein = "abcdefgh"
+_ziffern = "0123456789"
+
+
+def _akkordzeilen_nea():
+    # Zustände des nichtdeterministischen Automaten: Name -> [(Zeichen, Folgezustand), ...] und die Endzustände.
+    # "anfang": noch kein Akkord, "ende": nach einem vollständigen Teil ([:|]+, Akkord oder ")")
+    # G, G#: Grundton groß (mit Vorzeichen), g, g#: klein, zusatz: nach sus/dim/add/maj, ziffern: nach \d
+    nea = dict()
+    teil_anfang = [(c, "ende") for c in ":|"] + [("(", "klammer")] + [(c, "G") for c in _gross] + [(c, "g") for c in _klein]
+    grundton = [(c, "G") for c in _gross] + [(c, "g") for c in _klein]
+    zusatz = [("s", "s"), ("d", "d"), ("a", "a"), ("m", "m")]
+    # nach einem vollständigen Akkord: Ziffern, /Bass, ")" oder gleich der nächste Teil (die Leerzeichen sind optional)
+    akkord_ende = [(c, "ziffern") for c in _ziffern] + [("/", "strich"), (")", "ende"), (" ", "ende")] + teil_anfang
+    nea["anfang"] = [(" ", "anfang")] + teil_anfang
+    nea["ende"] = [(" ", "ende")] + teil_anfang
+    nea["klammer"] = grundton
+    nea["strich"] = grundton
+    nea["G"] = [("#", "G#"), ("b", "G#")] + zusatz + akkord_ende
+    nea["G#"] = zusatz + akkord_ende
+    nea["g"] = [("#", "g#"), ("b", "g#")] + zusatz + akkord_ende
+    nea["g#"] = zusatz + akkord_ende
+    for wort in ("sus", "dim", "add", "maj"):
+        for i in range(1, len(wort)):
+            nea.setdefault(wort[:i], []).append((wort[i], "zusatz" if i == len(wort) - 1 else wort[:i+1]))
+    nea["zusatz"] = akkord_ende
+    nea["ziffern"] = akkord_ende
+    return nea, {"ende", "G", "G#", "g", "g#", "zusatz", "ziffern"}
+
+
+def _akkordzeilen_automat():
+    # deterministischer Automat: Liste von {Zeichen: Folgezustand} und die Menge der Endzustände, Startzustand 0
+    nea, nea_ende = _akkordzeilen_nea()
+    zustaende = [frozenset(["anfang"])]
+    nummern = {zustaende[0]: 0}
+    uebergaenge = []
+    for menge in zustaende:  # die Liste wächst dabei
+        folge = dict()
+        for name in sorted(menge):
+            for zeichen, ziel in nea[name]:
+                folge.setdefault(zeichen, set()).add(ziel)
+        tabelle = dict()
+        for zeichen, ziele in folge.items():
+            ziele = frozenset(ziele)
+            if ziele not in nummern:
+                nummern[ziele] = len(zustaende)
+                zustaende.append(ziele)
+            tabelle[zeichen] = nummern[ziele]
+        uebergaenge.append(tabelle)
+    return uebergaenge, frozenset(nr for nr, menge in enumerate(zustaende) if menge & nea_ende)
+
+
+_akkordzeilen_uebergaenge, _akkordzeilen_ende = _akkordzeilen_automat()
+
+
+_akkordwort_cache = dict()
+
+
+def _akkordwort(wort:str)->bool:
+    # True, wenn wort (ohne Leerzeichen) aus einem oder mehreren Akkorden, | und : besteht
+    try:
+        return _akkordwort_cache[wort]
+    except KeyError:
+        pass
+    uebergaenge = _akkordzeilen_uebergaenge
+    zustand = 0
+    for zeichen in wort:
+        zustand = uebergaenge[zustand].get(zeichen)
+        if zustand is None:
+            break
+    erg = zustand in _akkordzeilen_ende
+    if len(_akkordwort_cache) < 100000:  # Speicher begrenzen
+        _akkordwort_cache[wort] = erg
+    return erg
+
+
+def ist_akkordzeile(zeile:str)->bool:
+    """True, wenn die ganze zeile aus Akkorden, | und : besteht, genau wie akkord_zeilen_regex.
+    Die Laufzeit wächst nur linear mit der Länge der Zeile.
+    Nach einem Leerzeichen ist der Automat immer im selben Zustand, deshalb wird jedes Wort einzeln geprüft
+    und das Ergebnis wie bei ist_akkord zwischengespeichert."""
+    woerter = [wort for wort in zeile.split(' ') if wort]
+    return bool(woerter) and all(map(_akkordwort, woerter))
+
+
+# Zeichen, die in Textzeilen vorkommen dürfen
+_text_zeichen = " ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzÄÖÜäöüß.,-:;…–\"?!"
+# Übersetzungstabelle, die alle erlaubten Zeichen löscht. Übrig bleiben die fremden Zeichen.
+_fremd_tabelle = str.maketrans('', '', _text_zeichen)
+
+# In einem Liederbuch wiederholen sich die selben paar Akkorde ständig.
+_akkord_cache = dict()
+
+
+def ist_akkord(wort:str)->bool:
+    """True, wenn wort ein einzelner Akkord ist. Die Ergebnisse werden zwischengespeichert."""
+    try:
+        return _akkord_cache[wort]
+    except KeyError:
+        erg = _akkord_re.fullmatch(wort) is not None
+        if len(_akkord_cache) < 100000:  # Speicher begrenzen
+            _akkord_cache[wort] = erg
+        return erg
+
+
+# 0.85**n, berechnet durch wiederholtes Multiplizieren. So ist das Ergebnis bis aufs letzte Bit
+# gleich, wie wenn für jedes fremde Zeichen einzeln mit 0.85 multipliziert wird.
+# Die Tabelle wird beim Import fertig berechnet und danach nicht mehr verändert, mehrere Threads können sie
+# also gleichzeitig lesen. Zeilen mit mehr fremden Zeichen sind selten, sie werden ohne die Tabelle weitergerechnet.
+_potenzen = [1]
+for _ in range(512):
+    _potenzen.append(_potenzen[-1] * 0.85)
+del _
+
+
+def _p085(n:int)->float:
+    if n < len(_potenzen):
+        return _potenzen[n]
+    p = _potenzen[-1]
+    for _ in range(n - len(_potenzen) + 1):
+        p *= 0.85
+    return p
+
+
+class Zeilenmerkmale():
+    __slots__ = ('line', 'lower', 'ohne_leer', 'ohne_umbruch', 'fremdzeichen', 'doppelleer', 'striche',
+                 'strophennummer', 'klammern_auf', 'klammern_zu', 'praefix', 'info_markiert', 'akkordzeile',
+                 'akkorde', 'woerter', '_info_rest')
+
+    def __init__(self, line:str, fremdzeichen:int=None, doppelleer:int=None, striche:int=None):
+        # fremdzeichen, doppelleer, striche: können für ganze Lieder vorab berechnet werden, siehe zeichen_zaehlen
+        self.line = line
+        self.lower = line.lower()
+        self.ohne_leer = len(line) - line.count(' ')               # Anzahl der Zeichen ohne Leerzeichen
+        self.ohne_umbruch = len(line) - line.count('\r') - line.count('\n')  # Anzahl der Zeichen ohne Zeilenumbrüche
+        if fremdzeichen is None:
+            fremdzeichen = len(line.translate(_fremd_tabelle))
+        if doppelleer is None:
+            doppelleer = line.count('  ')
+        if striche is None:
+            striche = line.count('|')
+        self.fremdzeichen = fremdzeichen  # Zeichen, die nicht in Text gehören
+        self.doppelleer = doppelleer      # doppelte Leerzeichen
+        self.striche = striche            # Anzahl der |
+        match = _strophennummer_re.search(line)
+        self.strophennummer = len(match.group(0)) if match is not None else -1  # Länge von z.B. "1)", sonst -1
+        self.klammern_auf = line.count('[')
+        self.klammern_zu = line.count(']')
+        # alles vor dem ersten Doppelpunkt, klein geschrieben. None, wenn es keinen gibt.
+        i = self.lower.find(':')
+        self.praefix = self.lower[:i] if i >= 0 else None
+        l = self.lower.strip(' ')
+        self.info_markiert = l.startswith('@info') or l.startswith('info ') or l.startswith('info:')
+        # prüfe, ob die zeile der Grammatik entspricht:
+        self.akkordzeile = ist_akkordzeile(line.replace('\n', ''))
+        # zerlege in zusammenhängenden text und prüfe, welche Wörter akkorde sind.
+        parts = line.split(' ')
+        self.akkorde = tuple(filter(ist_akkord, parts))
+        self.woerter = len(parts)
+        self._info_rest = None
+
+    def info_rest(self):
+        """Merkmale der Zeile ohne das Infolabel, werden nur bei Bedarf berechnet."""
+        if self._info_rest is None:
+            self._info_rest = Zeilenmerkmale(self.line.lstrip(' ')[5:])
+        return self._info_rest
+
+    __doc__ = "Merkmale einer Zeile, die von allen p_...-Funktionen gebraucht werden. Werden einmal je Zeile berechnet."
+
+
+def zeichen_zaehlen(zeilen):
+    """Zählt für alle Zeilen eines Liedes auf einmal die fremden Zeichen, doppelten Leerzeichen und |.
+    Jede Zählung ist ein einziger Durchlauf über alle Zeilen, ohne Python-Schleife je Zeile oder Zeichen.
+    Ausgabe: (fremdzeichen, doppelleer, striche), jeweils eine Liste mit einem Eintrag je Zeile"""
+    fremdzeichen = list(map(len, map(methodcaller('translate', _fremd_tabelle), zeilen)))
+    doppelleer = list(map(methodcaller('count', '  '), zeilen))
+    striche = list(map(methodcaller('count', '|'), zeilen))
+    return fremdzeichen, doppelleer, striche
+
+
+def Lied_Merkmale(zeilen):
+    """Merkmale aller Zeilen eines Liedes. Zeilenumbrüche am Zeilenende werden entfernt."""
+    zeilen = [zeile.replace('\n', '').replace('\r', '') for zeile in zeilen]  # Zeilenumbrüche entfernen
+    return list(map(Zeilenmerkmale, zeilen, *zeichen_zaehlen(zeilen)))
+
+
+def merkmale(line)->Zeilenmerkmale:
+    """Merkmale einer Zeile. line darf auch bereits ein Zeilenmerkmale-Objekt sein."""
+    if isinstance(line, Zeilenmerkmale):
+        return line
+    return Zeilenmerkmale(line)
+
+
+# Kontext einer Zeile. Kann aus den vorherigen Ergebnissen (prev) abgeleitet
+# oder, z.B. von Grammatik.py, direkt angegeben werden.
+def _begonnen(prev)->bool:
+    # Das Lied hat begonnen, sobald eine vorherige Zeile weder Überschrift noch unbestimmt ist.
+    return any(frame[1] not in ("Überschrift", None) for frame in prev)
+
+
+def _leer_davor(prev)->bool:
+    # Eine der beiden vorherigen Zeilen könnte leer sein
+    return len(prev) > 1 and ("Leer" in prev[-1] or "Leer" in prev[-2])
+
+
+def _nach_info(prev)->bool:
+    # Die vorherige Zeile könnte eine Infozeile sein
+    return len(prev) > 0 and _typen["Info"] in prev[-1][1:]
 
 
 def Heuristik(zeilen):
@@ -18,31 +240,40 @@ def Heuristik(zeilen):
     # standart: typ, der verwendet wird, wenn der gesuchte typ nicht in typen enthalten ist.
 
     erg = list()
-    for zeilenNr in range(len(zeilen)):
-        zeile = zeilen[zeilenNr]
-        zeile = zeile.replace('\n', '').replace('\r', '')     # Zeilenumbrüche entfernen
-
-        erg.append(Line_Heuristik(zeile, zeilenNr, prev=erg))
+    begonnen = False  # wird mitgeführt, statt für jede Zeile alle vorherigen zu durchsuchen
+    for zeilenNr, m in enumerate(Lied_Merkmale(zeilen)):
+        erg.append(Line_Heuristik(m, zeilenNr, prev=erg, begonnen=begonnen))
+        begonnen = begonnen or erg[-1][1] not in ("Überschrift", None)
     
     return erg
 
 
-def Line_Heuristik(line, lineNr, prev):
-    # line:      Die zu klassifizierende Zeile
+def Typ_Wahrscheinlichkeiten(line, lineNr, prev, begonnen=None, leer_davor=None, nach_info=None, normieren=True)->dict:
+    # line:      Die zu klassifizierende Zeile (str oder Zeilenmerkmale)
     # lineNr:    Die zeilennummer der zeile (angefangen bei 0)
     # prev:      Die typen der vorhergehenden lineNr Zeilen
-    # Standart:  typ der verwendet wird, wenn nichts erkannt wird.
-    
-    # Ausgabe:   Liste der möglichen erkannten typen mit dazugehöriger Warscheinlichkeit
+    # begonnen, leer_davor, nach_info: Kontext der Zeile. None: wird aus prev bestimmt.
+    # normieren: False gibt die Werte vor dem Normieren zurück. Die Reihenfolge der typen ist dieselbe.
+
+    # Ausgabe:   normierte Warscheinlichkeiten aller typen, "none" für unbrauchbare Zeilen
+    m = merkmale(line)
+    if begonnen is None:
+        begonnen = _begonnen(prev)
+    if leer_davor is None:
+        leer_davor = _leer_davor(prev)
+    if nach_info is None:
+        nach_info = _nach_info(prev)
     
-    if line == '':                     p_leer = 1
-    elif line.replace(' ', '') == '':  p_leer = 0.65
-    else:                              p_leer = 1/(2+len(line.replace(' ', '')))
-    p_ueber = p_Ueberschrift(line, lineNr, prev)
-    p_text  = p_Textzeile(line, lineNr, prev)
-    p_akk   = p_Akkordzeile(line, lineNr, prev)
-    p_info  = p_Information(line, lineNr, prev)
+    if m.line == '':         p_leer = 1
+    elif m.ohne_leer == 0:   p_leer = 0.65
+    else:                    p_leer = 1/(2+m.ohne_leer)
+    p_ueber = p_Ueberschrift(m, lineNr, prev, begonnen=begonnen)
+    p_text  = p_Textzeile(m, lineNr, prev, p_ueber=p_ueber, leer_davor=leer_davor)
+    p_akk   = p_Akkordzeile(m, lineNr, prev)
+    p_info  = p_Information(m, lineNr, prev, begonnen=begonnen, leer_davor=leer_davor, nach_info=nach_info)
     p_none = max(1 - (p_leer + p_ueber + p_text + p_akk + p_info), 0) #Abschätzung der warscheinlichkeit, dass diese zeile für gar nichts zu brauchen ist.
+    if not normieren:
+        return dict(Überschrift=p_ueber, Leer=p_leer, Akkordzeile=p_akk, Textzeile=p_text, Info=p_info, none=p_none)
     
     # Wahrscheinlichkeiten Normieren
     summe = p_ueber + p_text + p_akk + p_info + p_none + p_leer
@@ -53,90 +284,104 @@ def Line_Heuristik(line, lineNr, prev):
     p_none  /= summe
     p_leer  /= summe
 
-    erg = dict(Überschrift=p_ueber, Leer=p_leer, Akkordzeile=p_akk, Textzeile=p_text, Info=p_info, none=p_none)
+    return dict(Überschrift=p_ueber, Leer=p_leer, Akkordzeile=p_akk, Textzeile=p_text, Info=p_info, none=p_none)
+
+
+def Line_Heuristik(line, lineNr, prev, begonnen=None):
+    # line:      Die zu klassifizierende Zeile (str oder Zeilenmerkmale)
+    # lineNr:    Die zeilennummer der zeile (angefangen bei 0)
+    # prev:      Die typen der vorhergehenden lineNr Zeilen
+    # begonnen:  Hat das Lied schon begonnen? None: wird aus prev bestimmt.
+    # Standart:  typ der verwendet wird, wenn nichts erkannt wird.
+    
+    # Ausgabe:   Liste der möglichen erkannten typen mit dazugehöriger Warscheinlichkeit
+    m = merkmale(line)
+    erg = Typ_Wahrscheinlichkeiten(m, lineNr, prev, begonnen=begonnen)
     
     # gebe die wahrscheinlichste und die zweitwahrscheinlichste lösung zurück
-    beste = max(erg, key=lambda key: erg[key])
+    beste = max(erg, key=erg.get)
     erg.pop(beste)
-    zweite = max(erg, key=lambda key: erg[key])
+    zweite = max(erg, key=erg.get)
     erg.pop(zweite)
-    return(line, beste if beste != "none" else None, zweite if zweite != "none" else None)
+    return(m.line, beste if beste != "none" else None, zweite if zweite != "none" else None)
 
 
-def p_Textzeile(line, lineNr, prev):
-    p_text = 1
+def p_Textzeile(line, lineNr, prev, p_ueber=None, leer_davor=None):
+    # p_ueber: bereits berechnete Wahrscheinlichkeit für eine Überschrift, sonst wird sie hier berechnet
+    # leer_davor: steht vor der Zeile eine Leerzeile? None: wird aus prev bestimmt.
+    m = merkmale(line)
     # Es muss zumindest irgendwas in der zeile stehen.
     # Eine Leerzeile ist keine Textzeile
-    if line.replace('\r', '').replace('\n', '') == '':
+    if m.ohne_umbruch == 0:
         return 0
-    for zeichen in line:
-        if zeichen not in " ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyzÄÖÜäöüß.,-:;…–\"?!":
-            p_text *= 0.85                    # Textzeilen sollten nur text enthalten.
-    p_text *= 0.85 ** line.count('  ')     # Doppelte leerzeichen deuten auf Akkordzeilen hin
+    p_text = _p085(m.fremdzeichen)         # Textzeilen sollten nur text enthalten.
+    p_text *= 0.85 ** m.doppelleer         # Doppelte leerzeichen deuten auf Akkordzeilen hin
     # Erlaube zwei Wiederholungszeichen (:|, |: oder :|:) pro zeile, bevor der die Warscheinlichkeit sinkt
-    p_text /= 0.85 ** min(line.count("|"), 2)
+    p_text /= 0.85 ** min(m.striche, 2)
 
     # Prüfe auf ggf. vorhandene Strophennummern.
-    match = re.search(r"^\d*\)", line)
-    if match is not None:
-        if len(prev) > 1:
-            if "Leer" in prev[-1] or "Leer" in prev[-2]:
-                p_text /= 0.85 ** len(match.group(0)) # kein Fehler, wenn die Strophennummer auf eine Leerzeile folgt.
-                p_text += min((1 - p_text) / 3, 0.15)  # Strophennummern kommen meistens in Textzeilen vor.
+    if m.strophennummer >= 0:
+        if leer_davor is None:
+            leer_davor = _leer_davor(prev)
+        if leer_davor:
+            p_text /= 0.85 ** m.strophennummer # kein Fehler, wenn die Strophennummer auf eine Leerzeile folgt.
+            p_text += min((1 - p_text) / 3, 0.15)  # Strophennummern kommen meistens in Textzeilen vor.
     # Wenn es sich um eine Überschrift handeln könnte, reduziere die Wahrscheinlichkeit für text.
-    p_text *= 1-p_Ueberschrift(line, lineNr, prev) 
+    if p_ueber is None:
+        p_ueber = p_Ueberschrift(m, lineNr, prev)
+    p_text *= 1-p_ueber
     return p_text
 
 
 def p_Akkordzeile(line, lineNr, prev):
-    # prüfe, ob die zeile der Grammatik entspricht:
-    if re.fullmatch(akkord_zeilen_regex, line.replace('\n', '')) is not None:
+    m = merkmale(line)
+    # die zeile entspricht der Grammatik
+    if m.akkordzeile:
         return 1
-    # zerlege in zusammenhängenden text und prüfe, wie groß der Anteil an akkorden ist.
-    parts = line.split(' ')
-    korrekte = 0   # Anzahl erkannter Akkorde
-    inkorrekte = 0 # Anzahl nicht als Akkord erkannter Wörter
-    for pot_Akk in parts:
-        if re.fullmatch(akkord_regex, pot_Akk) is not None:
-            korrekte += 1
-        else: 
-            inkorrekte += 1
-    return korrekte/(korrekte+inkorrekte)
-
-
-def p_Ueberschrift(line, lineNr, prev):
+    # Anteil der akkorde an allen Wörtern
+    return len(m.akkorde)/m.woerter
+
+
+def p_Ueberschrift(line, lineNr, prev, begonnen=None):
     # line:      Die zu klassifizierende Zeile
     # lineNr:    Die zeilennummer der zeile (angefangen bei 0)
     # prev:      Die typen der vorhergehenden lineNr Zeilen
+    # begonnen:  Hat das Lied schon begonnen? None: wird aus prev bestimmt (kostet Zeit proportional zu len(prev)).
     
     # Ausgabe: warscheinlichkeit, dasss line eine Überschrift ist.
-    if len(prev) != 0:
+    m = merkmale(line)
+    if begonnen is None:
         #prüfe, ob die vorherigen zeilen entweder leer, none oder überschrift sind.
-        if 0 != len(set(prev[i][1] for i in range(len(prev))).difference({"Überschrift", None})):
-            return 0 # Das lied hat bereits begonnen
+        begonnen = _begonnen(prev)
+    if begonnen:
+        return 0 # Das lied hat bereits begonnen
 
-    if line.replace(' ', '') == '': return 0     # Zeile ist leer
+    if m.ohne_leer == 0: return 0     # Zeile ist leer
     p = 0.5
     if lineNr <= 1:
         # erste zeile: hier stehen titel und alt. titel
-        if line.count("[") == line.count("]"):
-            if line.count("[") == 1:
+        if m.klammern_auf == m.klammern_zu:
+            if m.klammern_auf == 1:
                 return 1
             else: 
                 return 0.75
-        else:   #Klammerausdruck ist nicht balancliert
-            print ("Vermutlich ein Tippfehler in der ersten Zeile")
-    for start in _Ueber_starts:
-        if line.lower().startswith(start+':'):
-            return 1
+        # sonst ist der Klammerausdruck nicht balanciert, vermutlich ein Tippfehler.
+        # Den Hinweis gibt SongConverter.meta_aus_titel (siehe lib/diagnose), hier wird nichts ausgegeben.
+    # Metadaten: schlüssel: wert
+    if m.praefix in _Ueber_starts:
+        return 1
     return p
 
 
-def p_Information(line, lineNr, prev):
-    l = line.lower().strip(' ')
-    if l.startswith('@info') or l.startswith('info ') or l.startswith('info:'): # Markierte Zeile
+def p_Information(line, lineNr, prev, begonnen=None, leer_davor=None, nach_info=None):
+    # nach_info: folgt die Zeile auf eine Infozeile? None: wird aus prev bestimmt.
+    m = merkmale(line)
+    if m.info_markiert: # Markierte Zeile
         return 1
-    if len(prev)>0 and _typen["Info"] in prev[-1][1:]: # Nicht markierte zeile
-        return p_Textzeile(line.lstrip(' ')[5:], lineNr, prev)
+    if nach_info is None:
+        nach_info = _nach_info(prev)
+    if nach_info: # Nicht markierte zeile
+        rest = m.info_rest()
+        return p_Textzeile(rest, lineNr, prev, p_ueber=p_Ueberschrift(rest, lineNr, prev, begonnen=begonnen),
+                           leer_davor=leer_davor)
     return 0
-
@@ -0,0 +1,144 @@
+# akkorde.py
+# Zerlegt Akkorde in Grundton, Moll, Zusatz und Bass, schreibt sie in einem einheitlichen Schema
+# (z.B. deutsch mit H und B oder englisch mit B und Bb) und transponiert sie.
+# In einem Liederbuch wiederholen sich dieselben paar Dutzend Akkorde ständig, deshalb werden die Ergebnisse
+# für jede Schreibweise nur einmal berechnet.
+# Ein Wort einer Akkordzeile kann mehrere Akkorde enthalten, genau wie es die Heuristik als Akkordzeile erkennt:
+# Takt- und Wiederholungszeichen ohne Leerzeichen davor oder danach (|:G, D:|), Klammern um mehrere Wörter ((G D)),
+# mehrere Basstöne (C/E/G) oder Akkorde direkt hintereinander (GD). Jeder Akkord darin wird einzeln umgeschrieben.
+import re
+from typing import Dict, NamedTuple, Optional, Tuple
+
+
+class Akkord(NamedTuple):
+    grundton: int         # Halbtöne über C, 0 bis 11
+    moll: bool            # Moll: kleiner Grundton (a) oder m, min, moll (Am)
+    zusatz: str           # Qualität und Erweiterungen, wie sie geschrieben sind: 7, maj7, sus4, dim, add9, ...
+    bass: Optional[int]   # Basston bei C/E (Halbtöne über C) oder None
+    klammer: bool         # in Klammern geschrieben: (G7)
+
+
+class Schema(NamedTuple):
+    namen: Tuple[str, ...]  # Name jedes der 12 Töne, bei C beginnend
+    moll_klein: bool        # Moll mit kleinem Grundton (a) statt mit m (Am)
+
+
+# Ausgabeschemata für --akkorde
+SCHEMATA: Dict[str, Schema] = {
+    "deutsch": Schema(("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "B", "H"), False),
+    "deutsch-klein": Schema(("C", "Cis", "D", "Es", "E", "F", "Fis", "G", "As", "A", "B", "H"), True),
+    "englisch": Schema(("C", "C#", "D", "Eb", "E", "F", "F#", "G", "Ab", "A", "Bb", "B"), False),
+}
+
+# Stammtöne. B ist im deutschen Schema der Ton Bb, im englischen der Ton H.
+_stammtoene = dict(c=0, d=2, e=4, f=5, g=7, a=9, h=11)
+_vorzeichen = {None: 0, '#': 1, 'is': 1, 'b': -1, 'es': -1, 's': -1}
+# Vorzeichen s nur bei As und Es, und nicht als Anfang von sus (Esus4)
+_vz = r"is|es|(?<=[AaEe])s(?!us)|#|b"
+_grundakkord = (r"(?P<ton>[A-Ha-h])(?P<vz>" + _vz + r")?(?P<moll>moll|min|m(?!aj))?"
+                r"(?P<zusatz>(?:sus|dim|aug|add|maj|[0-9+#b°])*)")
+_akkord_re = re.compile(r"(?P<klammer>\()?" + _grundakkord +
+                        r"(?:/(?P<bass>[A-Ha-h])(?P<bassvz>" + _vz + r")?)?(?(klammer)\))")
+# Ein Teil eines Wortes mit mehreren Akkorden: Takt- und Wiederholungszeichen oder eine Klammer, ein Basston (/E, nur
+# wenn danach kein Akkord weitergeht, sonst ist es ein ganzer Akkord nach /) oder ein Akkord ohne Klammer und Bass
+_teil_re = re.compile(r"(?P<zeichen>[:|]+|[()])|/(?P<bass>[A-Ha-h])(?P<bassvz>" + _vz + r")?(?![A-Za-z0-9#+°])"
+                      r"|(?P<strich>/)?" + _grundakkord)
+
+# Speicher begrenzen, falls sehr viele verschiedene Wörter umgewandelt werden
+_max_cache = 100000
+_cache: Dict[Tuple[str, str], Optional[Akkord]] = dict()
+
+
+def _halbtoene(ton: str, vorzeichen: Optional[str], eingabe: str) -> int:
+    ton = ton.lower()
+    if ton == 'b':
+        # deutsch: B ist schon erniedrigt, Bb ist trotzdem Bb
+        return 10 if eingabe != "englisch" else (11 + _vorzeichen[vorzeichen]) % 12
+    return (_stammtoene[ton] + _vorzeichen[vorzeichen]) % 12
+
+
+def akkord(wort: str, eingabe: str = "deutsch") -> Optional[Akkord]:
+    """zerlegt wort in einen Akkord, None, wenn wort kein Akkord ist (z.B. Wiederholungszeichen |: oder x2).
+    eingabe: "englisch", wenn B den Ton H bedeutet, sonst wird B als Bb gelesen.
+    Die Ergebnisse werden zwischengespeichert."""
+    try:
+        return _cache[wort, eingabe]
+    except KeyError:
+        pass
+    match = _akkord_re.fullmatch(wort)
+    if match is None:
+        erg = None
+    else:
+        ton = match.group("ton")
+        bass = match.group("bass")
+        erg = Akkord(grundton=_halbtoene(ton, match.group("vz"), eingabe),
+                     moll=ton.islower() or match.group("moll") is not None,
+                     zusatz=match.group("zusatz"),
+                     bass=None if bass is None else _halbtoene(bass, match.group("bassvz"), eingabe),
+                     klammer=match.group("klammer") is not None)
+    if len(_cache) < _max_cache:
+        _cache[wort, eingabe] = erg
+    return erg
+
+
+def schreiben(akk: Akkord, schema: Schema, halbtoene: int = 0) -> str:
+    """schreibt akk im schema, um halbtoene transponiert"""
+    name = schema.namen[(akk.grundton + halbtoene) % 12]
+    if akk.moll:
+        name = name.lower() if schema.moll_klein else name + "m"
+    erg = name + akk.zusatz
+    if akk.bass is not None:
+        erg += "/" + schema.namen[(akk.bass + halbtoene) % 12]
+    return "(" + erg + ")" if akk.klammer else erg
+
+
+class Umschreiber():
+    def __init__(self, schema: Optional[str] = None, halbtoene: int = 0, eingabe: str = "deutsch") -> None:
+        """schema: Name des Ausgabeschemas (siehe SCHEMATA), None: wie eingabe
+        halbtoene: um so viele Halbtöne transponieren (negativ: nach unten)
+        eingabe: Schema, in dem die Lieder geschrieben sind. Wichtig für B: "deutsch" Bb, "englisch" H"""
+        self.schema_name = schema or eingabe
+        self.schema = SCHEMATA[self.schema_name]
+        self.halbtoene = halbtoene
+        self.eingabe = eingabe
+        self._cache: Dict[str, Optional[str]] = dict()
+
+    def __call__(self, wort: str) -> Optional[str]:
+        """wort im Schema, transponiert. Enthält wort mehrere Akkorde (z.B. |:G, (G, C/E/G), wird jeder umgeschrieben.
+        None, wenn wort sich nicht lesen lässt (z.B. x2), der Aufrufer übernimmt es dann unverändert."""
+        try:
+            return self._cache[wort]
+        except KeyError:
+            akk = akkord(wort, self.eingabe)
+            erg = self._teile(wort) if akk is None else schreiben(akk, self.schema, self.halbtoene)
+            if len(self._cache) < _max_cache:
+                self._cache[wort] = erg
+            return erg
+
+    def _teile(self, wort: str) -> Optional[str]:
+        # wort ist kein einzelner Akkord: Teil für Teil lesen und jeden Akkord darin umschreiben
+        teile = []
+        pos = 0
+        while pos < len(wort):
+            match = _teil_re.match(wort, pos)
+            if match is None:
+                return None
+            if match.group("zeichen") is not None:
+                teile.append(match.group("zeichen"))
+            elif match.group("bass") is not None:
+                bass = _halbtoene(match.group("bass"), match.group("bassvz"), self.eingabe)
+                teile.append("/" + self.schema.namen[(bass + self.halbtoene) % 12])
+            else:
+                ton = match.group("ton")
+                akk = Akkord(grundton=_halbtoene(ton, match.group("vz"), self.eingabe),
+                             moll=ton.islower() or match.group("moll") is not None,
+                             zusatz=match.group("zusatz"), bass=None, klammer=False)
+                teile.append((match.group("strich") or "") + schreiben(akk, self.schema, self.halbtoene))
+            pos = match.end()
+        return "".join(teile)
+
+    def kennung(self) -> str:
+        """kurzer Text, der die Einstellungen beschreibt, z.B. für das Manifest"""
+        return "{}{:+d}{}".format(self.schema_name, self.halbtoene, "" if self.eingabe == "deutsch" else "/" + self.eingabe)
+
+    __doc__ = "Schreibt Akkorde in einem einheitlichen Schema und transponiert sie. Aufruf mit einem Akkord als str"
@@ -0,0 +1,68 @@
+# anthologie.py
+# Teilt eine Sammlung (eine Textdatei mit vielen Liedern hintereinander) in einzelne Lieder.
+# Die Datei wird zeilenweise gelesen, im Speicher liegt immer nur das aktuelle Lied.
+# Ein neues Lied beginnt mit einem Absatz (nach einer leeren Zeile), der aussieht wie der Kopf eines Liedes:
+# eine Titelzeile nach den Regeln von p_Ueberschrift, dahinter ein Alternativtitel in [...] oder in der nächsten Zeile
+# Metadaten mit einem der Schlüssel aus _Ueber_starts (mel:, txt:, wuw:, ...).
+# Ein Lied ohne Alternativtitel und ohne Metadaten wird deshalb nicht erkannt und gehört zum Lied davor.
+import itertools
+from typing import Iterable, Iterator, List, Tuple
+
+from lib.Heuristik.Heuristik import merkmale, _Ueber_starts
+
+
+def _leer(zeile: str) -> bool:
+    return zeile.strip(' \t\r') == ''
+
+
+def ist_liedanfang(absatz: List[str]) -> bool:
+    """True, wenn der Absatz (Zeilen ohne leere Zeile dazwischen) der Kopf eines neuen Liedes ist"""
+    m = merkmale(absatz[0])
+    if m.ohne_leer == 0 or m.akkordzeile or m.info_markiert or m.strophennummer >= 0 or m.praefix in _Ueber_starts:
+        return False
+    if m.klammern_auf != m.klammern_zu or m.klammern_auf > 1:
+        return False
+    if m.klammern_auf == 1:
+        # Titel [Alternativtitel]: vor der Klammer muss der Titel stehen
+        lk = absatz[0].find('[')
+        if absatz[0][:lk].strip() and absatz[0].find(']', lk) > lk:
+            return True
+    return len(absatz) > 1 and merkmale(absatz[1]).praefix in _Ueber_starts
+
+
+def _lied(zeilen: List[str]) -> str:
+    # leere Zeilen am Ende gehören zum Abstand vor dem nächsten Lied
+    ende = len(zeilen)
+    while ende > 0 and _leer(zeilen[ende - 1]):
+        ende -= 1
+    return '\n'.join(zeilen[:ende]) + '\n'
+
+
+def lieder(zeilen: Iterable[str]) -> Iterator[Tuple[int, str]]:
+    """teilt die Zeilen einer Sammlung in Lieder, z.B. die Zeilen einer geöffneten Datei.
+    Leere Zeilen vor einem Lied und an seinem Ende werden entfernt. Der erste Absatz beginnt immer ein Lied.
+    Liefert (Nummer der ersten Zeile des Liedes ab 1, Text des Liedes wie aus einer einzelnen Datei)."""
+    lied: List[str] = []
+    absatz: List[str] = []
+    erste = anfang = 0   # erste Zeile des aktuellen Liedes und des aktuellen Absatzes
+    # eine leere Zeile am Ende schließt den letzten Absatz ab
+    for nr, zeile in enumerate(itertools.chain(zeilen, ['']), 1):
+        if zeile.endswith('\n'):
+            zeile = zeile[:-1]
+        if not _leer(zeile):
+            if not absatz:
+                anfang = nr
+            absatz.append(zeile)
+            continue
+        if absatz:
+            if lied and ist_liedanfang(absatz):
+                yield erste, _lied(lied)
+                lied = []
+            if not lied:
+                erste = anfang
+            lied.extend(absatz)
+            absatz = []
+        if lied:
+            lied.append(zeile)
+    if lied:
+        yield erste, _lied(lied)
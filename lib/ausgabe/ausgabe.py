@@ -0,0 +1,135 @@
+# ausgabe.py
+# Schreibt Ausgabedateien nur, wenn sich ihr Inhalt geändert hat. Unveränderte Dateien behalten ihre
+# Änderungszeit, so muss latexmk oder make danach nicht alles neu übersetzen.
+# Geänderte Dateien werden erst in eine temporäre Datei geschrieben und dann umbenannt,
+# ein Absturz beim Schreiben hinterlässt deshalb keine halbe Datei.
+# Ist die Ausgabedatei eine Verknüpfung, wird ihr Ziel ersetzt, die Verknüpfung bleibt (wie früher mit open(..., 'w')).
+# Eine vorhandene Datei behält ihre Rechte.
+import locale
+import os
+import threading
+from typing import Iterable, Optional, Union
+
+pfad = Union[str, os.DirEntry]
+
+# Ergebnis von write_if_changed
+NEU = "neu"
+AKTUALISIERT = "aktualisiert"
+UNVERAENDERT = "unverändert"
+
+_blockgroesse = 1 << 16
+
+
+def _kodieren(daten: str, encoding: Optional[str]) -> bytes:
+    # dieselben Bytes, die open(..., 'w') schreiben würde
+    if encoding is None:
+        encoding = locale.getpreferredencoding(False)
+    if os.linesep != '\n':
+        daten = daten.replace('\n', os.linesep)
+    return daten.encode(encoding)
+
+
+def _gleicher_inhalt(filename: pfad, neu: bytes) -> bool:
+    """True, wenn die Datei genau die Bytes neu enthält. Bricht beim ersten Unterschied ab."""
+    ansicht = memoryview(neu)
+    pos = 0
+    with open(filename, 'rb') as file:
+        while True:
+            block = file.read(_blockgroesse)
+            if not block:
+                return pos == len(neu)
+            if ansicht[pos:pos + len(block)] != block:
+                return False
+            pos += len(block)
+
+
+def _gleiche_dateien(a: str, b: str) -> bool:
+    """True, wenn beide Dateien dieselben Bytes enthalten. Die Größe muss vorher verglichen werden."""
+    with open(a, 'rb') as datei_a, open(b, 'rb') as datei_b:
+        while True:
+            block = datei_a.read(_blockgroesse)
+            if block != datei_b.read(_blockgroesse):
+                return False
+            if not block:
+                return True
+
+
+def _ziel(filename: pfad) -> str:
+    # Verknüpfungen auflösen: os.replace würde sonst die Verknüpfung selbst durch eine normale Datei ersetzen
+    return os.path.realpath(os.fspath(filename))
+
+
+def _tmp_name(filename: str) -> str:
+    # temporäre Datei im selben Verzeichnis, sonst ist das Umbenennen nicht atomar.
+    # Prozess und Thread im Namen, damit sich parallele Schreiber nicht in die Quere kommen.
+    verzeichnis, name = os.path.split(filename)
+    return os.path.join(verzeichnis, ".{}.{}.{}.tmp".format(name, os.getpid(), threading.get_ident()))
+
+
+def write_if_changed(filename: pfad, daten: str, encoding: Optional[str] = None, fsync: bool = False) -> str:
+    """schreibt daten nach filename, außer die Datei enthält schon genau diesen Inhalt.
+    encoding: wie bei open(), None: Standard des Systems
+    fsync: die Daten vor dem Umbenennen auf die Platte schreiben lassen (langsamer, sicher auch bei Stromausfall)
+    Rückgabe: NEU, AKTUALISIERT oder UNVERAENDERT"""
+    filename = _ziel(filename)
+    neu = _kodieren(daten, encoding)
+    try:
+        stat = os.stat(filename)
+    except FileNotFoundError:
+        stat = None
+        ergebnis = NEU
+    else:
+        # erst die Größe vergleichen, nur bei gleicher Größe die Bytes
+        if stat.st_size == len(neu) and _gleicher_inhalt(filename, neu):
+            return UNVERAENDERT
+        ergebnis = AKTUALISIERT
+
+    tmp = _tmp_name(filename)
+    try:
+        with open(tmp, 'wb') as file:
+            file.write(neu)
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        if stat is not None:
+            os.chmod(tmp, stat.st_mode & 0o7777)  # Rechte der alten Datei behalten
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return ergebnis
+
+
+def write_parts_if_changed(filename: pfad, teile: Iterable[str], encoding: Optional[str] = None, fsync: bool = False) -> str:
+    """wie write_if_changed, aber der Inhalt kommt in Teilen, z.B. aus einem Generator, und liegt nie ganz im Speicher.
+    Die Teile werden zuerst in die temporäre Datei geschrieben, danach wird sie mit der vorhandenen Datei verglichen.
+    Rückgabe: NEU, AKTUALISIERT oder UNVERAENDERT"""
+    filename = _ziel(filename)
+    tmp = _tmp_name(filename)
+    try:
+        with open(tmp, 'wb') as file:
+            for teil in teile:
+                file.write(_kodieren(teil, encoding))
+            if fsync:
+                file.flush()
+                os.fsync(file.fileno())
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            stat = None
+        if stat is not None and stat.st_size == os.path.getsize(tmp) and _gleiche_dateien(tmp, filename):
+            os.remove(tmp)
+            return UNVERAENDERT
+        if stat is not None:
+            os.chmod(tmp, stat.st_mode & 0o7777)  # Rechte der alten Datei behalten
+        os.replace(tmp, filename)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return NEU if stat is None else AKTUALISIERT
@@ -0,0 +1,154 @@
+# bericht.py
+# Fortschritt und Zusammenfassung eines Laufes von converter.py.
+# Je Lied erscheint eine Zeile mit seinen Hinweisen darunter, am Ende eine Zusammenfassung: wie viele Lieder umgewandelt,
+# übersprungen und fehlgeschlagen sind, Zeilen und Bytes, Lieder/s und Zeilen/s und die langsamsten Lieder.
+# Mit leise entfallen die Zeilen je Lied und auch die Hinweise, die Zusammenfassung nennt nur ihre Anzahl.
+# Der Bericht kann als JSON gespeichert werden, z.B. um den Durchsatz in der CI über die Zeit zu verfolgen.
+# Darin stehen auch alle Hinweise je Lied.
+# Die Umwandlung selbst gibt nichts aus, sie liefert je Lied ein Datei-Tupel (auch aus Arbeitsprozessen),
+# alle Ausgaben macht der Bericht im Hauptprozess.
+import heapq
+import json
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, NamedTuple, Optional, TextIO
+
+from lib.ausgabe.ausgabe import write_if_changed, NEU, AKTUALISIERT, UNVERAENDERT
+from lib.diagnose.diagnose import Diagnose
+
+_format = 2  # Version des JSON-Formats
+
+
+class Datei(NamedTuple):
+    name: str                  # Name für die Ausgaben, z.B. der Dateiname
+    status: Optional[str]      # NEU, AKTUALISIERT oder UNVERAENDERT (lib.ausgabe), None: nicht einzeln geschrieben (--bundle)
+    dauer: float               # Sekunden vom Lesen bis zum Schreiben
+    zeilen: int                # Zeilen der Eingabe
+    bytes_ein: int
+    bytes_aus: int
+    hinweise: List[Diagnose]
+
+
+def zeilen_zaehlen(text: str) -> int:
+    """Anzahl der Zeilen, eine letzte Zeile ohne Zeilenumbruch zählt mit"""
+    return text.count('\n') + (len(text) > 0 and not text.endswith('\n'))
+
+
+class Bericht():
+    def __init__(self, leise: bool = False, langsamste: int = 5, ausgabe: Optional[TextIO] = None) -> None:
+        """leise: keine Zeilen je Lied und keine Hinweise, nur Fehler und die Zusammenfassung
+        langsamste: so viele der langsamsten Lieder merken und ausgeben
+        ausgabe: Standard sys.stdout"""
+        self.leise = leise
+        self.anzahl_langsamste = langsamste
+        self.ausgabe = ausgabe
+        self.start = time.perf_counter()
+        self.dauer: Optional[float] = None  # Gesamtzeit, gesetzt von beenden
+        self.status: Counter = Counter()    # NEU/AKTUALISIERT/UNVERAENDERT/None -> Anzahl der umgewandelten Lieder
+        self.uebersprungen: Counter = Counter()  # Grund -> Anzahl
+        self.fehlgeschlagen: List[str] = []
+        self.zeilen = 0
+        self.bytes_ein = 0
+        self.bytes_aus = 0
+        self.hinweise = 0
+        self.hinweise_je_datei: Dict[str, List[Diagnose]] = dict()  # nur Lieder mit Hinweisen, für das JSON
+        self.rechenzeit = 0.0  # Summe der Zeiten aller Lieder, mit mehreren Prozessen mehr als die Gesamtzeit
+        self._langsamste: List[tuple] = []  # Heap (dauer, nr, name) der langsamsten Lieder
+
+    def _print(self, *args, **kwargs) -> None:
+        print(*args, file=self.ausgabe or sys.stdout, **kwargs)
+
+    def datei(self, datei: Datei) -> None:
+        """ein Lied ist umgewandelt"""
+        self.status[datei.status] += 1
+        self.zeilen += datei.zeilen
+        self.bytes_ein += datei.bytes_ein
+        self.bytes_aus += datei.bytes_aus
+        self.hinweise += len(datei.hinweise)
+        if datei.hinweise:
+            self.hinweise_je_datei[datei.name] = datei.hinweise
+        self.rechenzeit += datei.dauer
+        eintrag = (datei.dauer, sum(self.status.values()), datei.name)
+        if len(self._langsamste) < self.anzahl_langsamste:
+            heapq.heappush(self._langsamste, eintrag)
+        elif self._langsamste and eintrag > self._langsamste[0]:
+            heapq.heapreplace(self._langsamste, eintrag)
+        if self.leise:
+            return
+        self._print("{:>30}  {:<12} {:8.1f} ms".format(
+            datei.name, "unverändert" if datei.status == UNVERAENDERT else "fertig", datei.dauer * 1000))
+        for diagnose in datei.hinweise:
+            self._print(' ' * 30, ' Hinweis:', diagnose)
+
+    def fehler(self, name: str) -> None:
+        """die Umwandlung eines Liedes ist fehlgeschlagen. Die Meldung gibt der Aufrufer aus."""
+        self.fehlgeschlagen.append(name)
+
+    def ueberspringen(self, grund: str, anzahl: int = 1) -> None:
+        """anzahl Lieder werden nicht umgewandelt, z.B. grund "aktuell", weil sich die Eingabe seit dem letzten Lauf nicht geändert hat"""
+        self.uebersprungen[grund] += anzahl
+
+    def beenden(self) -> None:
+        """hält die Gesamtzeit an"""
+        if self.dauer is None:
+            self.dauer = time.perf_counter() - self.start
+
+    def langsamste(self) -> List[Dict[str, Any]]:
+        return [dict(name=name, ms=round(dauer * 1000, 3)) for dauer, _, name in sorted(self._langsamste, reverse=True)]
+
+    def als_dict(self) -> Dict[str, Any]:
+        self.beenden()
+        umgewandelt = sum(self.status.values())
+        return dict(
+            format=_format,
+            umgewandelt=umgewandelt,
+            neu=self.status[NEU], aktualisiert=self.status[AKTUALISIERT], unveraendert=self.status[UNVERAENDERT],
+            uebersprungen=sum(self.uebersprungen.values()),
+            uebersprungen_nach_grund=dict(self.uebersprungen),
+            fehlgeschlagen=len(self.fehlgeschlagen),
+            fehlgeschlagene_dateien=self.fehlgeschlagen,
+            hinweise=self.hinweise,
+            zeilen=self.zeilen,
+            bytes_ein=self.bytes_ein,
+            bytes_aus=self.bytes_aus,
+            dauer_s=round(self.dauer, 4),
+            rechenzeit_s=round(self.rechenzeit, 4),
+            lieder_pro_s=round(umgewandelt / self.dauer, 2) if self.dauer > 0 else None,
+            zeilen_pro_s=round(self.zeilen / self.dauer, 1) if self.dauer > 0 else None,
+            langsamste=self.langsamste(),
+            hinweise_je_datei={name: [diagnose.als_dict() for diagnose in hinweise]
+                               for name, hinweise in self.hinweise_je_datei.items()},
+        )
+
+    def zusammenfassung(self) -> str:
+        d = self.als_dict()
+        teile = ["{} umgewandelt".format(d["umgewandelt"])]
+        if d["neu"] or d["aktualisiert"] or d["unveraendert"]:
+            # mit --bundle gibt es keine einzelnen Ausgabedateien
+            teile[0] += " ({} neu, {} aktualisiert, {} unverändert)".format(d["neu"], d["aktualisiert"], d["unveraendert"])
+        if d["uebersprungen"]:
+            teile.append("{} übersprungen ({})".format(d["uebersprungen"], ", ".join(
+                "{} {}".format(anzahl, grund) for grund, anzahl in sorted(self.uebersprungen.items()))))
+        if d["fehlgeschlagen"]:
+            teile.append("{} fehlgeschlagen".format(d["fehlgeschlagen"]))
+        if d["hinweise"]:
+            teile.append("{} {}".format(d["hinweise"], "Hinweis" if d["hinweise"] == 1 else "Hinweise"))
+            if self.leise:
+                teile[-1] += " (einzeln ohne -q oder mit --bericht)"
+        zeilen = ["Lieder: " + ", ".join(teile)]
+        if d["umgewandelt"]:
+            zeilen.append("{} Zeilen, {:.1f} kB gelesen, {:.1f} kB geschrieben in {:.2f} s: {:.1f} Lieder/s, {:.0f} Zeilen/s".format(
+                d["zeilen"], d["bytes_ein"] / 1000, d["bytes_aus"] / 1000, d["dauer_s"],
+                d["lieder_pro_s"] or 0, d["zeilen_pro_s"] or 0))
+        if d["langsamste"]:
+            zeilen.append("Langsamste: " + ", ".join("{} ({:.1f} ms)".format(e["name"], e["ms"]) for e in d["langsamste"]))
+        return "\n".join(zeilen)
+
+    def speichern(self, pfad: str, **zusatz) -> None:
+        """schreibt den Bericht als JSON nach pfad. zusatz: weitere Einträge, z.B. Version und Anzahl der Prozesse"""
+        daten = self.als_dict()
+        daten.update(zusatz)
+        write_if_changed(pfad, json.dumps(daten, ensure_ascii=False, indent=1) + "\n", encoding='utf-8')
+
+    __doc__ = "Zählt die umgewandelten Lieder, gibt den Fortschritt aus und fasst den Lauf am Ende zusammen"
@@ -0,0 +1,34 @@
+# diagnose.py
+# Hinweise auf Probleme in einem Lied, die die Umwandlung nicht abbrechen, z.B. ein unbekannter Schlüssel in den Metadaten.
+# Früher wurden sie mit print ausgegeben. Jetzt sammelt sie der Aufrufer in einer eigenen Liste, die er an
+# SongConverter übergibt. So kommen sich mehrere Umwandlungen in verschiedenen Threads nicht in die Quere
+# und der Aufrufer entscheidet, ob und wo die Hinweise erscheinen.
+from typing import Any, Dict, List, NamedTuple, Optional
+
+# Arten der Hinweise
+UNBEKANNTER_SCHLUESSEL = "unbekannter_schluessel"  # Metadatenzeile mit einem Schlüssel, den es nicht gibt
+METAZEILE = "metazeile"                            # Zeile im Kopf des Liedes, die nicht "schlüssel: wert" ist
+KLAMMERN = "klammern"                              # [ und ] in der Titelzeile passen nicht zusammen
+UNBESTIMMT = "unbestimmt"                          # die Heuristik hält die Zeile für keinen der Typen geeignet
+AKKORD = "akkord"                                  # Wort in einer Akkordzeile, das sich nicht umschreiben lässt
+
+
+class Diagnose(NamedTuple):
+    art: str                # eine der Arten oben
+    zeile: Optional[int]    # Nummer der Zeile im Lied ab 1, None: betrifft keine bestimmte Zeile
+    meldung: str
+
+    def als_dict(self) -> Dict[str, Any]:
+        """für JSON, z.B. in den Antworten von server.py"""
+        return self._asdict()
+
+    def __str__(self) -> str:
+        if self.zeile is None:
+            return self.meldung
+        return "Zeile {}: {}".format(self.zeile, self.meldung)
+
+
+def melden(diagnosen: Optional[List[Diagnose]], art: str, zeile: Optional[int], meldung: str) -> None:
+    """hängt einen Hinweis an diagnosen an. diagnosen None: der Aufrufer will keine Hinweise, nichts zu tun"""
+    if diagnosen is not None:
+        diagnosen.append(Diagnose(art, zeile, meldung))
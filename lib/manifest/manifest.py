@@ -0,0 +1,85 @@
+# manifest.py
+# Merkt sich, aus welchen Eingaben die Dateien im Ausgabeverzeichnis entstanden sind.
+# Damit müssen bei einem erneuten Lauf nur die Lieder umgewandelt werden, die sich geändert haben.
+import hashlib
+import json
+import os
+from typing import Callable, Dict, Iterable, Union
+
+pfad = Union[str, os.DirEntry]
+
+manifest_name = ".songbook-manifest.json"  # Dateiname des Manifests im Ausgabeverzeichnis
+_format = 1  # Version des Dateiformats
+
+
+def file_hash(filename: pfad) -> str:
+    """sha256-Hash des Dateiinhaltes als Hex-String"""
+    h = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class BuildManifest():
+    def __init__(self, path: pfad, version: str, template_hash: str) -> None:
+        """path: Pfad der Manifestdatei
+        version: Version des Konverters. Ändert sie sich, wird alles neu umgewandelt.
+        template_hash: Hash des Templates. Ändert es sich, wird ebenfalls alles neu umgewandelt."""
+        self.path = path
+        self.version = version
+        self.template_hash = template_hash
+        # Eingabedateiname -> {"hash": Hash der Eingabe, "out": Name der Ausgabedatei}
+        self.files: Dict[str, Dict[str, str]] = dict()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            # kein (lesbares) Manifest: alles muss umgewandelt werden
+            return
+        if not isinstance(data, dict):
+            return
+        if data.get("format") != _format or data.get("version") != self.version \
+                or data.get("template") != self.template_hash:
+            # Konverter oder Template haben sich geändert: alle Einträge sind ungültig
+            return
+        files = data.get("files")
+        if isinstance(files, dict):
+            self.files = files
+
+    def is_current(self, name: str, inhash: str, outpath: pfad,
+                   vorhanden: Callable[[pfad], bool] = os.path.isfile) -> bool:
+        """True, wenn die Ausgabedatei existiert und aus genau dieser Eingabe erzeugt wurde
+        vorhanden: prüft, ob outpath eine Datei ist, z.B. lib.scan.Ausgaben.vorhanden ohne eigenen Systemaufruf"""
+        entry = self.files.get(name)
+        if entry is None or entry.get("hash") != inhash:
+            return False
+        return entry.get("out") == os.path.basename(outpath) and vorhanden(outpath)
+
+    def record(self, name: str, inhash: str, outpath: pfad) -> None:
+        """vermerkt, dass outpath erfolgreich aus der Eingabe name mit dem Hash inhash erzeugt wurde"""
+        self.files[name] = dict(hash=inhash, out=os.path.basename(outpath))
+
+    def forget(self, name: str) -> None:
+        """entfernt den Eintrag zu name, z.B. wenn die Umwandlung fehlgeschlagen ist"""
+        self.files.pop(name, None)
+
+    def prune(self, names: Iterable[str]) -> None:
+        """entfernt alle Einträge, deren Eingabedatei nicht in names enthalten ist"""
+        names = set(names)
+        for name in list(self.files):
+            if name not in names:
+                del self.files[name]
+
+    def save(self) -> None:
+        """schreibt das Manifest. Erst in eine temporäre Datei, damit ein Absturz kein halbes Manifest hinterlässt."""
+        data = dict(format=_format, version=self.version, template=self.template_hash, files=self.files)
+        tmp = os.fspath(self.path) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    __doc__ = "Build-Manifest: Hashes der Eingaben, des Templates und die Konverterversion"
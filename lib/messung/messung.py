@@ -0,0 +1,73 @@
+# messung.py
+# Misst Zeit und Anzahl der Aufrufe der einzelnen Stufen der Umwandlung.
+# Ohne Messung wird KeineMessung verwendet, deren Stufen nichts tun und fast nichts kosten.
+import contextlib
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Optional
+
+
+def _jetzt_us() -> float:
+    # monotone Uhr in Mikrosekunden. Unter Linux für alle Prozesse gleich, die Ereignisse mehrerer Prozesse passen zusammen.
+    return time.perf_counter_ns() / 1000
+
+
+class Messung():
+    def __init__(self, trace: bool = False) -> None:
+        """trace: zusätzlich jedes einzelne Ereignis für eine Chrome-Trace-Datei speichern"""
+        self.zeiten: Dict[str, float] = defaultdict(float)  # Stufe -> Gesamtzeit in Sekunden
+        self.aufrufe: Dict[str, int] = defaultdict(int)     # Stufe -> Anzahl der Aufrufe
+        self.events = [] if trace else None
+
+    @contextlib.contextmanager
+    def stufe(self, name: str, **args):
+        """misst die Zeit des with-Blocks als Stufe name. args werden im Trace beim Ereignis gespeichert."""
+        start = _jetzt_us()
+        try:
+            yield
+        finally:
+            dauer = _jetzt_us() - start
+            self.zeiten[name] += dauer / 1e6
+            self.aufrufe[name] += 1
+            if self.events is not None:
+                self.events.append(dict(name=name, ph="X", ts=start, dur=dauer, pid=os.getpid(),
+                                        tid=threading.get_ident(), args=args))
+
+    def stand(self) -> Dict[str, float]:
+        """Kopie der bisherigen Zeiten, z.B. um mit seit() die Zeiten für eine einzelne Datei zu bestimmen"""
+        return dict(self.zeiten)
+
+    def seit(self, stand: Dict[str, float]) -> Dict[str, float]:
+        """Zeiten je Stufe seit stand"""
+        return {name: zeit - stand.get(name, 0.0) for name, zeit in self.zeiten.items() if zeit != stand.get(name, 0.0)}
+
+    def events_abholen(self) -> list:
+        """gibt die gesammelten Ereignisse zurück und leert die Liste"""
+        events = self.events or []
+        if self.events is not None:
+            self.events = []
+        return events
+
+    __doc__ = "Sammelt Zeiten und Aufrufzahlen je Stufe, auf Wunsch auch alle Ereignisse für einen Chrome-Trace"
+
+
+class KeineMessung():
+    _nichts = contextlib.nullcontext()
+
+    def stufe(self, name: str, **args):
+        return self._nichts
+
+    __doc__ = "Ersatz für Messung, wenn nicht gemessen wird"
+
+
+keine_messung = KeineMessung()
+
+
+def chrome_trace(events: list, metadaten: Optional[dict] = None) -> dict:
+    """Daten für eine Datei im Chrome-Trace-Format (chrome://tracing, Perfetto)"""
+    erg = dict(traceEvents=events, displayTimeUnit="ms")
+    if metadaten:
+        erg["otherData"] = metadaten
+    return erg
@@ -0,0 +1,129 @@
+# metadaten.py
+# Merkt sich Titel und Metadaten (mel, txt, jahr, alb, bo, tf, ...) aller Lieder in einer JSON-Datei.
+# Die Einträge sind nach dem Hash des Liedes abgelegt. Beim Aktualisieren werden nur Lieder gelesen,
+# die neu sind oder sich geändert haben. Unveränderte Dateien werden an Änderungszeit und Größe erkannt
+# und nicht einmal geöffnet.
+import bisect
+import json
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from lib.manifest.manifest import file_hash
+from lib.verzeichnis.verzeichnis import sortierschluessel, titelverzeichnis
+
+pfad = Union[str, os.DirEntry]
+
+_format = 1  # Version des Dateiformats
+
+
+class MetadatenIndex():
+    def __init__(self, path: pfad, version: str) -> None:
+        """path: Pfad der Indexdatei
+        version: Version des Konverters. Ändert sie sich, werden alle Lieder neu gelesen."""
+        self.path = path
+        self.version = version
+        # Hash des Liedes -> Metadaten, "title" ist enthalten
+        self.lieder: Dict[str, Dict[str, str]] = dict()
+        # Dateiname -> {"hash": Hash des Inhalts, "mtime": Änderungszeit in ns, "size": Größe}
+        self.dateien: Dict[str, Dict] = dict()
+        # Schlüssel -> sortierte Liste (Sortierschlüssel des Wertes, Dateiname), wird bei Bedarf aufgebaut
+        self._suchindex: Optional[Dict[str, List[Tuple[str, str]]]] = None
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return  # kein (lesbarer) Index: alle Lieder werden gelesen
+        if not isinstance(data, dict) or data.get("format") != _format or data.get("version") != self.version:
+            return
+        lieder, dateien = data.get("lieder"), data.get("dateien")
+        if isinstance(lieder, dict) and isinstance(dateien, dict):
+            self.lieder = lieder
+            self.dateien = {name: eintrag for name, eintrag in dateien.items() if eintrag.get("hash") in lieder}
+
+    def aktualisieren(self, dateien: Iterable[pfad], lesen: Callable[[pfad], Dict[str, str]],
+                      fehler: Optional[Callable[[str, Exception], None]] = None) -> Tuple[int, int, int]:
+        """bringt den Index auf den Stand von dateien (alle Lieder, z.B. Eingaben aus lib.scan oder DirEntry-Objekte).
+        Der Name im Index ist der Name der Eingabe (relativ zum Eingabeverzeichnis), bei Pfaden der Dateiname.
+        lesen(datei) -> Metadaten: wird nur für neue und geänderte Lieder aufgerufen
+        fehler(dateiname, exception): wird für Lieder aufgerufen, die nicht gelesen werden können
+        Einträge von Dateien, die es nicht mehr gibt, werden entfernt.
+        Rückgabe: (gelesen, unverändert, fehlgeschlagen)"""
+        gelesen = unveraendert = fehlgeschlagen = 0
+        neue_dateien = dict()
+        for datei in dateien:
+            name = os.path.basename(datei) if isinstance(datei, str) else datei.name
+            try:
+                st = os.stat(datei) if isinstance(datei, str) else datei.stat()  # stat der Eingabe ist schon gelesen
+                alt = self.dateien.get(name)
+                if alt is not None and alt.get("mtime") == st.st_mtime_ns and alt.get("size") == st.st_size:
+                    neue_dateien[name] = alt
+                    unveraendert += 1
+                    continue
+                inhash = file_hash(datei)
+                if inhash not in self.lieder:
+                    self.lieder[inhash] = lesen(datei)
+                    gelesen += 1
+                else:
+                    unveraendert += 1  # nur die Änderungszeit ist neu, oder der Inhalt ist von einer anderen Datei bekannt
+                neue_dateien[name] = dict(hash=inhash, mtime=st.st_mtime_ns, size=st.st_size)
+            except Exception as e:
+                fehlgeschlagen += 1
+                if fehler is not None:
+                    fehler(name, e)
+        self.dateien = neue_dateien
+        # Lieder, die zu keiner Datei mehr gehören, vergessen
+        benutzt = set(eintrag["hash"] for eintrag in self.dateien.values())
+        self.lieder = {h: meta for h, meta in self.lieder.items() if h in benutzt}
+        self._suchindex = None
+        return gelesen, unveraendert, fehlgeschlagen
+
+    def metadaten(self, name: str) -> Optional[Dict[str, str]]:
+        """Metadaten der Datei name oder None"""
+        eintrag = self.dateien.get(name)
+        return None if eintrag is None else self.lieder[eintrag["hash"]]
+
+    def alle(self) -> List[Tuple[str, Dict[str, str]]]:
+        """(Dateiname, Metadaten) aller Lieder, nach Dateiname sortiert"""
+        return [(name, self.lieder[eintrag["hash"]]) for name, eintrag in sorted(self.dateien.items())]
+
+    def _suche(self, schluessel: str) -> List[Tuple[str, str]]:
+        if self._suchindex is None:
+            suchindex: Dict[str, List[Tuple[str, str]]] = dict()
+            for name, meta in self.alle():
+                for key, wert in meta.items():
+                    suchindex.setdefault(key, []).append((sortierschluessel(wert), name))
+            for liste in suchindex.values():
+                liste.sort()
+            self._suchindex = suchindex
+        return self._suchindex.get(schluessel, [])
+
+    def suchen(self, schluessel: str, wert: str, praefix: bool = False) -> List[Tuple[str, Dict[str, str]]]:
+        """alle Lieder, bei denen der Wert von schluessel (z.B. "mel") gleich wert ist oder, mit praefix, damit beginnt.
+        Groß-/Kleinschreibung und Umlaute werden wie beim Sortieren der Titel nicht unterschieden.
+        Rückgabe: (Dateiname, Metadaten), nach dem gefundenen Wert sortiert"""
+        liste = self._suche(schluessel)
+        gesucht = sortierschluessel(wert)
+        erg = []
+        for k in range(bisect.bisect_left(liste, (gesucht, "")), len(liste)):
+            gefunden, name = liste[k]
+            if not (gefunden.startswith(gesucht) if praefix else gefunden == gesucht):
+                break
+            erg.append((name, self.metadaten(name)))
+        return erg
+
+    def register(self) -> str:
+        """Titelverzeichnis aller Lieder als latex code (siehe lib.verzeichnis)"""
+        return titelverzeichnis((meta.get("title", name), meta.get("index")) for name, meta in self.alle())
+
+    def save(self) -> None:
+        """schreibt den Index. Erst in eine temporäre Datei, damit ein Absturz keinen halben Index hinterlässt."""
+        data = dict(format=_format, version=self.version, lieder=self.lieder, dateien=self.dateien)
+        tmp = os.fspath(self.path) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    __doc__ = "Index der Metadaten aller Lieder, nach dem Hash des Inhalts, mit Suche und Titelverzeichnis"
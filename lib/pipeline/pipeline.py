@@ -0,0 +1,136 @@
+# pipeline.py
+# Liest, wandelt und schreibt Dateien gleichzeitig, damit Wartezeiten beim Lesen und Schreiben
+# (z.B. auf einem Netzlaufwerk) und die Rechenzeit der Umwandlung sich überlappen.
+#   Leser (Threads) -> Warteschlange umwandeln -> Arbeiter (Executor, z.B. Prozesse) -> Warteschlange schreiben -> Schreiber (Threads)
+# Beide Warteschlangen haben eine feste Größe. Ist eine voll, warten die Stufen davor. So bleiben höchstens
+# etwa 2·puffer + arbeiter + 2·io_threads Dateien gleichzeitig im Speicher.
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Markierung am Ende einer Warteschlange: keine weiteren Dateien
+_ENDE = None
+
+
+class Pipeline():
+    def __init__(self, lesen: Callable[[Any], Any], umwandeln: Callable[[Any], Any], schreiben: Callable[[Any, Any], Any],
+                 executor: Executor, arbeiter: int = 1, io_threads: int = 4, puffer: int = 8,
+                 fertig: Optional[Callable[[int, Any, Optional[str], Any], None]] = None, intervall: float = 0.01) -> None:
+        """lesen(job) -> daten: läuft in einem Thread
+        umwandeln(daten) -> ergebnis: läuft im executor, bei einem ProcessPoolExecutor muss die Funktion picklebar sein
+        schreiben(job, ergebnis) -> status: läuft in einem Thread
+        arbeiter: Anzahl der Umwandlungen, die gleichzeitig an den executor übergeben werden
+        io_threads: Anzahl der Leser und der Schreiber
+        puffer: Größe der beiden Warteschlangen
+        fertig(nr, ergebnis oder None, Fehlermeldung oder None, status oder None): wird für jeden Job aufgerufen,
+            sobald er fertig oder fehlgeschlagen ist, immer im selben Thread
+        intervall: Abstand in Sekunden, in dem die Länge der Warteschlangen gemessen wird"""
+        self.lesen = lesen
+        self.umwandeln = umwandeln
+        self.schreiben = schreiben
+        self.executor = executor
+        self.arbeiter = max(1, arbeiter)
+        self.io_threads = max(1, io_threads)
+        self.puffer = max(1, puffer)
+        self.fertig = fertig
+        self.intervall = intervall
+        # Warteschlange -> gemessene Längen
+        self.messungen: Dict[str, List[int]] = dict(umwandeln=[], schreiben=[])
+
+    def run(self, jobs: List[Any]) -> List[Tuple[Optional[str], Any]]:
+        """bearbeitet alle jobs. Gibt für jeden Job (Fehlermeldung oder None, Rückgabewert von schreiben) zurück"""
+        if not jobs:
+            return []
+        return asyncio.run(self.ausfuehren(jobs))
+
+    async def ausfuehren(self, jobs: List[Any]) -> List[Tuple[Optional[str], Any]]:
+        loop = asyncio.get_running_loop()
+        erg: List[Tuple[Optional[str], Any]] = [(None, None)] * len(jobs)
+        eingang: asyncio.Queue = asyncio.Queue()
+        for nr in range(len(jobs)):
+            eingang.put_nowait(nr)
+        zum_umwandeln: asyncio.Queue = asyncio.Queue(maxsize=self.puffer)
+        zum_schreiben: asyncio.Queue = asyncio.Queue(maxsize=self.puffer)
+
+        def melden(nr: int, ergebnis: Any, meldung: Optional[str], status: Any = None) -> None:
+            erg[nr] = (meldung, status)
+            if self.fertig is not None:
+                self.fertig(nr, ergebnis, meldung, status)
+
+        async def leser(io: ThreadPoolExecutor) -> None:
+            while True:
+                try:
+                    nr = eingang.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    daten = await loop.run_in_executor(io, self.lesen, jobs[nr])
+                except Exception as e:
+                    melden(nr, None, str(e))
+                    continue
+                await zum_umwandeln.put((nr, daten))
+
+        async def arbeiter() -> None:
+            while True:
+                eintrag = await zum_umwandeln.get()
+                if eintrag is _ENDE:
+                    return
+                nr, daten = eintrag
+                try:
+                    ergebnis = await loop.run_in_executor(self.executor, self.umwandeln, daten)
+                except Exception as e:
+                    melden(nr, None, str(e))
+                    continue
+                await zum_schreiben.put((nr, ergebnis))
+
+        async def schreiber(io: ThreadPoolExecutor) -> None:
+            while True:
+                eintrag = await zum_schreiben.get()
+                if eintrag is _ENDE:
+                    return
+                nr, ergebnis = eintrag
+                try:
+                    status = await loop.run_in_executor(io, self.schreiben, jobs[nr], ergebnis)
+                except Exception as e:
+                    melden(nr, ergebnis, str(e))
+                    continue
+                melden(nr, ergebnis, None, status)
+
+        async def stufe(aufgaben: List[asyncio.Task], danach: asyncio.Queue, anzahl: int) -> None:
+            # wenn alle aufgaben fertig sind, die nächste Stufe beenden
+            await asyncio.gather(*aufgaben)
+            for _ in range(anzahl):
+                await danach.put(_ENDE)
+
+        async def messen() -> None:
+            while True:
+                self.messungen["umwandeln"].append(zum_umwandeln.qsize())
+                self.messungen["schreiben"].append(zum_schreiben.qsize())
+                await asyncio.sleep(self.intervall)
+
+        with ThreadPoolExecutor(max_workers=2 * self.io_threads) as io:
+            messung = asyncio.ensure_future(messen())
+            lesend = [asyncio.ensure_future(leser(io)) for _ in range(self.io_threads)]
+            umwandelnd = [asyncio.ensure_future(arbeiter()) for _ in range(self.arbeiter)]
+            schreibend = [asyncio.ensure_future(schreiber(io)) for _ in range(self.io_threads)]
+            await asyncio.gather(stufe(lesend, zum_umwandeln, self.arbeiter),
+                                 stufe(umwandelnd, zum_schreiben, self.io_threads),
+                                 *schreibend)
+            messung.cancel()
+        return erg
+
+    def tiefen(self) -> Dict[str, Tuple[float, int, int]]:
+        """für jede Warteschlange: (mittlere Länge, größte Länge, Größe)"""
+        return {name: (sum(werte) / len(werte) if werte else 0.0, max(werte, default=0), self.puffer)
+                for name, werte in self.messungen.items()}
+
+    def engpass(self) -> str:
+        """schätzt anhand der Warteschlangen, welche Stufe am längsten braucht"""
+        tiefen = self.tiefen()
+        if tiefen["schreiben"][0] >= self.puffer / 2:
+            return "schreiben"   # die Umwandlung wartet auf die Schreiber
+        if tiefen["umwandeln"][0] >= self.puffer / 2:
+            return "umwandeln"   # die Leser warten auf die Umwandlung
+        return "lesen"           # die Umwandlung wartet meistens auf neue Dateien
+
+    __doc__ = "Liest, wandelt und schreibt Dateien gleichzeitig über Warteschlangen mit fester Größe"
@@ -0,0 +1,171 @@
+# scan.py
+# Liest die Eingabeverzeichnisse und prüft die Ausgabeverzeichnisse mit möglichst wenigen Systemaufrufen.
+# os.scandir liefert Name und Typ jedes Eintrags ohne eigenen Systemaufruf. stat wird je Datei höchstens einmal
+# aufgerufen und von os.DirEntry zwischengespeichert, für alles weitere (Lesbarkeit, Größe für --shard, Änderungszeit
+# für --watch). os.access und os.path.isfile werden nicht mehr je Datei aufgerufen. Als root (und unter Windows)
+# ist jede Datei lesbar, dann braucht das Lesen eines Verzeichnisses gar kein stat.
+# Mit rekursiv werden auch Unterverzeichnisse gelesen (Kapitel/Abschnitte eines Liederbuchs). Jedes Verzeichnis wird
+# einmal ganz gelesen und nach Namen sortiert, Unterverzeichnisse erst, wenn sie an der Reihe sind. Im Speicher liegt
+# also nur der Inhalt der Verzeichnisse auf dem Weg zur aktuellen Datei, auch bei 100000 Einträgen je Verzeichnis.
+import functools
+import os
+import stat
+from typing import Collection, Dict, Iterator, List, Optional, Set, Tuple, Union
+
+pfad = Union[str, os.DirEntry]
+
+try:
+    _uid: Optional[int] = os.geteuid()
+except AttributeError:  # Windows
+    _uid = None
+
+
+@functools.lru_cache(maxsize=None)
+def _gruppen() -> frozenset:
+    return frozenset(os.getgroups()) | {os.getegid()}
+
+
+def _lesbar(entry: os.DirEntry) -> bool:
+    # stat nur, wenn es auf die Rechte ankommt
+    return _uid is None or _uid == 0 or erlaubt(entry.stat(), os.R_OK)
+
+
+def erlaubt(st: os.stat_result, modus: int = os.R_OK) -> bool:
+    """wie os.access(pfad, modus) mit os.R_OK oder os.W_OK, aber aus dem schon gelesenen stat-Ergebnis, ohne Systemaufruf.
+    ACLs und schreibgeschützte Dateisysteme werden nicht beachtet, dann schlägt erst das Öffnen fehl."""
+    if _uid is None:
+        # Windows: lesen darf man immer, schreiben nicht, wenn die Datei schreibgeschützt ist
+        return modus != os.W_OK or bool(st.st_mode & stat.S_IWRITE)
+    if _uid == 0:
+        return True
+    if st.st_uid == _uid:
+        verschiebung = 6  # Rechte des Besitzers
+    elif st.st_gid in _gruppen():
+        verschiebung = 3  # Rechte der Gruppe
+    else:
+        verschiebung = 0  # Rechte aller anderen
+    # os.R_OK und os.W_OK sind dieselben Bits wie r und w in st_mode
+    return bool((st.st_mode >> verschiebung) & modus)
+
+
+class Eingabe():
+    """eine Eingabedatei aus scannen. Kann wie ein os.DirEntry benutzt werden: name, path, stat(), open(eingabe).
+    name ist der Pfad relativ zum Eingabeverzeichnis, mit / getrennt, z.B. "kapitel-1/lied.txt"."""
+    __slots__ = ("name", "path", "_entry")
+
+    def __init__(self, name: str, path: str, entry: Optional[os.DirEntry] = None) -> None:
+        self.name = name
+        self.path = path
+        self._entry = entry
+
+    def stat(self) -> os.stat_result:
+        """stat der Datei, vom DirEntry zwischengespeichert"""
+        return os.stat(self.path) if self._entry is None else self._entry.stat()
+
+    def __reduce__(self):
+        # DirEntry lässt sich nicht an Arbeitsprozesse übergeben, dort reichen Name und Pfad
+        return Eingabe, (self.name, self.path)
+
+    def is_file(self) -> bool:
+        return True
+
+    def __fspath__(self) -> str:
+        return self.path
+
+    def __repr__(self) -> str:
+        return "<Eingabe {!r}>".format(self.name)
+
+
+def scannen(verzeichnis: pfad, rekursiv: bool = False, auslassen: Collection[str] = ()) -> Iterator[Eingabe]:
+    """alle lesbaren Dateien in verzeichnis, nach Namen sortiert (Unterverzeichnisse an der Stelle ihres Namens).
+    rekursiv: auch alle Unterverzeichnisse. Versteckte Verzeichnisse (.git, ...) und Verknüpfungen auf Verzeichnisse
+    werden ausgelassen, ebenso die Verzeichnisse in auslassen (absolute Pfade), z.B. ein Ausgabeverzeichnis
+    innerhalb des Eingabeverzeichnisses.
+    Dateien, die während des Lesens gelöscht werden, fehlen einfach."""
+    auslassen = {os.path.abspath(a) for a in auslassen}
+    yield from _scannen(os.fspath(verzeichnis), "", rekursiv, auslassen)
+
+
+def _scannen(verzeichnis: str, praefix: str, rekursiv: bool, auslassen: Collection[str]) -> Iterator[Eingabe]:
+    # (Name, ist ein Unterverzeichnis, DirEntry) je lesbarer Datei und Unterverzeichnis.
+    # Die Namen in einem Verzeichnis sind verschieden, sortiert wird also nur nach ihnen.
+    eintraege: List[Tuple[str, bool, os.DirEntry]] = []
+    with os.scandir(verzeichnis) as listing:
+        for entry in listing:
+            try:
+                if entry.is_file():
+                    if _lesbar(entry):
+                        eintraege.append((entry.name, False, entry))
+                elif rekursiv and entry.is_dir(follow_symlinks=False) and not entry.name.startswith('.') \
+                        and os.path.abspath(entry.path) not in auslassen:
+                    eintraege.append((entry.name, True, entry))
+            except OSError:  # zwischendurch gelöscht
+                continue
+    eintraege.sort()
+    for name, unterverzeichnis, entry in eintraege:
+        if unterverzeichnis:
+            try:
+                yield from _scannen(entry.path, praefix + name + "/", rekursiv, auslassen)
+            except OSError:  # zwischendurch gelöscht oder nicht lesbar
+                continue
+        else:
+            yield Eingabe(praefix + name, entry.path, entry)
+
+
+class Ausgaben():
+    def __init__(self) -> None:
+        """Jedes Ausgabeverzeichnis wird beim ersten Mal mit os.scandir gelesen, danach beantworten schreibbar und
+        vorhanden alle Fragen zu Dateien darin ohne weiteren Systemaufruf, außer vor dem Überschreiben."""
+        # Verzeichnis -> (darf darin geschrieben werden, Name -> DirEntry)
+        # Existiert das Verzeichnis noch nicht, ist das Dict leer und es zählt das nächste vorhandene darüber.
+        self._verzeichnisse: Dict[str, Tuple[bool, Dict[str, os.DirEntry]]] = dict()
+        self._angelegt: Set[str] = set()
+
+    def _verzeichnis(self, verzeichnis: str) -> Tuple[bool, Dict[str, os.DirEntry]]:
+        erg = self._verzeichnisse.get(verzeichnis)
+        if erg is not None:
+            return erg
+        dateien: Dict[str, os.DirEntry] = dict()
+        try:
+            with os.scandir(verzeichnis or '.') as listing:
+                for entry in listing:
+                    dateien[entry.name] = entry
+            schreibbar = os.access(verzeichnis or '.', os.W_OK)
+        except FileNotFoundError:
+            # wird erst angelegt, das geht, wenn das nächste vorhandene Verzeichnis darüber schreibbar ist
+            oben = os.path.dirname(verzeichnis)
+            schreibbar = oben != verzeichnis and self._verzeichnis(oben)[0]
+        except OSError:
+            schreibbar = False
+        erg = self._verzeichnisse[verzeichnis] = (schreibbar, dateien)
+        return erg
+
+    def schreibbar(self, datei: pfad, allow_overwrite: bool = False) -> bool:
+        """wie fileIsWriteable in converter.py: datei kann geschrieben werden und (es darf überschrieben werden
+        oder die Datei existiert nicht)"""
+        verzeichnis, name = os.path.split(os.fspath(datei))
+        schreibbar, dateien = self._verzeichnis(verzeichnis)
+        entry = dateien.get(name)
+        if entry is None:
+            return schreibbar
+        # Verzeichnisse und schreibgeschützte Dateien nie, sonst nur, wenn überschrieben werden darf.
+        # Nur dann wird stat gebraucht.
+        try:
+            return allow_overwrite and entry.is_file() and erlaubt(entry.stat(), os.W_OK)
+        except OSError:  # zwischendurch gelöscht
+            return schreibbar
+
+    def vorhanden(self, datei: pfad) -> bool:
+        """wie os.path.isfile, aus dem gelesenen Verzeichnis"""
+        verzeichnis, name = os.path.split(os.fspath(datei))
+        entry = self._verzeichnis(verzeichnis)[1].get(name)
+        return entry is not None and entry.is_file()
+
+    def anlegen(self, datei: pfad) -> None:
+        """legt das Verzeichnis für datei an, falls es noch nicht existiert"""
+        verzeichnis = os.path.dirname(os.fspath(datei))
+        if verzeichnis and verzeichnis not in self._angelegt:
+            os.makedirs(verzeichnis, exist_ok=True)
+            self._angelegt.add(verzeichnis)
+
+    __doc__ = "Prüft, ob Ausgabedateien geschrieben werden dürfen. Jedes Ausgabeverzeichnis wird nur einmal gelesen."
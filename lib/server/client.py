@@ -0,0 +1,86 @@
+# client.py
+# Einfacher Client für server.py, z.B. zum Testen oder für Editor-Erweiterungen.
+# Spricht entweder über einen Unix-Socket mit einem laufenden Server oder startet selbst einen Server
+# als Unterprozess und spricht über dessen stdin/stdout.
+import itertools
+import json
+import socket
+import subprocess
+import sys
+import threading
+from typing import Any, Dict, List, Optional
+
+
+class Client():
+    def __init__(self, socket_pfad: Optional[str] = None, argumente: Optional[List[str]] = None) -> None:
+        """socket_pfad: mit dem Server an diesem Socket verbinden.
+        None: einen Server als Unterprozess starten, argumente: Kommandozeile dafür (Standard: python3 server.py)"""
+        self._ids = itertools.count(1)
+        self._prozess = None
+        self._socket = None
+        if socket_pfad is not None:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(socket_pfad)
+            self._schreiben = self._socket.makefile('w', encoding='utf-8')
+            self._lesen = self._socket.makefile('r', encoding='utf-8')
+        else:
+            self._prozess = subprocess.Popen(argumente or [sys.executable, "server.py"], stdin=subprocess.PIPE,
+                                             stdout=subprocess.PIPE, encoding='utf-8')
+            self._schreiben = self._prozess.stdin
+            self._lesen = self._prozess.stdout
+
+    def senden(self, anfragen: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """schickt alle anfragen auf einmal, der Server bearbeitet sie gleichzeitig.
+        Anfragen ohne id bekommen eine. Gibt die Antworten in der Reihenfolge der anfragen zurück."""
+        anfragen = [a if "id" in a else dict(a, id=next(self._ids)) for a in anfragen]
+
+        def schreiben() -> None:
+            for anfrage in anfragen:
+                self._schreiben.write(json.dumps(anfrage, ensure_ascii=False) + '\n')
+            self._schreiben.flush()
+
+        # gleichzeitig schreiben und lesen, sonst warten bei vielen Anfragen beide Seiten aufeinander
+        sender = threading.Thread(target=schreiben, daemon=True)
+        sender.start()
+        antworten = dict()
+        while len(antworten) < len(anfragen):
+            zeile = self._lesen.readline()
+            if not zeile:
+                raise ConnectionError("der Server hat die Verbindung geschlossen")
+            antwort = json.loads(zeile)
+            antworten[antwort.get("id")] = antwort
+        sender.join()
+        return [antworten[anfrage["id"]] for anfrage in anfragen]
+
+    def convert(self, text: str) -> Dict[str, Any]:
+        """wandelt ein Lied um. Antwort: latex, zeilen, diagnosen, dauer_ms oder fehler"""
+        return self.senden([dict(text=text)])[0]
+
+    def statistik(self) -> Dict[str, Any]:
+        """Anzahl der Anfragen und Perzentile der Antwortzeiten des Servers"""
+        return self.senden([dict(befehl="statistik")])[0]
+
+    def ende(self) -> None:
+        """beendet den Server und die Verbindung"""
+        self.senden([dict(befehl="ende")])
+        self.close()
+
+    def close(self) -> None:
+        if self._socket is not None:
+            self._schreiben.close()
+            self._lesen.close()
+            self._socket.close()
+            self._socket = None
+        if self._prozess is not None:
+            self._prozess.stdin.close()
+            self._prozess.wait()
+            self._prozess.stdout.close()
+            self._prozess = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    __doc__ = "Client für server.py über einen Unix-Socket oder einen eigenen Server-Prozess"
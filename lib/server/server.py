@@ -0,0 +1,214 @@
+# server.py
+# Beantwortet Anfragen im Format JSON-Lines (ein JSON-Objekt je Zeile) über stdin/stdout oder einen Unix-Socket.
+# Jede Anfrage wird sofort an den executor übergeben, mehrere Anfragen laufen also gleichzeitig.
+# Die Antworten kommen in der Reihenfolge, in der sie fertig werden, und tragen die id der Anfrage.
+#   {"id": 1, "text": "..."}        ->  Antwort von bearbeiten(text), ergänzt um id und dauer_ms
+#   {"id": 2, "befehl": "statistik"} ->  Anzahl der Anfragen und Perzentile der Antwortzeiten
+#   {"id": 3, "befehl": "ende"}      ->  beendet den Server, nachdem alle offenen Anfragen beantwortet sind
+import asyncio
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, Optional, Set
+
+
+class Latenzen():
+    def __init__(self, anzahl: int = 10000) -> None:
+        """anzahl: für die Perzentile werden nur die letzten anzahl Antwortzeiten verwendet"""
+        self.zeiten: deque = deque(maxlen=anzahl)
+        self.anfragen = 0
+        self.fehler = 0
+
+    def eintragen(self, dauer: float, fehler: bool = False) -> None:
+        """dauer in Sekunden"""
+        self.zeiten.append(dauer)
+        self.anfragen += 1
+        self.fehler += fehler
+
+    def perzentil(self, p: float) -> float:
+        """p-tes Perzentil (0..100) der Antwortzeiten in ms, nächster Rang"""
+        if not self.zeiten:
+            return 0.0
+        sortiert = sorted(self.zeiten)
+        rang = max(0, min(len(sortiert) - 1, int(-(-p * len(sortiert) // 100)) - 1))
+        return sortiert[rang] * 1000
+
+    def statistik(self) -> Dict[str, Any]:
+        erg: Dict[str, Any] = dict(anfragen=self.anfragen, fehler=self.fehler)
+        for p in (50, 90, 99):
+            erg["p{}_ms".format(p)] = round(self.perzentil(p), 3)
+        erg["max_ms"] = round(max(self.zeiten, default=0.0) * 1000, 3)
+        return erg
+
+    def __str__(self) -> str:
+        s = self.statistik()
+        return "{anfragen} Anfragen, {fehler} fehlgeschlagen, p50 {p50_ms:.1f} ms, p90 {p90_ms:.1f} ms, " \
+               "p99 {p99_ms:.1f} ms, max {max_ms:.1f} ms".format(**s)
+
+
+class Server():
+    def __init__(self, bearbeiten: Callable[[str], Dict[str, Any]], executor: Executor) -> None:
+        """bearbeiten(text) -> Antwort als dict: läuft im executor, bei einem ProcessPoolExecutor muss die Funktion
+            picklebar sein. Enthält die Antwort den Schlüssel "fehler", zählt die Anfrage als fehlgeschlagen."""
+        self.bearbeiten = bearbeiten
+        self.executor = executor
+        self.latenzen = Latenzen()
+        self._ende: Optional[asyncio.Event] = None
+
+    async def anfrage(self, zeile: str) -> Dict[str, Any]:
+        """beantwortet eine Zeile des Protokolls"""
+        start = time.perf_counter()
+        try:
+            anfrage = json.loads(zeile)
+            if not isinstance(anfrage, dict):
+                raise ValueError("die Anfrage muss ein JSON-Objekt sein")
+        except ValueError as e:
+            self.latenzen.eintragen(time.perf_counter() - start, fehler=True)
+            return dict(id=None, fehler="ungültige Anfrage: " + str(e))
+        befehl = anfrage.get("befehl")
+        if befehl == "statistik":
+            antwort = self.latenzen.statistik()
+        elif befehl == "ende":
+            self._ende.set()
+            antwort = dict(ende=True)
+        elif befehl is not None:
+            antwort = dict(fehler="unbekannter befehl: " + str(befehl))
+        elif not isinstance(anfrage.get("text"), str):
+            antwort = dict(fehler="text fehlt")
+        else:
+            loop = asyncio.get_running_loop()
+            try:
+                antwort = await loop.run_in_executor(self.executor, self.bearbeiten, anfrage["text"])
+            except Exception as e:  # z.B. ein abgestürzter Arbeitsprozess
+                antwort = dict(fehler=str(e))
+            dauer = time.perf_counter() - start
+            self.latenzen.eintragen(dauer, fehler="fehler" in antwort)
+            antwort["dauer_ms"] = round(dauer * 1000, 3)
+        return dict(id=anfrage.get("id"), **antwort)
+
+    async def _verbindung(self, zeile_lesen: Callable, antworten: Callable[[str], Any]) -> None:
+        # liest Zeilen, bis die Eingabe endet oder der Server beendet wird. Jede Anfrage läuft als eigene Aufgabe.
+        offen: Set[asyncio.Task] = set()
+
+        async def beantworten(zeile: str) -> None:
+            await antworten(json.dumps(await self.anfrage(zeile), ensure_ascii=False) + '\n')
+
+        ende = asyncio.ensure_future(self._ende.wait())
+        try:
+            while not self._ende.is_set():
+                lesen = asyncio.ensure_future(zeile_lesen())
+                await asyncio.wait({lesen, ende}, return_when=asyncio.FIRST_COMPLETED)
+                if not lesen.done():
+                    lesen.cancel()
+                    break
+                zeile = lesen.result()
+                if not zeile:
+                    break  # Eingabe zu Ende
+                if zeile.strip():
+                    aufgabe = asyncio.ensure_future(beantworten(zeile))
+                    offen.add(aufgabe)
+                    aufgabe.add_done_callback(offen.discard)
+            if offen:
+                await asyncio.wait(offen)
+        finally:
+            ende.cancel()
+
+    async def stdio(self) -> None:
+        """Anfragen von stdin, Antworten auf stdout, beides UTF-8. Andere Ausgaben auf stdout werden nach stderr umgeleitet,
+        damit sie das Protokoll nicht stören."""
+        self._ende = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        ausgabe = sys.stdout
+        sys.stdout = sys.stderr
+        # readline blockiert, deshalb in einem eigenen Thread. Endet der Server mit "ende", während der Client stdin
+        # noch offen hat, hängt dieser Thread weiter in readline. Er ist deshalb ein Daemon-Thread: Threads eines
+        # ThreadPoolExecutor wartet Python beim Beenden ab (auch nach shutdown(wait=False)), der Server würde sonst
+        # erst beendet, wenn der Client stdin schließt.
+        # Nicht sys.stdin verwenden: neue Arbeitsprozesse schließen beim Start sys.stdin und würden
+        # sonst auf das readline warten, das gerade läuft.
+        eingabe = open(sys.stdin.fileno(), 'r', encoding='utf-8', closefd=False)
+        auftraege: queue.SimpleQueue = queue.SimpleQueue()  # Futures, die auf die nächste Zeile warten
+
+        def ergebnis_setzen(future: asyncio.Future, zeile: str) -> None:
+            if not future.done():  # abgebrochen, weil der Server beendet wurde
+                future.set_result(zeile)
+
+        def lesen() -> None:
+            while True:
+                future = auftraege.get()
+                zeile = eingabe.readline()
+                try:
+                    loop.call_soon_threadsafe(ergebnis_setzen, future, zeile)
+                except RuntimeError:  # die Schleife ist schon beendet
+                    return
+                if not zeile:
+                    return
+
+        def zeile_lesen() -> asyncio.Future:
+            # erst lesen, wenn die nächste Zeile gebraucht wird, wie vorher mit run_in_executor
+            future = loop.create_future()
+            auftraege.put(future)
+            return future
+
+        threading.Thread(target=lesen, name="stdin", daemon=True).start()
+        # Schreiben kann ebenfalls blockieren, wenn der Client gerade nicht liest. Ein einzelner Thread
+        # hält die Antworten in der richtigen Reihenfolge und die Schleife kann weiter Anfragen lesen.
+        from concurrent.futures import ThreadPoolExecutor
+        schreiber = ThreadPoolExecutor(max_workers=1)
+
+        def schreiben(text: str) -> None:
+            ausgabe.buffer.write(text.encode('utf-8'))
+            ausgabe.buffer.flush()
+
+        async def antworten(text: str) -> None:
+            await loop.run_in_executor(schreiber, schreiben, text)
+
+        try:
+            await self._verbindung(zeile_lesen, antworten)
+        finally:
+            schreiber.shutdown(wait=True)
+            sys.stdout = ausgabe
+
+    async def unix(self, socket_pfad: str) -> None:
+        """Anfragen über einen Unix-Socket, beliebig viele Verbindungen gleichzeitig.
+        Läuft, bis ein Client "ende" schickt. Danach wird die Socket-Datei gelöscht."""
+        self._ende = asyncio.Event()
+        verbindungen: Set[asyncio.Task] = set()
+
+        async def verbindung(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+            async def antworten(text: str) -> None:
+                writer.write(text.encode('utf-8'))
+                await writer.drain()
+
+            async def zeile_lesen() -> str:
+                return (await reader.readline()).decode('utf-8')
+
+            aufgabe = asyncio.current_task()
+            verbindungen.add(aufgabe)
+            try:
+                await self._verbindung(zeile_lesen, antworten)
+            except ConnectionError:
+                pass  # der Client hat die Verbindung vorzeitig geschlossen
+            finally:
+                verbindungen.discard(aufgabe)
+                writer.close()
+
+        server = await asyncio.start_unix_server(verbindung, path=socket_pfad, limit=1 << 24)
+        try:
+            await self._ende.wait()
+            server.close()
+            if verbindungen:
+                await asyncio.wait(set(verbindungen))
+            await server.wait_closed()
+        finally:
+            try:
+                os.remove(socket_pfad)
+            except OSError:
+                pass
+
+    __doc__ = "Beantwortet JSON-Lines-Anfragen über stdin/stdout oder einen Unix-Socket, mehrere gleichzeitig"
@@ -0,0 +1,197 @@
+# shard.py
+# Teilt die Lieder auf mehrere Rechner (z.B. CI-Runner) auf: mit --shard I/N wandelt converter.py nur den I-ten von N Teilen um.
+# Die Aufteilung hängt nur von Namen und Größen der Dateien ab, jeder Rechner kommt mit demselben Verzeichnis also
+# zum selben Ergebnis. Die Teile werden nach Größe ausgeglichen, nicht nach Namen: große Lieder brauchen länger.
+# Jeder Teil schreibt ein Shard-Manifest. zusammenfuehren prüft vor dem Bündeln, ob alle Teile vollständig da sind
+# und ob zwei Teile dasselbe Lied oder dieselbe Ausgabedatei erzeugt haben.
+import glob
+import hashlib
+import heapq
+import json
+import os
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from lib.manifest.manifest import file_hash
+
+pfad = Union[str, os.DirEntry]
+
+_format = 1  # Version des Dateiformats
+_name_muster = re.compile(r"\.songbook-shard-(\d+)-von-(\d+)\.json$")
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """"I/N" -> (I, N), I zählt ab 1. ValueError, wenn text keine gültige Angabe ist."""
+    nummer, strich, anzahl = text.partition('/')
+    if not strich or not nummer.strip().isdigit() or not anzahl.strip().isdigit():
+        raise ValueError("erwartet I/N, z.B. 2/4")
+    nummer, anzahl = int(nummer), int(anzahl)
+    if not 1 <= nummer <= anzahl:
+        raise ValueError("I muss zwischen 1 und N liegen")
+    return nummer, anzahl
+
+
+def aufteilen(dateien: Iterable[Tuple[str, int]], anzahl: int) -> List[List[str]]:
+    """teilt dateien ((Name, Größe) je Lied) in anzahl Teile mit möglichst gleicher Gesamtgröße.
+    Die größten Lieder zuerst, jedes in den Teil, der bisher am kleinsten ist (bei Gleichstand der mit der kleineren Nummer).
+    Das Ergebnis hängt nicht von der Reihenfolge der dateien ab. Rückgabe: die Namen je Teil, sortiert"""
+    teile: List[List[str]] = [[] for _ in range(anzahl)]
+    stand = [(0, nr) for nr in range(anzahl)]  # (bisherige Größe, Nummer des Teils), als Heap
+    for name, groesse in sorted(dateien, key=lambda datei: (-datei[1], datei[0])):
+        summe, nr = heapq.heappop(stand)
+        teile[nr].append(name)
+        heapq.heappush(stand, (summe + groesse, nr))
+    return [sorted(teil) for teil in teile]
+
+
+def korpus_kennung(dateien: Iterable[Tuple[str, int]]) -> str:
+    """Hash über Namen und Größen aller Lieder. Alle Teile müssen dieselbe Kennung haben, sonst haben sie
+    verschiedene Verzeichnisse aufgeteilt und passen nicht zusammen."""
+    h = hashlib.sha256()
+    for name, groesse in sorted(dateien):
+        h.update("{}\t{}\n".format(name, groesse).encode('utf-8', 'surrogatepass'))
+    return h.hexdigest()
+
+
+def shard_manifest_name(nummer: int, anzahl: int) -> str:
+    """Dateiname des Shard-Manifests im Ausgabeverzeichnis"""
+    return ".songbook-shard-{}-von-{}.json".format(nummer, anzahl)
+
+
+def build_manifest_name(nummer: int, anzahl: int) -> str:
+    """Dateiname des Build-Manifests (lib.manifest) eines Teils. Jeder Teil hat ein eigenes,
+    damit mehrere Teile in dasselbe Ausgabeverzeichnis schreiben können."""
+    return ".songbook-manifest-{}-von-{}.json".format(nummer, anzahl)
+
+
+class ShardManifest():
+    def __init__(self, path: pfad, nummer: int, anzahl: int, version: str, template_hash: str,
+                 korpus: str, lieder: Iterable[str]) -> None:
+        """path: Pfad des Shard-Manifests (siehe shard_manifest_name)
+        nummer, anzahl: dieser Teil ist der nummer-te von anzahl
+        version, template_hash: wie beim Build-Manifest, alle Teile müssen gleich sein
+        korpus: korpus_kennung aller Lieder
+        lieder: Namen der Lieder, die zu diesem Teil gehören"""
+        self.path = path
+        self.nummer = nummer
+        self.anzahl = anzahl
+        self.version = version
+        self.template_hash = template_hash
+        self.korpus = korpus
+        self.lieder = sorted(lieder)
+        # Eingabedateiname -> {"hash", "out", "out_hash", "title", "index"} der erfolgreich umgewandelten Lieder
+        self.dateien: Dict[str, Dict[str, Optional[str]]] = dict()
+        # Eingabedateiname -> Fehlermeldung
+        self.fehler: Dict[str, str] = dict()
+
+    def eintragen(self, name: str, inhash: str, outpath: pfad, titel: str, alttitel: Optional[str]) -> None:
+        """vermerkt, dass outpath aus der Eingabe name erzeugt wurde. Titel und Alternativtitel braucht das Liederbuch.
+        out ist der Pfad relativ zum Manifest, mit converter.py --rekursiv auch in einem Unterverzeichnis."""
+        out = os.path.relpath(outpath, os.path.dirname(os.fspath(self.path)) or '.').replace(os.sep, '/')
+        self.dateien[name] = dict(hash=inhash, out=out, out_hash=file_hash(outpath),
+                                  title=titel, index=alttitel)
+        self.fehler.pop(name, None)
+
+    def fehlgeschlagen(self, name: str, meldung: str) -> None:
+        """vermerkt, dass das Lied name nicht umgewandelt werden konnte"""
+        self.dateien.pop(name, None)
+        self.fehler[name] = meldung
+
+    def save(self) -> None:
+        """schreibt das Manifest. Erst in eine temporäre Datei, damit ein Absturz kein halbes Manifest hinterlässt."""
+        data = dict(format=_format, shard=[self.nummer, self.anzahl], version=self.version, template=self.template_hash,
+                    korpus=self.korpus, lieder=self.lieder, dateien=self.dateien, fehler=self.fehler)
+        tmp = os.fspath(self.path) + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=0, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    __doc__ = "Shard-Manifest: welche Lieder ein Teil umwandeln sollte, was daraus geworden ist, Titel für das Liederbuch"
+
+
+def finden(verzeichnisse: Iterable[pfad]) -> List[str]:
+    """alle Shard-Manifeste in den Verzeichnissen"""
+    pfade = []
+    for verzeichnis in verzeichnisse:
+        pfade.extend(sorted(p for p in glob.glob(os.path.join(glob.escape(os.fspath(verzeichnis)), ".songbook-shard-*.json"))
+                            if _name_muster.search(p)))
+    return pfade
+
+
+def zusammenfuehren(pfade: Iterable[str]) -> Tuple[Dict[str, Dict[str, Optional[str]]], List[str]]:
+    """prüft die Shard-Manifeste pfade, bevor die Teile zusammengeführt werden:
+    - alle Teile 1 bis N sind genau einmal da, mit gleicher Version, gleichem Template und gleichem Verzeichnis (korpus)
+    - jedes Lied wurde umgewandelt, von genau einem Teil
+    - keine zwei Lieder haben dieselbe Ausgabedatei
+    - jede Ausgabedatei liegt neben ihrem Manifest und wurde seitdem nicht verändert
+    Rückgabe: (Eingabedateiname -> Eintrag wie in ShardManifest mit "verzeichnis" der Ausgabe, Liste der Probleme).
+    Ist die Liste leer, können die Teile gebündelt werden."""
+    probleme = []
+    manifeste = []
+    for p in pfade:
+        try:
+            with open(p, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError) as e:
+            probleme.append("{} kann nicht gelesen werden: {}".format(p, e))
+            continue
+        if not isinstance(data, dict) or data.get("format") != _format:
+            probleme.append("{} ist kein Shard-Manifest in diesem Format".format(p))
+            continue
+        manifeste.append((p, data))
+    if not manifeste:
+        return dict(), probleme + ["keine Shard-Manifeste gefunden"]
+
+    erstes_pfad, erstes = manifeste[0]
+    anzahl = erstes["shard"][1]
+    for p, data in manifeste[1:]:
+        for schluessel, bedeutung in (("version", "Konverterversion"), ("template", "Template"),
+                                      ("korpus", "Lieder (Namen oder Größen)")):
+            if data.get(schluessel) != erstes.get(schluessel):
+                probleme.append("{} und {} passen nicht zusammen: {} unterschiedlich".format(erstes_pfad, p, bedeutung))
+        if data["shard"][1] != anzahl:
+            probleme.append("{} und {}: verschiedene Anzahl Teile ({} und {})".format(erstes_pfad, p, anzahl, data["shard"][1]))
+
+    teile: Dict[int, str] = dict()
+    doppelt = set()  # die Lieder doppelter Teile werden nicht noch einmal einzeln gemeldet
+    for p, data in manifeste:
+        nummer = data["shard"][0]
+        if nummer in teile:
+            probleme.append("Teil {}/{} ist doppelt: {} und {}".format(nummer, anzahl, teile[nummer], p))
+            doppelt.add(p)
+            continue
+        teile[nummer] = p
+    for nummer in range(1, anzahl + 1):
+        if nummer not in teile:
+            probleme.append("Teil {}/{} fehlt".format(nummer, anzahl))
+
+    lieder: Dict[str, Dict[str, Optional[str]]] = dict()
+    herkunft: Dict[str, str] = dict()      # Eingabedateiname -> Manifest
+    ausgaben: Dict[str, str] = dict()      # Ausgabedateiname -> Eingabedateiname
+    for p, data in manifeste:
+        if p in doppelt:
+            continue
+        verzeichnis = os.path.dirname(p)
+        for name in data["lieder"]:
+            if name in herkunft:
+                probleme.append("{} gehört zu zwei Teilen: {} und {}".format(name, herkunft[name], p))
+                continue
+            herkunft[name] = p
+            eintrag = data["dateien"].get(name)
+            if eintrag is None:
+                probleme.append("{} wurde nicht umgewandelt ({}): {}".format(name, p, data["fehler"].get(name, "kein Eintrag")))
+                continue
+            if eintrag["out"] in ausgaben:
+                probleme.append("{} und {} haben dieselbe Ausgabedatei {}".format(ausgaben[eintrag["out"]], name, eintrag["out"]))
+                continue
+            ausgaben[eintrag["out"]] = name
+            outpath = os.path.join(verzeichnis, eintrag["out"])
+            try:
+                if file_hash(outpath) != eintrag["out_hash"]:
+                    probleme.append("{} wurde nach Teil {}/{} verändert".format(outpath, data["shard"][0], anzahl))
+                    continue
+            except OSError:
+                probleme.append("{} fehlt".format(outpath))
+                continue
+            lieder[name] = dict(eintrag, verzeichnis=verzeichnis)
+    return lieder, probleme
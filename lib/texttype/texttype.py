@@ -1,127 +1,248 @@
-from typing import List, Tuple, Set
+from array import array
+import threading
+from typing import Dict, List, Optional, Tuple, Set
 """Erlaubt das einfache Arbeiten mit texen zugeordneten daten.
 Geschrieben, um Text zeilenweise zu klassifizieren"""
 
+# Die typen werden nicht als strings, sondern als kleine Zahlen in arrays gespeichert (ein Byte je Zeile und typ).
+# Die Zuordnung gilt für alle texttype-objekte im Prozess. Code 0 steht für None (kein typ).
+_namen: List[Optional[str]] = [None]
+_codes: Dict[Optional[str], int] = {None: 0}
+_codes_lock = threading.Lock()
+
+
+def typ_code(typ: Optional[str]) -> int:
+    """Code für den typ, neue typen bekommen den nächsten freien Code"""
+    code = _codes.get(typ)
+    if code is None:
+        with _codes_lock:
+            code = _codes.get(typ)
+            if code is None:
+                if len(_namen) > 255:
+                    raise ValueError("zu viele verschiedene typen")
+                code = len(_namen)
+                _namen.append(typ)
+                _codes[typ] = code
+    return code
+
+
+def typ_name(code: int) -> Optional[str]:
+    """typ zum Code"""
+    return _namen[code]
+
+
+def _codes_array(typen) -> array:
+    try:
+        return array('B', map(_codes.__getitem__, typen))
+    except KeyError:
+        # neue typen: erst alle eintragen
+        for typ in typen:
+            typ_code(typ)
+        return array('B', map(_codes.__getitem__, typen))
+
+
 class texttype():
+    # Die Zeilen und typen liegen in gemeinsamen listen/arrays. split und [] erzeugen nur Sichten auf
+    # den Bereich [_start, _stop), ohne etwas zu kopieren. Erst wenn eine Sicht geändert wird,
+    # bekommt sie eine eigene Kopie ihres Bereiches (siehe _eigene_daten).
+    __slots__ = ('_zeilen', '_gew', '_typen', '_start', '_stop', '_geteilt')
+
     def __init__(self, data: List[Tuple[str]], gew_typ=None):
         """Data: [('string', typ1, Typ2, ...), ...]
-        gew_typ: None oder liste von typen. 
+        gew_typ: None oder liste von typen.
         Der gewählte typ für ein Element wird jeweils ein typ (nicht notwendig aus den typen in data)"""
-        self.data = data
+        self._setzen(data, gew_typ)
+
+    def _setzen(self, data: List[Tuple[str]], gew_typ) -> None:
+        # Speicher aus den Tupeln in data aufbauen
+        laengen = set(map(len, data))
+        if len(laengen) == 1:
+            # alle Elemente haben gleich viele typen (z.B. Ausgabe der Heuristik): einfach transponieren
+            spalten = list(zip(*data))
+        else:
+            # Maximale Anzahl der typen, die für einen string gespeichert sind. Fehlende typen sind None.
+            anz = max(laengen, default=1)
+            spalten = [[frame[k] if len(frame) > k else None for frame in data] for k in range(anz)]
+        zeilen = list(spalten[0]) if spalten else []
+        typen = tuple(_codes_array(spalte) for spalte in spalten[1:])
         # gewählter typ. Standartmäßig ist kein typ gewählt.
-        if gew_typ is None:
-            self.gew_typ = [None]*len(self.data)
-        else: 
-            self.gew_typ = gew_typ
-        self.str = []
-        self.typ = []
-        # Die Arbeitsdatengenerierung frisst Speicher und rechenzeit. Sie wird nur gemacht, wenn nötig
-        self.workingDataOK = False    
+        gew = array('B', bytes(len(zeilen))) if gew_typ is None else _codes_array(gew_typ)
+        if len(gew) != len(zeilen):
+            raise ValueError("gew_typ muss genauso lang sein wie data")
+        self._speicher(zeilen, gew, typen)
+
+    def _speicher(self, zeilen: List[str], gew: array, typen: Tuple[array, ...]) -> None:
+        # neuen, eigenen Speicher verwenden
+        self._zeilen = zeilen
+        self._gew = gew
+        self._typen = typen
+        self._start = 0
+        self._stop = len(zeilen)
+        self._geteilt = False
+
+    def _sicht(self, start: int, stop: int):
+        """neues objekt derselben Klasse für die Zeilen [start, stop) dieses objektes, ohne Kopie"""
+        erg = self.__class__.__new__(self.__class__)
+        erg._zeilen = self._zeilen
+        erg._gew = self._gew
+        erg._typen = self._typen
+        erg._start = self._start + start
+        erg._stop = self._start + stop
+        erg._geteilt = True
+        erg._neue_sicht()
+        # Der Speicher wird jetzt von beiden verwendet, Änderungen an diesem objekt brauchen ab jetzt eine Kopie
+        self._geteilt = True
+        return erg
+
+    def _neue_sicht(self) -> None:
+        """Für Unterklassen: initialisiert die eigenen Attribute einer neuen Sicht"""
+        pass
+
+    def _eigene_daten(self) -> None:
+        """kopiert den Bereich in eigenen Speicher, falls er mit anderen objekten geteilt wird"""
+        if self._geteilt:
+            a, b = self._start, self._stop
+            self._speicher(self._zeilen[a:b], self._gew[a:b], tuple(spalte[a:b] for spalte in self._typen))
+
+    # Die Arbeitsdaten (str, typ) werden nicht mehr zwischengespeichert, sondern bei Bedarf aus dem Speicher gelesen.
+    # Die Methoden bleiben, damit alter Code weiter funktioniert.
+    workingDataOK = True
 
     def _updateWD(self):
         """bringt die arbeitsdaten ggf. auf den neusten stand"""
-        if not self.workingDataOK:
-            self._generateWorkingData()#
+        pass
 
     def invalidateWD(self):
         """die Arbeitscdaten als veraltet markieren.
-        Sie werden bei bedarf neu generiert. 
+        Sie werden bei bedarf neu generiert.
         Das ist im allgemeinen nur nach manuellen Änderungen nötig"""
-        self.workingDataOK = False
-        # Speicher sparen:
-        self.str = []
-        self.typ = []
-
-    def _generateWorkingData(self):
-        # Arbeitsdaten generieren. Diese funktion muss in __init__ und ggf. nach Modifikationen aufgerufen werden.
-        self.str = []
-        self.typ = []
-        # Maximale Anzahl der typen, die für einen string gespeichert sind
-        self.anz_typen = max(len(frame)-1 for frame in self.data)
-        for frame in self.data:
-            self.str.append(frame[0])
-            self.typ.append(list(frame[1:]) + [None] * (self.anz_typen - len(frame[1:])))
-        self.workingDataOK = True
+        pass
+
+    @property
+    def anz_typen(self) -> int:
+        """Maximale Anzahl der typen, die für einen string gespeichert sind"""
+        return len(self._typen)
+
+    @property
+    def str(self) -> List[str]:
+        """alle strings als neue liste"""
+        return self._zeilen[self._start:self._stop]
+
+    @property
+    def typ(self) -> List[List[Optional[str]]]:
+        """für jedes Element die liste der vorgeschlagenen typen, mit None aufgefüllt"""
+        a, b = self._start, self._stop
+        return [[_namen[c] for c in codes] for codes in zip(*(spalte[a:b] for spalte in self._typen))] \
+            if self._typen else [[] for _ in range(a, b)]
+
+    @property
+    def data(self) -> List[Tuple]:
+        """[('string', typ1, Typ2, ...), ...] wie im Konstruktor, fehlende typen sind None"""
+        return [(zeile,) + tuple(typen) for zeile, typen in zip(self.str, self.typ)]
+
+    @data.setter
+    def data(self, data: List[Tuple[str]]) -> None:
+        self._setzen(data, None if len(data) != len(self) else self.gew_typ)
+
+    @property
+    def gew_typ(self) -> List[Optional[str]]:
+        """gewählter typ je Element als neue liste"""
+        return [_namen[c] for c in self._gew[self._start:self._stop]]
+
+    @gew_typ.setter
+    def gew_typ(self, gew_typ: List[Optional[str]]) -> None:
+        gew = _codes_array(gew_typ)
+        if len(gew) != len(self):
+            raise ValueError("gew_typ muss genauso lang sein wie data")
+        self._eigene_daten()
+        self._gew = gew
 
     def __add__(self, other):
         """addition von zwei texttype objekten"""
         return self.__class__(self.data + other.data, gew_typ=self.gew_typ + other.gew_typ)
-    
+
     def __mul__(self, other):
         """Ganzzahlige multiplikation. Hängt das element mehrfach hintereinander"""
         return self.__class__(self.data * other, gew_typ=self.gew_typ * other)
 
-    def _split(self, divider, search_in):
-        # helferfunktion für split
+    def _split(self, divider: int, search_in: array):
+        # helferfunktion für split. divider: Code des typs, search_in: array mit den Codes (ganzer Speicher)
+        start, stop = self._start, self._stop
+        laenge = stop - start
         last_index = 0
         erg = []
-        all_found = False
-        while not all_found:
+        while True:
             try:
-                new_index = search_in.index(divider, last_index)
-            except ValueError: # Element nicht gefunden, suche wird beendet.
-                new_index = -1
-                all_found = True
-            
+                new_index = search_in.index(divider, start + last_index, stop) - start
+            except ValueError:  # Element nicht gefunden, suche wird beendet.
+                # letzter Teil: er wird nur übernommen, wenn er mehr als zwei Elemente hat,
+                # und dann ohne das letzte Element.
+                if last_index - laenge < -2:
+                    erg.append(self._sicht(last_index, laenge - 1))
+                return erg
             if new_index >= last_index + 1:
                 # Zwischen den dividern befindet sich text (standart)
-                erg.append(self.__class__(self.data[last_index: new_index], gew_typ=self.gew_typ[last_index: new_index]))
-            elif new_index == -1: # letzten Teil gefunden
-                if last_index - len(search_in) < -2: # zwischen den letzten beiden dividern befindet sich text
-                    erg.append(self.__class__(
-                        self.data[last_index: new_index], gew_typ=self.gew_typ[last_index: new_index]))
-            last_index = new_index + 1 #erhöhe um eins. Dadurch wird das divider-Element nicht übernommen.
-        return erg
+                erg.append(self._sicht(last_index, new_index))
+            last_index = new_index + 1  # erhöhe um eins. Dadurch wird das divider-Element nicht übernommen.
 
     def split(self, divider:str, split_by='gew')->list:
         """# Teilt das Objekt in beliebig viele texttype objekte, ähnlich der split-methode für str.
         Geteilt wird an Elementen vom typ divider. Dieses Elemente sind im Ergebnis nicht enthalten.
+        Die Teile sind Sichten auf denselben Speicher, die Zeilen werden nicht kopiert.
         split_by: gew: gewählter typ
                   0:   erste Möglichkeit
                   1:   zweite Möglichkeit
                   …:   und so weiter"""
-
-        # Wir bruchen brauchbare Arbeitsdaten
-        self._updateWD()
-
         if split_by == 'gew':
-            return self._split(divider, self.gew_typ)
-        elif type(split_by) == int and split_by < self.anz_typen:
-            return self._split(divider, list(list(zip(*self.typ))[split_by]))
+            search_in = self._gew
+        elif type(split_by) == int and 0 <= split_by < self.anz_typen:
+            search_in = self._typen[split_by]
         else:
-            raise AttributeError("split_by="+str(split_by)+" ist icht möglich. Mögliche Argumente für \"Split_By\": \"gew\", " + (n+', ') for n in range(self.anz_typen))
-    
+            raise AttributeError("split_by=" + str(split_by) + " ist nicht möglich. Mögliche Argumente für \"split_by\": \"gew\", "
+                                 + ", ".join(str(n) for n in range(self.anz_typen)))
+        # Ein typ, der noch nie vorkam, hat keinen Code und kann nicht gefunden werden. 256 passt in kein Byte.
+        return self._split(_codes.get(divider, 256), search_in)
+
     def __getitem__(self, slice):
+        """Ausschnitt als Sicht auf denselben Speicher. Ein einzelner index ergibt ein objekt mit einem Element"""
+        if isinstance(slice, int):
+            i = slice + len(self) if slice < 0 else slice
+            if not 0 <= i < len(self):
+                raise IndexError("texttype index außerhalb des Bereiches")
+            return self._sicht(i, i + 1)
+        start, stop, step = slice.indices(len(self))
+        if step == 1:
+            return self._sicht(start, max(start, stop))
+        # mit Schrittweite geht es nicht ohne Kopie
         return self.__class__(self.data[slice], gew_typ=self.gew_typ[slice])
 
     def __str__(self):
-        erg = ''
-        for i in range(len(self.data)):
-            erg += self.data[i][0]+'\n'
-        return erg
-    
+        return ''.join(zeile + '\n' for zeile in self.str)
+
     def __len__(self):
         """Anzahl der verwalteten Elemente"""
-        return len(self.data)
-    
+        return self._stop - self._start
+
     def choose(self, i:int, typ:str)->None:
         """setze den gewählten typ für das i-te Element"""
-        self.gew_typ[i] = typ
-    
+        if not 0 <= i < len(self):
+            raise IndexError("texttype index außerhalb des Bereiches")
+        code = typ_code(typ)
+        self._eigene_daten()
+        self._gew[self._start + i] = code
+
     def choices(self, i:int)-> List[str]:
         """gibt die sortierte liste aller für das i-te Element vorgeschlagenen typen zurück"""
-        self._updateWD()
-        return self.typ[i]
-    
+        if not 0 <= i < len(self):
+            raise IndexError("texttype index außerhalb des Bereiches")
+        return [_namen[spalte[self._start + i]] for spalte in self._typen]
+
     def types(self)->Set[str]:
         """Die Menge aller vorkommenden typen"""
-        return set(self.gew_typ)
-    
+        return set(_namen[c] for c in set(self._gew[self._start:self._stop]))
+
     def __iter__(self):
-        self.iterator = [self.str.__iter__(), self.gew_typ.__iter__(), self.typ.__iter__()]
-    
-    def __next__(self):
-        return (self.iterator[i].next() for i in range(3))
-    
-    __doc__ =  """Erlaubt, texten zeilenweise typen zuzuweisen."""
+        """(string, gewählter typ, vorgeschlagene typen) für jedes Element"""
+        return zip(self.str, self.gew_typ, self.typ)
 
+    __doc__ =  """Erlaubt, texten zeilenweise typen zuzuweisen."""
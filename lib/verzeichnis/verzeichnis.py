@@ -0,0 +1,31 @@
+# verzeichnis.py
+# Sortierung nach Titeln und Titelverzeichnis für das Liederbuch.
+from typing import Iterable, Optional, Tuple
+
+# Umlaute werden wie im Telefonbuch einsortiert: ä wie a, ß wie ss
+_umlaute = str.maketrans({'ä': 'a', 'ö': 'o', 'ü': 'u', 'ß': 'ss'})
+
+
+def sortierschluessel(titel: str) -> str:
+    """Schlüssel zum alphabetischen Sortieren von Titeln, unabhängig von Groß-/Kleinschreibung und Umlauten"""
+    return titel.strip().casefold().translate(_umlaute)
+
+
+# Die Befehle können im Liederbuch vor dem \input des Verzeichnisses anders definiert werden.
+_kopf = r"""% Titelverzeichnis, erzeugt von converter.py
+\providecommand{\titeleintrag}[1]{#1\par}
+\providecommand{\alttiteleintrag}[2]{\textit{#1} (siehe #2)\par}
+"""
+
+
+def titelverzeichnis(eintraege: Iterable[Tuple[str, Optional[str]]]) -> str:
+    """eintraege: (Titel, Alternativtitel oder None) je Lied
+    Gibt latex code zurück, der alle Titel und Alternativtitel alphabetisch sortiert auflistet.
+    Alternativtitel verweisen auf den Titel des Liedes."""
+    zeilen = []
+    for titel, alttitel in eintraege:
+        zeilen.append((sortierschluessel(titel), titel, r"\titeleintrag{" + titel + "}"))
+        if alttitel:
+            zeilen.append((sortierschluessel(alttitel), alttitel, r"\alttiteleintrag{" + alttitel + "}{" + titel + "}"))
+    zeilen.sort()
+    return _kopf + "".join(zeile + "\n" for _, _, zeile in zeilen)
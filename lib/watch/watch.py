@@ -0,0 +1,39 @@
+# watch.py
+# Beobachtet ein Verzeichnis, indem regelmäßig die Änderungszeiten der Dateien gelesen werden.
+# Kommt ohne zusätzliche Bibliotheken aus.
+import os
+from typing import Collection, Dict, List, Tuple, Union
+
+from lib.scan.scan import scannen
+
+pfad = Union[str, os.DirEntry]
+
+
+class DirWatcher():
+    def __init__(self, directory: pfad, rekursiv: bool = False, auslassen: Collection[pfad] = ()) -> None:
+        """directory: das zu beobachtende Verzeichnis.
+        rekursiv: auch alle Unterverzeichnisse, die Namen sind dann Pfade relativ zu directory (siehe lib.scan)
+        auslassen: diese Verzeichnisse nicht beobachten, z.B. ein Ausgabeverzeichnis in directory
+        Der aktuelle Inhalt gilt als bekannt, poll() meldet nur spätere Änderungen."""
+        self.directory = directory
+        self.rekursiv = rekursiv
+        self.auslassen = [os.fspath(a) for a in auslassen]
+        self.stand = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        # Name -> (Änderungszeit, Größe) der lesbaren Dateien, aus dem einen stat, das scannen je Datei braucht
+        erg = dict()
+        for eingabe in scannen(self.directory, self.rekursiv, self.auslassen):
+            st = eingabe.stat()
+            erg[eingabe.name] = (st.st_mtime_ns, st.st_size)
+        return erg
+
+    def poll(self) -> Tuple[List[str], List[str]]:
+        """Gibt (neue oder geänderte Dateien, gelöschte Dateien) seit dem letzten Aufruf zurück, jeweils sortiert."""
+        neu = self._scan()
+        geaendert = sorted(name for name, stand in neu.items() if self.stand.get(name) != stand)
+        geloescht = sorted(name for name in self.stand if name not in neu)
+        self.stand = neu
+        return geaendert, geloescht
+
+    __doc__ = "Erkennt neue, geänderte und gelöschte Dateien in einem Verzeichnis durch Abfragen der Änderungszeiten"
@@ -0,0 +1,75 @@
+# zwischenformat.py
+# Speichert das Ergebnis der Zeilenerkennung und Blockaufbereitung (Titel, Metadaten, Blöcke mit blocktyp und text)
+# für jedes Lied auf der Platte. Ändert sich nur das Template, muss für jedes Lied nur noch das Template gefüllt werden.
+# Der Schlüssel enthält den Inhalt des Liedes und die Version des Konverters (mit Heuristik und Akkord-Einstellungen),
+# ein verändertes Lied oder ein neuer Konverter findet deshalb nie einen alten Eintrag.
+# Mit jedem Eintrag werden die Hinweise zum Lied gespeichert, ein Lied aus dem Speicher hat dieselben Hinweise wie neu gelesen.
+# Aufgeräumt wird nicht, der Speicher wächst mit jeder Version jedes Liedes. Deshalb wird er nur auf Wunsch verwendet
+# (converter.py --zwischenspeicher) und kann jederzeit gelöscht werden.
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from lib.diagnose.diagnose import Diagnose
+
+_format = 2  # Version des Dateiformats, Teil des Schlüssels
+
+
+class Block(NamedTuple):
+    """ein Block, wie ihn das Template sieht: blocktyp (verse, refrain, info, ...) und die fertigen latex-Zeilen"""
+    blocktyp: str
+    text: List[str]
+
+
+def zwischenformat(titel: str, metadaten: Dict[str, str], inhalt: list) -> Dict[str, Any]:
+    """Zwischenformat aus dem Ergebnis von SongConverter.parse. Die Blöcke müssen aufbereitet sein (makelatexdata)."""
+    return dict(title=titel, metadata=metadaten, blocks=[[block.blocktyp, list(block.text)] for block in inhalt])
+
+
+def bloecke(zwischen: Dict[str, Any]) -> List[Block]:
+    """die Blöcke des Zwischenformats für das Template"""
+    return [Block(blocktyp, text) for blocktyp, text in zwischen["blocks"]]
+
+
+class Zwischenspeicher():
+    def __init__(self, verzeichnis: str, version: str) -> None:
+        """verzeichnis: hier wird für jedes Lied eine JSON-Datei abgelegt
+        version: alles, wovon das Zwischenformat außer dem Lied abhängt (Konverter, Heuristik, Akkord-Einstellungen)"""
+        self.verzeichnis = verzeichnis
+        self.version = version
+
+    def _pfad(self, lied: str) -> str:
+        h = hashlib.sha256("{}\n{}\n".format(_format, self.version).encode('utf-8'))
+        h.update(lied.encode('utf-8', 'surrogatepass'))
+        schluessel = h.hexdigest()
+        return os.path.join(self.verzeichnis, schluessel[:2], schluessel + ".json")
+
+    def laden(self, lied: str) -> Optional[Tuple[Dict[str, Any], List[Diagnose]]]:
+        """(Zwischenformat, Hinweise) des Liedes oder None, wenn es noch nicht gespeichert ist"""
+        try:
+            with open(self._pfad(lied), 'r', encoding='utf-8') as file:
+                eintrag = json.load(file)
+            return eintrag["zwischenformat"], [Diagnose(**diagnose) for diagnose in eintrag["diagnosen"]]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def speichern(self, lied: str, zwischen: Dict[str, Any], diagnosen: List[Diagnose]) -> None:
+        """speichert das Zwischenformat des Liedes und die Hinweise, die beim Umwandeln entstanden sind.
+        Fehler beim Schreiben werden ignoriert, ohne Cache ist es nur langsamer."""
+        pfad = self._pfad(lied)
+        tmp = "{}.{}.{}.tmp".format(pfad, os.getpid(), threading.get_ident())
+        try:
+            os.makedirs(os.path.dirname(pfad), exist_ok=True)
+            with open(tmp, 'w', encoding='utf-8') as file:
+                json.dump(dict(zwischenformat=zwischen, diagnosen=[diagnose.als_dict() for diagnose in diagnosen]),
+                          file, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp, pfad)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    __doc__ = "Zwischenformat (Titel, Metadaten, Blöcke) je Lied auf der Platte, Schlüssel: Inhalt und Version"
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Führt die Teile zusammen, die mit converter.py --shard I/N umgewandelt wurden, z.B. auf mehreren CI-Runnern.
+Vorher wird geprüft, ob alle Teile vollständig sind und ob sich Lieder oder Ausgabedateien überschneiden.
+Erst dann werden die Ausgaben in ein Verzeichnis kopiert (--ziel) oder zu einem Liederbuch gebündelt (--bundle).
+"""
+
+from typing import List, Optional
+from lib.shard.shard import finden, zusammenfuehren
+from lib.ausgabe.ausgabe import write_if_changed, UNVERAENDERT
+from lib.scan.scan import Ausgaben
+import converter as cli
+import argparse
+import os
+import sys
+
+
+def parse_args(argv:Optional[List[str]]=None)-> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Prüft und führt die Teile von converter.py --shard I/N zusammen.")
+    parser.add_argument('-o', dest='overwrite', action='store_true',
+                        help="Dateien im Zielverzeichnis und das Liederbuch überschreiben")
+    parser.add_argument('--ziel', metavar='VERZEICHNIS',
+                        help="alle Ausgabedateien in dieses Verzeichnis kopieren")
+    parser.add_argument('--bundle', metavar='DATEI',
+                        help="alle Lieder nach Titel sortiert in eine Datei schreiben, wie converter.py --bundle")
+    parser.add_argument('--index', action='store_true',
+                        help="mit --bundle: ein Verzeichnis aller Titel und Alternativtitel anhängen")
+    parser.add_argument('verzeichnisse', nargs='+', metavar='Verzeichnis',
+                        help="Ausgabeverzeichnisse der Teile (ein gemeinsames oder eines je Teil)")
+    args = parser.parse_args(argv)
+    if args.index and args.bundle is None:
+        parser.error("--index geht nur zusammen mit --bundle")
+    return args
+
+
+def main(argv:Optional[List[str]]=None)-> None:
+    args = parse_args(argv)
+    pfade = finden(args.verzeichnisse)
+    lieder, probleme = zusammenfuehren(pfade)
+    if probleme:
+        for problem in probleme:
+            print("FEHLER:", problem, file=sys.stderr)
+        print("{} Teile gefunden, {} Probleme, nichts zusammengeführt.".format(len(pfade), len(probleme)), file=sys.stderr)
+        sys.exit(1)
+    print("{} Teile, {} Lieder vollständig.".format(len(pfade), len(lieder)))
+
+    if args.ziel is not None:
+        if not os.path.isdir(args.ziel):
+            raise Exception("dirctory not found")
+        geschrieben = 0
+        ausgaben = Ausgaben()
+        for name, eintrag in sorted(lieder.items()):
+            quelle = os.path.join(eintrag["verzeichnis"], eintrag["out"])
+            ziel = os.path.join(args.ziel, eintrag["out"])
+            if os.path.abspath(quelle) == os.path.abspath(ziel):
+                continue  # liegt schon da
+            if not ausgaben.schreibbar(ziel, args.overwrite):
+                print(eintrag["out"], ' darf nicht überschrieben werden.', file=sys.stderr)
+                sys.exit(1)
+            ausgaben.anlegen(ziel)  # Unterverzeichnisse von converter.py --rekursiv
+            if write_if_changed(ziel, cli.readfile(quelle)) != UNVERAENDERT:
+                geschrieben += 1
+        print(geschrieben, "Ausgabedateien nach", args.ziel, "kopiert.")
+
+    if args.bundle is not None:
+        if not cli.fileIsWriteable(args.bundle, args.overwrite):
+            print(args.bundle, ' darf nicht überschrieben werden.', file=sys.stderr)
+            sys.exit(1)
+        # die Ausgabedateien werden erst beim Schreiben einzeln gelesen
+        bundle = [(name, eintrag["title"], eintrag["index"], os.path.join(eintrag["verzeichnis"], eintrag["out"]))
+                  for name, eintrag in lieder.items()]
+        if cli.writeBundle(args.bundle, bundle, args.index, cli.readfile) == UNVERAENDERT:
+            print(args.bundle, "ist unverändert,", len(bundle), "Lieder.")
+        else:
+            print(len(bundle), "Lieder in", args.bundle, "geschrieben.")
+
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Index der Metadaten aller Lieder eines Verzeichnisses: Suche nach Titel, Weise, Worten, Liederbüchern usw.
+und Titelverzeichnis für das Liederbuch, ohne die Lieder umzuwandeln.
+Der Index wird bei jedem Aufruf aktualisiert, gelesen werden nur neue und geänderte Lieder.
+"""
+
+from typing import Dict, List, Optional, Tuple
+from song_converter import SongConverter, VERSION, template_cache_dir
+from lib.metadaten.metadaten import MetadatenIndex
+from lib.ausgabe.ausgabe import write_if_changed, UNVERAENDERT
+import converter as cli
+import argparse
+import hashlib
+import json
+import os
+import sys
+
+
+def _bedingung(parser:argparse.ArgumentParser, text:str)-> Tuple[str, str]:
+    # SCHLÜSSEL=WERT zerlegen
+    schluessel, gleich, wert = text.partition('=')
+    if not gleich or not schluessel:
+        parser.error("erwartet SCHLÜSSEL=WERT, z.B. mel=Hein")
+    return schluessel.strip(), wert.strip()
+
+
+def standard_datei(indir:str)-> Optional[str]:
+    """Indexdatei im Cache-Verzeichnis, für jedes Eingabeverzeichnis eine eigene. None, wenn es keinen Cache gibt.
+    Nicht im Eingabeverzeichnis selbst, converter.py würde sie sonst für ein Lied halten."""
+    verzeichnis = template_cache_dir()
+    if verzeichnis is None:
+        return None
+    os.makedirs(verzeichnis, exist_ok=True)
+    kennung = hashlib.sha256(os.path.abspath(indir).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(verzeichnis, "metadaten-" + kennung + ".json")
+
+
+def parse_args(argv:Optional[List[str]]=None)-> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Index der Metadaten aller Lieder: Suche und Titelverzeichnis, ohne die Lieder umzuwandeln.")
+    parser.add_argument('--datei', metavar='DATEI',
+                        help="Indexdatei (Standard: eine Datei je Eingabeverzeichnis im Cache-Verzeichnis, siehe SONGBOOK_CACHE)")
+    parser.add_argument('--suche', metavar='SCHLÜSSEL=WERT', action='append', default=[],
+                        help="Lieder, bei denen SCHLÜSSEL (title, index, mel, txt, jahr, alb, bo, tf, ...) genau WERT ist")
+    parser.add_argument('--praefix', metavar='SCHLÜSSEL=ANFANG', action='append', default=[],
+                        help="Lieder, bei denen SCHLÜSSEL mit ANFANG beginnt. Ohne ANFANG: alle Lieder mit diesem Schlüssel")
+    parser.add_argument('--json', action='store_true', help="Suchergebnisse als JSON ausgeben")
+    parser.add_argument('-r', '--rekursiv', action='store_true',
+                        help="auch die Lieder in allen Unterverzeichnissen (wie converter.py --rekursiv)")
+    parser.add_argument('--register', metavar='DATEI',
+                        help="Titelverzeichnis aller Lieder (Titel und Alternativtitel) als latex nach DATEI schreiben")
+    parser.add_argument('indir', help="Eingabeverzeichnis")
+    args = parser.parse_args(argv)
+    if args.datei is None:
+        args.datei = standard_datei(args.indir)
+        if args.datei is None:
+            parser.error("ohne Cache-Verzeichnis (SONGBOOK_CACHE ist leer) muss --datei angegeben werden")
+    args.bedingungen = [_bedingung(parser, text) + (False,) for text in args.suche] \
+        + [_bedingung(parser, text) + (True,) for text in args.praefix]
+    return args
+
+
+def main(argv:Optional[List[str]]=None)-> None:
+    args = parse_args(argv)
+    if not os.path.isdir(args.indir):
+        raise Exception("dirctory not found")
+    infiles = list(cli.getInfiles(args.indir, args.rekursiv))
+
+    def fehler(name:str, e:Exception)-> None:
+        print('FEHLER bei Datei', name, e, file=sys.stderr)
+
+    def lesen(infile:os.DirEntry)-> Dict[str, str]:
+        # Hinweise beim Lesen der Metadaten (z.B. ungültige Schlüssel) nach stderr, damit die Ergebnisse lesbar bleiben
+        diagnosen = []
+        meta = SongConverter.metadaten(cli.readfile(infile), diagnosen)
+        for diagnose in diagnosen:
+            print(infile.name, diagnose, file=sys.stderr)
+        return meta
+
+    index = MetadatenIndex(args.datei, VERSION)
+    gelesen, unveraendert, fehlgeschlagen = index.aktualisieren(infiles, lesen, fehler)
+    index.save()
+    zusammenfassung = "{} Lieder gelesen, {} unverändert".format(gelesen, unveraendert)
+    if fehlgeschlagen:
+        zusammenfassung += ", {} fehlgeschlagen".format(fehlgeschlagen)
+    print(zusammenfassung, file=sys.stderr)
+
+    if args.bedingungen:
+        # alle Bedingungen müssen erfüllt sein
+        treffer = None
+        for schluessel, wert, praefix in args.bedingungen:
+            gefunden = dict(index.suchen(schluessel, wert, praefix))
+            treffer = gefunden if treffer is None else {name: meta for name, meta in treffer.items() if name in gefunden}
+        ergebnis = sorted(treffer.items())
+        if args.json:
+            json.dump(dict(ergebnis), sys.stdout, ensure_ascii=False, indent=1)
+            print()
+        else:
+            for name, meta in ergebnis:
+                werte = ", ".join("{}: {}".format(schluessel, meta.get(schluessel, ""))
+                                  for schluessel in dict.fromkeys(s for s, _, _ in args.bedingungen) if schluessel != "title")
+                print(name.ljust(30), meta.get("title", ""), "(" + werte + ")" if werte else "")
+
+    if args.register is not None:
+        if write_if_changed(args.register, index.register()) == UNVERAENDERT:
+            print(args.register, "ist unverändert.", file=sys.stderr)
+        else:
+            print("Titelverzeichnis in", args.register, "geschrieben.", file=sys.stderr)
+
+
+if __name__== "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Hält den SongConverter geladen und wandelt Lieder auf Anfrage um, z.B. für eine Vorschau im Editor.
+Das Template wird nur einmal je Arbeitsprozess geladen, jede Anfrage kostet also nur die Umwandlung selbst.
+
+Protokoll: ein JSON-Objekt je Zeile, über stdin/stdout oder mit --socket über einen Unix-Socket.
+    {"id": 1, "text": "Inhalt der Liedtextdatei"}
+ -> {"id": 1, "latex": "...", "zeilen": [{"text": ..., "typ": ..., "zweite": ...}, ...],
+        "diagnosen": [{"art": ..., "zeile": ..., "meldung": ...}, ...], "dauer_ms": ...}
+    bei einem Fehler statt latex: "fehler"
+    {"id": 2, "befehl": "statistik"}  -> Anzahl der Anfragen und Perzentile der Antwortzeiten
+    {"id": 3, "befehl": "ende"}       -> beendet den Server
+"""
+
+from typing import Any, Dict, List, Optional
+import converter as cli
+import argparse
+import asyncio
+import os
+import sys
+
+
+def liedAnfrage(text:str)-> Dict[str, Any]:
+    """wandelt text in einem Arbeitsprozess oder Thread um. Gibt die Antwort auf eine Anfrage zurück (ohne id und dauer_ms).
+    Der SongConverter gibt nichts aus, mehrere Threads können ihn deshalb gleichzeitig verwenden."""
+    antwort: Dict[str, Any] = dict()
+    diagnosen = []
+    song = cli.converter
+    try:
+        typen = song.klassifizieren(text, diagnosen)
+        antwort["zeilen"] = [dict(text=zeile, typ=typ, zweite=zweite) for zeile, typ, zweite in typen]
+        antwort["latex"] = song.fill_template(*song.parse_typen(typen, diagnosen))
+    except Exception as e:
+        antwort["fehler"] = str(e) or "Umwandlung fehlgeschlagen"
+    antwort["diagnosen"] = [diagnose.als_dict() for diagnose in diagnosen]
+    return antwort
+
+
+def parse_args(argv:Optional[List[str]]=None)-> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Wandelt Lieder auf Anfrage um (JSON-Lines über stdin/stdout oder einen Unix-Socket).")
+    parser.add_argument('--socket', metavar='PFAD',
+                        help="auf diesem Unix-Socket auf Verbindungen warten statt auf stdin")
+    parser.add_argument('-j', dest='jobs', type=int, default=1, metavar='N',
+                        help="Anzahl der Prozesse, die gleichzeitig umwandeln. 0: ein Prozess je Prozessorkern")
+    parser.add_argument('--threads', action='store_true',
+                        help="mit -j N Threads in einem Prozess statt N Prozessen umwandeln, alle mit demselben SongConverter. "
+                             "Lohnt sich vor allem mit Python ohne GIL (free-threaded)")
+    parser.add_argument('--akkorde', choices=sorted(cli.SCHEMATA), metavar='SCHEMA',
+                        help="alle Akkorde einheitlich schreiben, wie bei converter.py")
+    parser.add_argument('--transponieren', type=int, default=0, metavar='N',
+                        help="alle Akkorde um N Halbtöne transponieren")
+    parser.add_argument('--akkorde-eingabe', choices=("deutsch", "englisch"), default="deutsch",
+                        help="Schema, in dem die Akkorde der Lieder geschrieben sind (Standard: deutsch)")
+    args = parser.parse_args(argv)
+    if args.jobs < 0:
+        parser.error("-j muss mindestens 0 sein")
+    if args.jobs == 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
+
+def main(argv:Optional[List[str]]=None)-> None:
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+    from lib.server.server import Server
+    args = parse_args(argv)
+    umschreiber = None
+    if args.akkorde is not None or args.transponieren:
+        umschreiber = cli.Umschreiber(args.akkorde, args.transponieren, args.akkorde_eingabe)
+    optionen = dict(akkorde=umschreiber)
+    if args.threads:
+        # ein SongConverter für alle Threads, im Hauptprozess geladen
+        cli._init_worker(cli.template_file, False, optionen)
+        pool = ThreadPoolExecutor(max_workers=args.jobs)
+    else:
+        pool = ProcessPoolExecutor(max_workers=args.jobs, initializer=cli._init_worker,
+                                   initargs=(cli.template_file, False, optionen))
+    with pool:
+        server = Server(liedAnfrage, pool)
+        try:
+            if args.socket is not None:
+                print("Warte auf Verbindungen an", args.socket, file=sys.stderr)
+                asyncio.run(server.unix(args.socket))
+            else:
+                asyncio.run(server.stdio())
+        except KeyboardInterrupt:
+            pass
+    print("Antwortzeiten:", server.latenzen, file=sys.stderr)
+
+
+if __name__== "__main__":
+    main()
@@ -1,30 +1,113 @@
-import jinja2 as j2
 import os
-from typing import Tuple, Union, List, Dict
+from typing import Callable, Tuple, Union, List, Dict, Iterable, Iterator, Optional, Pattern, TextIO
 import re
 import sys
-from lib.Heuristik.Heuristik import Heuristik
-from lib.texttype.texttype import texttype
+from array import array
+from lib.Heuristik.Heuristik import VERSION as HEURISTIK_VERSION
+from lib.Heuristik.Grammatik import Grammatik
+from lib.texttype.texttype import texttype, typ_code
+from lib.messung.messung import keine_messung
+from lib.zwischenformat.zwischenformat import Block, Zwischenspeicher, zwischenformat, bloecke as zwischen_bloecke
+from lib.diagnose.diagnose import AKKORD, Diagnose, KLAMMERN, METAZEILE, UNBEKANNTER_SCHLUESSEL, melden
 # Erlaubt das einfache Arbeiten mit texen zugeordneten datenassert ('Überschrift' in block.types())
 # typing: Pfadspezifikation:
 pfad = Union[str, os.DirEntry]
 
+# Version des Konverters. Muss erhöht werden, wenn sich die Ausgabe für gleiche Eingaben ändert.
+CONVERTER_VERSION = "1"
+# Die Ausgabe hängt vom Konverter und von der Heuristik ab.
+VERSION = CONVERTER_VERSION + "-h" + HEURISTIK_VERSION
+
+
+def template_cache_dir() -> Optional[str]:
+    """Verzeichnis für übersetzte Templates, damit sie nicht bei jedem Start neu übersetzt werden müssen.
+    Einstellbar mit der Umgebungsvariable SONGBOOK_CACHE, leer: kein Cache.
+    Standard: leadsheets2songbook in $XDG_CACHE_HOME bzw. ~/.cache"""
+    verzeichnis = os.environ.get("SONGBOOK_CACHE")
+    if verzeichnis is None:
+        basis = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        verzeichnis = os.path.join(basis, "leadsheets2songbook")
+    return verzeichnis or None
+
+_akkord_regex = re.compile(r"\S+")
+
+
+def _umgeschrieben(wort:str, umschreiben:Callable[[str], Optional[str]], diagnosen:Optional[List[Diagnose]],
+                   nr:Optional[int])->str:
+    # wort umschreiben. Kann umschreiben es nicht lesen, bleibt es unverändert und es gibt einen Hinweis
+    neu = umschreiben(wort)
+    if neu is None:
+        melden(diagnosen, AKKORD, nr, "{!r} lässt sich nicht als Akkord lesen und bleibt unverändert".format(wort))
+        return wort
+    return neu
+
+
+def _akkordtextzeile(akkorde:str, textzeile:str, umschreiben:Optional[Callable[[str], Optional[str]]]=None,
+                     diagnosen:Optional[List[Diagnose]]=None, nr:Optional[int]=None)->str:
+    r"""baut Akkord- und textzeile zu einer latex-
+    kompatiblen Akkordtextzeile zusammen. Jeder Akkord wird mit \[akkord] an seine stelle im text gesetzt
+    umschreiben: None oder Funktion, die jeden Akkord vor der Ausgabe umschreibt (siehe lib/akkorde).
+                 Gibt sie None zurück, bleibt das Wort unverändert und es gibt einen Hinweis in diagnosen
+    nr: Nummer der Akkordzeile im Lied ab 1, für die Hinweise"""
+    #Textzeile falls nötig verlängern, bis sie wenigstens so lang ist, wie die Akkordzeile
+    text = textzeile.ljust(len(akkorde))
+    teile = []  # ergebnis: die akkordtextzeile
+    textpos = 0
+    # iteriere über alle Akkorde der Zeile:
+    for match in _akkord_regex.finditer(akkorde):
+        beg = match.start()
+        teile.append(text[textpos:beg])
+        teile.append(r"\[")
+        teile.append(match.group() if umschreiben is None else _umgeschrieben(match.group(), umschreiben, diagnosen, nr))
+        teile.append("]")
+        textpos = beg
+    # Den rest des textes nach dem letzten Akkord übernehmen
+    teile.append(text[textpos:])
+    return ''.join(teile)
+
+
+def _akkordzeile(akkorde:str, umschreiben:Optional[Callable[[str], Optional[str]]]=None,
+                 diagnosen:Optional[List[Diagnose]]=None, nr:Optional[int]=None)->str:
+    """setzt die akkordzeile so, dass latex die zeichen als akkorde ohne text setzt
+    umschreiben, diagnosen, nr: wie bei _akkordtextzeile"""
+    #wir wollen die abstände zwischen den Akkorden einigermaßen abbilden:
+    #' ' -> leerzeichen
+    #'  ' -> 1em
+    #sonst: 1 em je 2 (3?) leerzeichen
+    teile = ['{\nolyrics ']  # Ausgabe
+    for match in _akkord_regex.finditer(akkorde):
+        # Der Abstand wird (wie bisher) immer vom Anfang der Zeile aus gezählt.
+        spaces = match.start()
+        if spaces == 0:
+            #wenn kein leerraum, dass wird auch keiner generiert
+            pass
+        elif spaces <= 1:
+            teile.append(' ')
+        else:
+            teile.append(r"\hspace{" + str((spaces+1)//3) + "}")  #XXX Hier könnte ein fehler entstehen.
+        teile.append(r"\[")
+        teile.append(match.group() if umschreiben is None else _umgeschrieben(match.group(), umschreiben, diagnosen, nr))
+        teile.append("]")
+    teile.append("}")
+    return ''.join(teile)
+
+
 class laTexttype(texttype):
     verseregex = r"^\s?\d+([).:]|( :))*\s*"
     refrainregex = r"^\s?[Rr][Ee][Ff]([Rr][Aa][Ii][Nn])?([).:]|( :))*\s*"
     inforegex = r"^\s?@?info((:\s*)|\s+)"
     """Subklasse von texttype, die zusätzlich textblöcke erzeugt, die an jinja2 übergeben werden können"""
+    __slots__ = ('blocktyp', 'text', 'use_autotyp')
+
     def __init__(self, data:List[List[str]], gew_typ=None):
         texttype.__init__(self, data, gew_typ)
-        self.blocktyp = ''
-        self.text = []
-        self.use_autotyp = True
-    
+        self._neue_sicht()
+
     #override
-    def _generateWorkingData(self):
+    def _neue_sicht(self):
         self.blocktyp = ''
         self.text = []
-        return super()._generateWorkingData()
+        self.use_autotyp = True
 
     __doc__ = texttype.__doc__ + """
         Speichert die Daten, die hinterher in latex ausgegeben werden.
@@ -43,198 +126,187 @@ class laTexttype(texttype):
         Es wird angenommen, dass das ganze objekt nur einen einzelnen Block enthält.
         gibt die zeilennummer zurück, in der das label, falls vorhanden, steht,
         sonst -1"""
-        self._updateWD()
-        for i in range(len(self.str)):
-            line = self.str[i]
-            if re.match(laTexttype.refrainregex, line) is not None:
-                self.blocktyp = "refrain"
-                return i
-            elif re.match(laTexttype.verseregex, line) is not None:
-                self.blocktyp = "verse"
+        for i, line in enumerate(self.str):
+            label = _label(line)
+            if label is not None:
+                self.blocktyp = label
                 return i
-            elif re.match(laTexttype.inforegex, line) is not None:
-                self.blocktyp = "info"
-                return i
-            else:
-                self.blocktyp = "verse*"
-                #kein return, vielleicht findet man das label in der nächsten zeile
+            #kein return, vielleicht findet man das label in der nächsten zeile
+            self.blocktyp = "verse*"
         return -1
-    
-    def squashChords(self):
-        """setzt akkord- und Textzeilen zusammen, wenn möglich.
-        sonst werden zeilen rein aus akkorden generiert
-        Damit das funktioniert, muss der richtige typ gewählt sein."""
-        self._updateWD()
-
-        def ATzeile(akkzeile:Tuple[str], textzeile:Tuple[str])->Tuple[str]:
-            """baut Akkord- und textzeile zu einer latex-
-            kompatiblen Akkordtextzeile zusammen"""
-
-            def atchord(akkord:str)->str:
-                """gibt den latex befehl zurück, der den akkord an die passende stelle in den text setzt"""
-                return r"\[" + akkord + "]"
-            akkorde = akkzeile[0]
-            #Textzeile falls nötig verlängern, bis sie wenigstens so lang ist, wie die Akkordzeile
-            text = textzeile[0].ljust(len(akkorde))
-
-            atz = '' #ergebnis: die akkordtextzeile
-            textpos = 0
-            # iteriere über alle Akkorde der Zeile:
-            for match in re.finditer(r"\S+", akkorde):
-                beg, end = match.start(), match.end()
-                atz += text[textpos:beg]+atchord(akkorde[beg:end])
-                textpos = beg
-            
-            # Den erst des textes nachd em letzten Akkord übernehmen
-            atz += text[textpos:]
-            return (atz, "Akkordtextzeile") #neuer typ ist klar
-
-        def Azeile(akkzeile:Tuple[str])->Tuple[str]:
-            """setzt die akkordzeile so, dass latex die zeichen als akkorde ohne text setzt"""
-            akkorde = akkzeile[0]
-            #wir wollen die abstände zwischen den Akkorden einigermaßen abbilden:
-            #' ' -> leerzeichen
-            #'  ' -> 1em
-            #sonst: 1 em je 2 (3?) leerzeichen
-            def achord(akkord: str) -> str:
-                """latex-befehl zum setzen eines Akkordes ohne text darunter"""
-                return r"\[" + akkord + "]"
-                
-            lastEnd = 0 #position des vorherigen endes
-            azeile = '{\nolyrics ' #Ausgabe
-            for match in re.finditer(r"\S+", akkorde):
-                beg, end = match.start(), match.end()
-                spaces = beg - lastEnd  #anzahl der leerzeichen zwischen den beiden Akkorden
-                if spaces == 0:
-                    #wenn kein leerraum, dass wird auch keiner generiert
-                    pass
-                elif spaces <= 1:
-                    azeile += ' '
-                else:
-                    azeile += r"\hspace{" + str(int((spaces+1)//3)) +"}" #XXX Hier könnte ein fehler entstehen.
-                azeile += achord(akkorde[beg:end])
-                textpos = beg
-            azeile += "}"
-            return (azeile, "Akkordzeile") # neuer typ ist klar
-            
 
-        newdata = []
-        newtyp = []
-        prevline = None #text der vorherigen zeile
-        prevtyp = None  #typ der vorherigen zeile
-        i = 0 # zu lesende Zeile (es wird jeweils die vorherige zeile verarbeitet)
-        #füge data und gew_typ ein None-Element hinzu. Das wird hinterher nicht gelesen, das macht den Code einfacher
-        self.data.append(None)
-        self.gew_typ.append(None)
-        while i<len(self.data):
-            line = self.data[i]
-            gew_typ = self.gew_typ[i]
-            #unterscheide 4 Fälle:
-            #1) Die vorherige zeile existiert nicht / wird nicht verwendet
-            if prevline is None or prevtyp is None:
-                #die zeile wird nicht verwendet.
+    def _zusammensetzen(self, umschreiben:Optional[Callable[[str], Optional[str]]]=None,
+                        diagnosen:Optional[List[Diagnose]]=None, erste_nr:int=0) -> Iterator[Tuple[str, int, int]]:
+        """setzt Akkord- und Textzeilen zusammen wie squashChords, ohne den Block zu ändern.
+        liefert (zeile, typ-code, index der Zeile im Speicher oder -1 für neue Zeilen)"""
+        # Nummer der Zeile mit index i im Lied ab 1, für die Hinweise
+        nr0 = erste_nr - self._start + 1
+        # Codes der typen (siehe texttype), 0 ist kein typ
+        AKKORDZEILE = typ_code("Akkordzeile")
+        TEXTZEILE = typ_code("Textzeile")
+        AT_GEW = typ_code("AkkordTextZeile")
+        zeilen, gew = self._zeilen, self._gew
+
+        prev = -1    # index der vorherigen zeile, -1: keine
+        prevtyp = 0  # typ der vorherigen zeile
+        for i in range(self._start, self._stop):
+            gew_typ = gew[i]
+            #unterscheide 3 Fälle:
+            #1) Die vorherige zeile existiert nicht / wird nicht verwendet (kein typ gewählt)
+            if prev < 0 or prevtyp == 0:
                 pass
 
             #2) die vorherige zeile ist eine akkordzeile
-            elif prevtyp == "Akkordzeile":
+            elif prevtyp == AKKORDZEILE:
                 # ist die aktuelle zeile eine Textzeile?
-                if gew_typ == "Textzeile":
+                if gew_typ == TEXTZEILE:
                     #die beiden Zeilen werden zu einer Akkordtextzeile zusammengefügt.
-                    newdata.append(ATzeile(prevline, line))
-                    # die neue zeile ist vom typ Akkordtextzeile
-                    newtyp.append("AkkordTextZeile")
+                    yield _akkordtextzeile(zeilen[prev], zeilen[i], umschreiben, diagnosen, nr0 + prev), AT_GEW, -1
                     #jetzt sind beide zeilen bentzt worden.
                     #die aktuelle zeile wird im folgenden nicht mehr (als vorherige zeile) verwendet.
-                    line = None
-                    gew_typ = None
+                    prev, prevtyp = -1, 0
+                    continue
+                #die vorherige Zeile wird als (einzelne) Akkordzeile formatiert
+                yield _akkordzeile(zeilen[prev], umschreiben, diagnosen, nr0 + prev), AKKORDZEILE, -1
 
-                else:
-                    #die vorherige Zeile wird als (einzelne) Akkordzeile formatiert
-                    newdata.append(Azeile(prevline))
-                    newtyp.append(prevtyp)
-            
             #3) die letzte Zeile ist eine andere Zeile (infozeile, leerzeile, Überschrift) Das sollte nicht vorkommen
             else:
                 #es wird nicht zusammengeführt. die vorherige zeile wird unverändert übernommen.
-                newdata.append(prevline)
-                newtyp.append(prevtyp)
-            
+                yield zeilen[prev], prevtyp, prev
+
             #gehe eine zeile weiter
-            prevline = line
-            prevtyp = gew_typ
-            i += 1
-        
-        # Die neuen Daten verwenden
-        # Die anderen arbeitsdaten (z.B. self.text) werden dadurch ungültig.
-        self.invalidateWD() 
-        self.data = newdata
-        self.gew_typ = newtyp
+            prev, prevtyp = i, gew_typ
+
+        # die letzte Zeile
+        if prev >= 0 and prevtyp == AKKORDZEILE:
+            yield _akkordzeile(zeilen[prev], umschreiben, diagnosen, nr0 + prev), AKKORDZEILE, -1
+        elif prev >= 0 and prevtyp != 0:
+            yield zeilen[prev], prevtyp, prev
+
+    def squashChords(self, umschreiben:Optional[Callable[[str], Optional[str]]]=None,
+                     diagnosen:Optional[List[Diagnose]]=None, erste_nr:int=0):
+        """setzt akkord- und Textzeilen zusammen, wenn möglich.
+        sonst werden zeilen rein aus akkorden generiert
+        Damit das funktioniert, muss der richtige typ gewählt sein.
+        umschreiben: None oder Funktion, die jeden Akkord umschreibt, z.B. ein lib.akkorde.akkorde.Umschreiber.
+                     Wörter, für die sie None zurückgibt, bleiben unverändert und es gibt einen Hinweis in diagnosen
+        erste_nr: Nummer der ersten Zeile des Blocks im Lied ab 0, für die Hinweise"""
+        AKKORDZEILE = typ_code("Akkordzeile")
+        # erster vorgeschlagener typ der zusammengesetzten Zeilen
+        AT_TYP = typ_code("Akkordtextzeile")
+        typen = self._typen
+        newdata = []
+        newtyp = array('B')
+        newtypen = tuple(array('B') for _ in typen)
+        for zeile, gew_code, index in self._zusammensetzen(umschreiben, diagnosen, erste_nr):
+            newdata.append(zeile)
+            newtyp.append(gew_code)
+            if index >= 0:
+                for spalte, neu in zip(typen, newtypen):
+                    neu.append(spalte[index])
+            else:
+                for k, neu in enumerate(newtypen):
+                    neu.append(0 if k else AKKORDZEILE if gew_code == AKKORDZEILE else AT_TYP)
+
+        # Die neuen Daten verwenden. Sie gehören nur diesem objekt.
+        self._speicher(newdata, newtyp, newtypen)
 
-    def makelatexdata(self):
+    def makelatexdata(self, umschreiben:Optional[Callable[[str], Optional[str]]]=None,
+                      diagnosen:Optional[List[Diagnose]]=None, erste_nr:int=0):
         """erstellt den Text, der in das Latex-dokument eingefügt wird.
-        es wird angenommen, dass das ganze objekt nur einen einzelenn block enthält"""
-        # Zeilen automatich einrücken; regex vom anfang der zeile mit nummer linenr entfernen, 
+        es wird angenommen, dass das ganze objekt nur einen einzelenn block enthält.
+        Akkord- und Textzeilen werden in einem Durchlauf zusammengesetzt und das Label gesucht,
+        die Zeilen des Blocks selbst bleiben unverändert.
+        umschreiben, diagnosen, erste_nr: wie bei squashChords"""
+        if not self.use_autotyp:
+            self.text = self.str  # str ist immer eine neue liste
+            return
+        lineNr = self.autotyp() #XXX: rückgabewert sollte 0 oder -1 sein, sonst Warnung werfen
+        # Akkorde und text in eine zeile zusammensetzen, wenn möglich
+        if self.blocktyp in {"verse*", "verse", "refrain"}:
+            # durch das zusammensetzten der zeilen rutschen die labels ggf in eine andere zeile.
+            # Deshalb die zeilenummer des labels im neuen text suchen. Der blocktyp bleibt der aus den ursprünglichen Zeilen.
+            text = []
+            lineNr = -1
+            for zeile, _, _ in self._zusammensetzen(umschreiben, diagnosen, erste_nr):
+                if lineNr < 0 and _label(zeile) is not None:
+                    lineNr = len(text)
+                text.append(zeile)
+            self.text = text
+        else:
+            self.text = self.str
+
+        # Labels aus dem text entfernen, falls vorhanden.
+        # Labels müssten jetzt in der ersten zeile stehen.
+        if self.blocktyp in _label_regex:  # verse*: Kein Label -> nichts zu tun
+            self._cutlabel(lineNr, _label_regex[self.blocktyp])
+
+    def _cutlabel(self, linenr:int, regex:Pattern)->None:
+        # Zeilen automatich einrücken; regex vom anfang der zeile mit nummer linenr entfernen,
         # ohne die realive position der zeichen zur zeile darüber zu ändern.
-        def cutlabel(self, linenr, regex):
-            if linenr > 0:
-                    # vorherige Zeile muss ebenfalls gekürz werden, sonst passen die beiden nicht mehr aufeiander
-                    #aktuelle zeile
-                    akt = re.sub(regex, '', self.text[linenr])
-                    #Anzahl der leerzeichen, die in der darüberliegenden Zeile zu viel sind.
-                    l = len(self.text[linenr])-len(akt) 
-                    # vorherige Zeile
-                    prev = self.text[linenr - 1]
-                    while l > 0:
-                        l -= 1
-                        if prev.startswith(' '):
-                            #falls möglich, die zeile vorher kürzen
-                            prev = prev[1:]
-                        else:
-                            #sonst die aktuelle zeile einrücken
-                            akt = ' ' + akt
-                    self.text[linenr - 1] = prev
-                    self.text[linenr] = akt
-            else:
-                # Wenn es die erste zeile ist, ist nichts zu tun, da es keine vorherige zeile gibt.
-                self.text[linenr] = re.sub(regex, '', self.text[linenr])
-        
-        self._updateWD()
-        self.text = self.str + [] # echte kopie, statt referenz
-        if self.use_autotyp:
-            lineNr = self.autotyp() #XXX: rückgabewert sollte 0 oder -1 sein, sonst Warnung werfen
-            # Akkorde und text in eine zeile zusammensetzen, wenn möglich
-            if self.blocktyp in {"verse*", "verse", "refrain"}:
-                # updateWD löscht den blocktyp
-                #   blocktyp zwischenspeichern, um ihn hinterher wieder zu setzen
-                blocktyp = self.blocktyp
-                # Akkorde passend shreiben. das ändert normalerweise einige Zeilen.
-                self.squashChords()
-                # durch das zusammensetzten der zeilen in squashchords rutschen die labels ggf in eine andere zeile.
-                # Deshalb die zeilenummer des labels neu berechnen.
-                lineNr = self.autotyp()
-                # Deshalb müssen die Arbeitsdaten neu erstellt werden.
-                self._updateWD()
-                self.text = self.str + []
-                self.blocktyp = blocktyp 
-            
-            # Labels aus dem text entfernen, falls vorhanden.
-            # Labels müssten jetzt in der ersten zeile stehen.
-            if self.blocktyp == "verse*":  # Kein Label -> nichts zu tun
-                pass
-            elif self.blocktyp == "verse":
-                cutlabel(self, lineNr, laTexttype.verseregex)
-            elif self.blocktyp == "refrain":
-                cutlabel(self, lineNr, laTexttype.refrainregex)
-            elif self.blocktyp == "info":
-                cutlabel(self, lineNr, laTexttype.inforegex)
+        # Wie bisher wird ohne gefundenes label (linenr -1) die letzte Zeile gekürzt.
+        text = self.text
+        match = regex.match(text[linenr])
+        if match is None:
+            return
+        akt = text[linenr][match.end():]
+        if linenr > 0:
+            # vorherige Zeile muss ebenfalls gekürz werden, sonst passen die beiden nicht mehr aufeiander
+            #Anzahl der leerzeichen, die in der darüberliegenden Zeile zu viel sind.
+            l = match.end()
+            prev = text[linenr - 1]
+            # falls möglich, die zeile vorher kürzen, sonst die aktuelle zeile einrücken
+            kuerzen = min(l, len(prev) - len(prev.lstrip(' ')))
+            text[linenr - 1] = prev[kuerzen:]
+            akt = ' ' * (l - kuerzen) + akt
+        # Wenn es die erste zeile ist, gibt es keine vorherige zeile.
+        text[linenr] = akt
+
+
+# Labels am Anfang einer Zeile, in der Reihenfolge, in der sie geprüft werden
+_label_regex = dict(refrain=re.compile(laTexttype.refrainregex),
+                    verse=re.compile(laTexttype.verseregex),
+                    info=re.compile(laTexttype.inforegex))
+# alle Labels in einem regex. Die erste passende Alternative gewinnt, wie bei einzelnen Versuchen in dieser Reihenfolge.
+_label_alle = re.compile("|".join("(?P<{}>{})".format(typ, regex.pattern) for typ, regex in _label_regex.items()))
 
 
+def _label(line:str)->Optional[str]:
+    """blocktyp, falls die Zeile mit einem Label beginnt, sonst None"""
+    match = _label_alle.match(line)
+    return None if match is None else match.lastgroup
+
 
 class SongConverter():
-    def __init__(self, template_path:pfad) -> None:
+    # Nach dem Laden des Templates ändert sich das Objekt nicht mehr. Ein SongConverter kann deshalb von mehreren
+    # Threads gleichzeitig verwendet werden. Hinweise zu einem Lied landen in der Liste diagnosen des Aufrufs
+    # (siehe umwandeln und lib/diagnose), nichts wird auf stdout oder stderr ausgegeben.
+    def __init__(self, template_path:pfad, messung=None, akkorde:Optional[Callable[[str], Optional[str]]]=None,
+                 zwischenspeicher:Optional[Zwischenspeicher]=None, nur_rendern:bool=False,
+                 template_cache:bool=False) -> None:
+        """messung: optional ein lib.messung.messung.Messung-Objekt, das die Zeit jeder Stufe misst
+        akkorde: optional eine Funktion, die jeden Akkord umschreibt, z.B. lib.akkorde.akkorde.Umschreiber.
+                 Wörter, für die sie None zurückgibt, bleiben unverändert (Hinweis in diagnosen).
+                 None: die Akkorde werden unverändert übernommen
+        zwischenspeicher: optional ein lib.zwischenformat.zwischenformat.Zwischenspeicher. convert liest dann
+                 Titel, Metadaten und Blöcke bekannter Lieder daraus und füllt nur noch das Template.
+                 Seine Version muss alles enthalten, was den Inhalt der Blöcke beeinflusst (auch akkorde).
+        nur_rendern: nur Lieder aus dem zwischenspeicher umwandeln, für alle anderen schlägt convert fehl
+        template_cache: das übersetzte Template im Cache-Verzeichnis (template_cache_dir) ablegen und von dort laden.
+                 Für das mitgelieferte Template lohnt sich das kaum, es ist in wenigen Millisekunden übersetzt.
+        template_path: relativ zum aktuellen Verzeichnis beim Erzeugen, danach spielt das Verzeichnis keine Rolle mehr"""
+        self.messung = messung if messung is not None else keine_messung
+        self.akkorde = akkorde
+        self.zwischenspeicher = zwischenspeicher
+        self.nur_rendern = nur_rendern
+        self.template_cache = template_cache
         self.template = self.get_template(template_path)
 
-    def get_template(self, template_path:pfad) -> None:
+    def get_template(self, template_path:pfad) -> "j2.Template":
+        # jinja2 erst hier importieren: Der Import dauert länger als der ganze Rest des Programms
+        # und wird bei Aufrufen, die nichts umwandeln, nicht gebraucht.
+        import jinja2 as j2
+        pfad = os.path.abspath(os.fspath(template_path))
         #  Jinja konfigurieren
         self.latex_jinja_env = j2.Environment(
             block_start_string=r'\BLOCK{',
@@ -248,34 +320,95 @@ class SongConverter():
             trim_blocks=True,
             lstrip_blocks=True,
             autoescape=False,
-            loader=j2.FileSystemLoader(os.path.abspath('.'))
+            # aus dem Verzeichnis des Templates laden, nicht aus dem aktuellen Verzeichnis:
+            # das kann sich später ändern, z.B. wenn der Konverter in einem Server eingebettet ist.
+            loader=j2.FileSystemLoader(os.path.dirname(pfad)),
+            bytecode_cache=SongConverter._bytecode_cache(j2) if self.template_cache else None
         )
         #  Template laden
-        return self.latex_jinja_env.get_template(template_path)
+        return self.latex_jinja_env.get_template(os.path.basename(pfad))
 
-    def convert(self, lied:str)->str:
+    @staticmethod
+    def _bytecode_cache(j2) -> "Optional[j2.BytecodeCache]":
+        # Jinja speichert das übersetzte Template dort. Der Schlüssel enthält den Pfad des Templates,
+        # jinja prüft beim Laden die Prüfsumme des Inhalts und die Python-Version, ein geändertes Template wird neu übersetzt.
+        verzeichnis = template_cache_dir()
+        if verzeichnis is None:
+            return None
+        try:
+            os.makedirs(verzeichnis, exist_ok=True)
+        except OSError:
+            return None
+        if not os.access(verzeichnis, os.W_OK):
+            return None  # ohne Cache ist es nur etwas langsamer
+        return j2.FileSystemBytecodeCache(verzeichnis)
+
+    def convert(self, lied:str, diagnosen:Optional[List[Diagnose]]=None)->str:
         """ Diese funktion erledigt die Konvertierungsarbeit für eine einzelne datei. 
-            lied: [str] Inhalt der Datei """
-        lied = lied.split('\n')  # in zeilen zerlegen
-        # Jeder zeile die beiden wahrscheinlichsten typen zuordnen
-        typen = Heuristik(lied)
-        # Klasse zum einfahcen verwalten der Daten 
-        texttyp = laTexttype(Heuristik(lied))
-
-        #XXX: Hier kann man auch eine Simple Grammatik implementieren
-        # Für jede Zeile den Wahrscheinlichsten typ wählen
-        for linenr in range(len(texttyp)):
-            zeilentypen = texttyp.choices(linenr)
-            if zeilentypen[0] is None:
-                if len(zeilentypen)>1:
-                    print("typ von zeile", linenr, "konnte nicht ermittelt werden. es wird \""+zeilentypen[1]+"\" angenommen")
-                    texttyp.choose(linenr, zeilentypen[1])
-                else:
-                    print("typ von zeile", linenr, "konnte nicht ermittelt werden. es wird \"Leer\" angenommen")
-                    texttyp.choose(linenr, "Leer")
-                continue
-            texttyp.choose(linenr, zeilentypen[0])
-        bloecke = texttyp.split('Leer')
+            lied: [str] Inhalt der Datei
+            diagnosen: optional eine Liste, an die Hinweise auf Probleme im Lied angehängt werden (siehe lib/diagnose).
+                       Für Lieder aus dem zwischenspeicher die Hinweise, die dort mit dem Lied gespeichert sind. """
+        if self.zwischenspeicher is None and not self.nur_rendern:
+            titel, metadaten, inhalt = self.parse(lied, diagnosen)
+            return self.fill_template(titel, metadaten, inhalt) #TODO: Reine Zeilenumbrüche dürfen nicht vorkommen.
+        return self.render(self.zwischenformat(lied, diagnosen))
+
+    def umwandeln(self, lied:str)->Tuple[str, List[Diagnose]]:
+        """wie convert, gibt zusätzlich die Hinweise zu diesem Lied zurück: (latex, [Diagnose, ...]).
+        Ohne Seiteneffekte, kann von mehreren Threads gleichzeitig aufgerufen werden."""
+        diagnosen: List[Diagnose] = []
+        return self.convert(lied, diagnosen), diagnosen
+
+    def zwischenformat(self, lied:str, diagnosen:Optional[List[Diagnose]]=None)->Dict:
+        """Titel, Metadaten und aufbereitete Blöcke des Liedes als dict, das sich als JSON speichern lässt
+        (siehe lib/zwischenformat). Kommt aus dem zwischenspeicher, wenn das Lied dort schon liegt.
+        diagnosen: wie bei convert"""
+        speicher = self.zwischenspeicher
+        if speicher is not None:
+            with self.messung.stufe("zwischenspeicher"):
+                eintrag = speicher.laden(lied)
+            if eintrag is not None:
+                zwischen, gespeichert = eintrag
+                if diagnosen is not None:
+                    diagnosen.extend(gespeichert)
+                return zwischen
+        if self.nur_rendern:
+            raise Exception("nicht im Zwischenspeicher, erst ohne --nur-rendern umwandeln")
+        # die Hinweise werden mit dem Lied gespeichert, auch wenn der Aufrufer keine will
+        hinweise = diagnosen if diagnosen is not None else []
+        anfang = len(hinweise)
+        zwischen = zwischenformat(*self.parse(lied, hinweise))
+        if speicher is not None:
+            with self.messung.stufe("zwischenspeicher"):
+                speicher.speichern(lied, zwischen, hinweise[anfang:])
+        return zwischen
+
+    def render(self, zwischen:Dict)->str:
+        """füllt das Template mit einem Lied im Zwischenformat (siehe zwischenformat)"""
+        return self.fill_template(zwischen["title"], zwischen["metadata"], zwischen_bloecke(zwischen))
+
+    def klassifizieren(self, lied:str, diagnosen:Optional[List[Diagnose]]=None)->List[Tuple[str, str, Optional[str]]]:
+        """bestimmt die Typen aller Zeilen, Ausgabe wie Heuristik(): [(zeile, typ, zweitwahrscheinlichster typ), ...]
+            lied: [str] Inhalt der Datei
+            diagnosen: wie bei convert, hier für Zeilen, deren Typ unklar ist """
+        # Die Typen aller Zeilen gemeinsam bestimmen: wahrscheinlichster Pfad durch die Grammatik des Liedes
+        with self.messung.stufe("grammatik"):
+            return Grammatik(lied.split('\n'), diagnosen=diagnosen)
+
+    def parse(self, lied:str, diagnosen:Optional[List[Diagnose]]=None)->Tuple[str, Dict[str, str], List[laTexttype]]:
+        """zerlegt das Lied in Titel, Metadaten und die für latex aufbereiteten Blöcke, ohne das Template zu füllen.
+            lied: [str] Inhalt der Datei
+            diagnosen: wie bei convert """
+        return self.parse_typen(self.klassifizieren(lied, diagnosen), diagnosen)
+
+    def parse_typen(self, typen:List[Tuple[str, str, Optional[str]]],
+                    diagnosen:Optional[List[Diagnose]]=None)->Tuple[str, Dict[str, str], List[laTexttype]]:
+        """wie parse, für schon bestimmte Typen der Zeilen (siehe klassifizieren)"""
+        messung = self.messung
+        with messung.stufe("split"):
+            # Klasse zum einfahcen verwalten der Daten. Die Grammatik hat für jede Zeile bereits einen typ gewählt.
+            texttyp = laTexttype(typen, gew_typ=[frame[1] for frame in typen])
+            bloecke = texttyp.split('Leer')
 
         # Jeder Block entspricht einem Liedblock, also Liedtext/Akkorde, Überschrift oder Info
 
@@ -288,25 +421,112 @@ class SongConverter():
             # Der erste block enthält die Überschrift und alle metadaten und wird deshalb gesondert behandelt.
             if i == 0:
                 #Erster Block: Hier sollte die Überschrift und die metadaten stehen.
-                if ('Überschrift' not in block.types()): # Wenn der erste block keine Überschrift ist, 
-                    # gibt das kein sinnvolles ergebnis. dann kann man auch gleich abbrechen
-                    print("Keine Überschrift gefunden", block, file=sys.stderr)
-                    raise Exception()
-                metadaten = SongConverter.meta_aus_titel(block)
+                with messung.stufe("metadaten"):
+                    # Die Blöcke sind Sichten auf das ganze Lied, _start ist die Nummer ihrer ersten Zeile
+                    metadaten = SongConverter._kopf(block, diagnosen, block._start)
                 titel = metadaten.pop("title")
                 continue
             
             # für latex konvertieren
-            block.makelatexdata()
+            with messung.stufe("makelatexdata", zeilen=len(block)):
+                block.makelatexdata(self.akkorde, diagnosen, block._start)
             inhalt.append(block)
 
-        return self.fill_template(titel, metadaten, inhalt) #TODO: Reine Zeilenumbrüche dürfen nicht vorkommen.
+        return titel, metadaten, inhalt
+
+    @staticmethod
+    def _kopf(block: texttype, diagnosen:Optional[List[Diagnose]]=None, erste_nr:int=0) -> Dict[str, str]:
+        # Metadaten aus dem ersten Block, "title" ist enthalten. erste_nr: Nummer der ersten Zeile des Blocks im Lied ab 0
+        if ('Überschrift' not in block.types()): # Wenn der erste block keine Überschrift ist, 
+            # gibt das kein sinnvolles ergebnis. dann kann man auch gleich abbrechen
+            raise Exception("Keine Überschrift gefunden in Zeile {}: {!r}".format(erste_nr + 1, block.str[0]))
+        return SongConverter.meta_aus_titel(block, diagnosen, erste_nr)
+
+    @staticmethod
+    def metadaten(lied:str, diagnosen:Optional[List[Diagnose]]=None)->Dict[str, str]:
+        """liest nur Titel und Metadaten des Liedes, ohne es umzuwandeln. Braucht kein Template.
+        Schlüssel wie bei meta_aus_titel: title, index (Alternativtitel), mel, txt, jahr, alb, bo, tf, ...
+        diagnosen: wie bei convert, nur für die Zeilen bis zur ersten leeren Zeile nach dem Kopf"""
+        # Nur den ersten Abschnitt klassifizieren, wie in _bloecke. Die Typen sind dieselben wie für das ganze Lied.
+        for erste_nr, abschnitt, _ in SongConverter._abschnitte(lied.split('\n')):
+            typen = Grammatik(abschnitt, erste_nr=erste_nr, nach_leerzeile=erste_nr > 0, diagnosen=diagnosen)
+            bloecke = laTexttype(typen, gew_typ=[frame[1] for frame in typen]).split('Leer')
+            if bloecke:
+                return SongConverter._kopf(bloecke[0], diagnosen, erste_nr + bloecke[0]._start)
+        raise Exception("Das Lied ist leer")
     
     @staticmethod
-    def meta_aus_titel(block: texttype)->dict:
+    def _abschnitte(zeilen: Iterable[str]) -> Iterator[Tuple[int, List[str], bool]]:
+        """Teilt die Zeilen an leeren Zeilen. Gibt (Nummer der ersten Zeile, Zeilen, endet mit leerer Zeile) zurück.
+        Die leere Zeile gehört zum Abschnitt davor. Eine Zeile, die mit einem Zeilenumbruch endet, wird
+        behandelt wie lied.split('\\n') in convert: Nach dem letzten Umbruch folgt noch eine leere Zeile."""
+        abschnitt = []
+        erste_nr = 0
+        nr = 0
+        letzte = None  # die vorherige Zeile, wie sie gelesen wurde
+        for letzte in zeilen:
+            zeile = letzte[:-1] if letzte.endswith('\n') else letzte
+            abschnitt.append(zeile)
+            nr += 1
+            if zeile.replace('\r', '') == '':
+                yield erste_nr, abschnitt, True
+                abschnitt = []
+                erste_nr = nr
+        if letzte is None or letzte.endswith('\n'):
+            # leere Eingabe oder Umbruch am Ende
+            abschnitt.append('')
+            yield erste_nr, abschnitt, True
+        elif abschnitt:
+            yield erste_nr, abschnitt, False
+
+    def _bloecke(self, zeilen: Iterable[str], diagnosen:Optional[List[Diagnose]]=None) -> Iterator[Tuple[int, laTexttype]]:
+        """liefert die Blöcke des Liedes einzeln, ohne das ganze Lied im Speicher zu halten.
+        Dieselben Blöcke wie texttyp.split('Leer') in convert, jeweils mit der Nummer ihrer ersten Zeile im Lied ab 0."""
+        messung = self.messung
+        for erste_nr, abschnitt, leer_am_ende in SongConverter._abschnitte(zeilen):
+            with messung.stufe("grammatik"):
+                typen = Grammatik(abschnitt, erste_nr=erste_nr, nach_leerzeile=erste_nr > 0, diagnosen=diagnosen)
+            with messung.stufe("split"):
+                texttyp = laTexttype(typen, gew_typ=[frame[1] for frame in typen])
+                # Endet der Abschnitt mit einer leeren Zeile, ist auch der letzte Block vollständig.
+                # Sonst ist es das Ende des Liedes und split behandelt den letzten Block wie in convert.
+                bloecke = texttyp.split('Leer')
+            for block in bloecke:
+                yield erste_nr + block._start, block
+
+    def convert_stream(self, lines_iterable: Iterable[str], out_file: TextIO,
+                       diagnosen:Optional[List[Diagnose]]=None) -> None:
+        """wie convert, aber die Eingabe wird zeilenweise gelesen und die Ausgabe direkt in out_file geschrieben.
+        Es werden immer nur die Zeilen zwischen zwei leeren Zeilen gleichzeitig im Speicher gehalten.
+        lines_iterable: die Zeilen des Liedes, mit oder ohne Zeilenumbruch am Ende, z.B. eine geöffnete Datei
+        out_file: Datei oder anderes Objekt mit einer write-Methode
+        diagnosen: wie bei convert"""
+        bloecke = self._bloecke(lines_iterable, diagnosen)
+        metadaten = dict()
+        titel = "HIER ist was schief gelaufen" #wenn dieser titel nicht ersetzt wird, ist etwas falsch...
+        for erste_nr, block in bloecke:
+            # Der erste block enthält die Überschrift und alle metadaten
+            with self.messung.stufe("metadaten"):
+                metadaten = SongConverter._kopf(block, diagnosen, erste_nr)
+            titel = metadaten.pop("title")
+            break
+
+        def inhalt():
+            # die restlichen Blöcke werden erst umgewandelt, wenn jinja sie ausgibt
+            for erste_nr, block in bloecke:
+                with self.messung.stufe("makelatexdata", zeilen=len(block)):
+                    block.makelatexdata(self.akkorde, diagnosen, erste_nr)
+                yield block
+
+        for teil in self.template.generate(title=titel, metadata=metadaten, content=inhalt()):
+            out_file.write(teil)
+
+    @staticmethod
+    def meta_aus_titel(block: texttype, diagnosen:Optional[List[Diagnose]]=None, erste_nr:int=0)->dict:
         # Aufbau des Titelblockes: TITEL [Alternativtitel1]
         # key: value
         # …
+        # diagnosen: wie bei convert. erste_nr: Nummer der Titelzeile im Lied ab 0, für die Hinweise
         # Text, wie in der Eingabedatei, zeiilenweise als liste, nur dieser Block
         text = str(block).split("\n")
         #Marker:
@@ -322,6 +542,8 @@ class SongConverter():
         # gelesen werden, das passiert aber auc nicht. es löst das Problem
         if lk <= 0:
             lk = len(titelz)
+        if titelz.count('[') != titelz.count(']'):
+            melden(diagnosen, KLAMMERN, erste_nr + 1, "[ und ] passen nicht zusammen, vermutlich ein Tippfehler im Titel")
         
         #metadaten dictionary
         meta = dict()
@@ -372,7 +594,7 @@ class SongConverter():
             holz = "hk",
             holzknopp = "hk"
         )
-        for line in metatext:
+        for nr, line in enumerate(metatext, erste_nr + 2):
             if ":" in line:
                 #davor ist der schlüssel, danach der wert
                 i = line.index(":") # in [0, len(ll)-1]
@@ -383,13 +605,13 @@ class SongConverter():
                     meta[key] = valstr
                 else:
                     #das sollte nicht passieren
-                    print('"ungültiger schlüssel', keystr)
+                    melden(diagnosen, UNBEKANNTER_SCHLUESSEL, nr, 'ungültiger Schlüssel "{}"'.format(keystr))
             else:
                 if line == "":
                     # die Zeile ist leer. Kein Problem, wird nicht verarbeitet
                     pass
                 else:
-                    print("Falsch Formatierte metazeile:", line)
+                    melden(diagnosen, METAZEILE, nr, "Falsch formatierte Metazeile: {}".format(line))
         return meta
 
     convert.__doc__ = """file_content: Ein string, der ein ganzes lied enthält. 
@@ -397,13 +619,21 @@ class SongConverter():
         Die funktion convertiert das lied in latex. die ausgabe ist ein latex-dokument 
         das das lied darstellt."""
     
-    def fill_template(self, title:str, metadaten: Dict[str, str], inhalt: List[laTexttype]) -> str:
+    def fill_template(self, title:str, metadaten: Dict[str, str], inhalt: List[Union[laTexttype, Block]]) -> str:
         """füllt das jinja2-template mit den metadaten uund dem Inhalt
-        erlaubte Schlüssel für metadaten: index, wuw, mel, txt, meljahr, txtjahr, alb, lager, ..."""
-        return self.template.render(title=title, metadata=metadaten, content=inhalt)
+        erlaubte Schlüssel für metadaten: index, wuw, mel, txt, meljahr, txtjahr, alb, lager, ...
+        inhalt: aufbereitete Blöcke oder Blöcke aus dem Zwischenformat. Das Template darf nur blocktyp und text verwenden."""
+        with self.messung.stufe("render"):
+            return self.template.render(title=title, metadata=metadaten, content=inhalt)
 
     __doc__ = "Erlaubt das konvertieren von Liedern in textform in Latex_dokumente"
 
 
-
-
+if __name__ == "__main__":
+    # Einzelnes Lied von der Standardeingabe lesen und als latex auf die Standardausgabe schreiben:
+    # python3 song_converter.py < Lied.txt > Lied.tex
+    # Hinweise zum Lied erscheinen auf stderr.
+    diagnosen = []
+    SongConverter(template_path="Template.jinja").convert_stream(sys.stdin, sys.stdout, diagnosen)
+    for diagnose in diagnosen:
+        print(diagnose, file=sys.stderr)
@@ -0,0 +1,50 @@
+# test_akkorde.py
+# Umschreiben und Transponieren von Akkorden, auch wenn ein Wort der Akkordzeile mehrere Akkorde enthält
+# (|:G, (G D), C/E/G), wie es die Heuristik als Akkordzeile erkennt.
+import io
+import os
+
+import pytest
+
+from lib.akkorde.akkorde import Umschreiber
+from lib.diagnose.diagnose import AKKORD
+from lib.Heuristik.Heuristik import ist_akkordzeile
+from song_converter import SongConverter
+
+_template = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Template.jinja")
+
+
+@pytest.mark.parametrize("wort, erwartet", [
+    ("G", "A"),
+    ("a7", "Hm7"),
+    ("(G7)", "(A7)"),
+    ("C/E", "D/F#"),
+    ("(G", "(A"),
+    ("D)", "E)"),
+    ("C/E/G", "D/F#/A"),
+    ("|:G", "|:A"),
+    ("D:|", "E:|"),
+    ("|:", "|:"),
+    ("GD", "AE"),
+])
+def test_jeder_akkord_im_wort(wort, erwartet):
+    assert ist_akkordzeile(wort)
+    assert Umschreiber("deutsch", 2)(wort) == erwartet
+
+
+@pytest.mark.parametrize("wort", ["x2", "Hallo", "G7x"])
+def test_unlesbar(wort):
+    assert Umschreiber("deutsch", 2)(wort) is None
+
+
+def test_hinweis_fuer_unlesbare_woerter(monkeypatch):
+    monkeypatch.setenv("SONGBOOK_CACHE", "")  # nichts nach ~/.cache schreiben
+    converter = SongConverter(template_path=_template, akkorde=Umschreiber("deutsch", 2))
+    lied = "Titel\n\nG    (G   D)  C/E/G D:| x2\nAlle meine Entchen schwimmen auf dem See\n"
+    latex, diagnosen = converter.umwandeln(lied)
+    assert r"\[A]Alle \[(A]meine\[E)] Ent\[D/F#/A]chen s\[E:|]chwi\[x2]mmen" in latex
+    assert [(d.art, d.zeile) for d in diagnosen if d.art == AKKORD] == [(AKKORD, 3)]
+    # zeilenweise dieselben Hinweise
+    stream_diagnosen = []
+    converter.convert_stream(io.StringIO(lied), io.StringIO(), stream_diagnosen)
+    assert stream_diagnosen == diagnosen
@@ -0,0 +1,74 @@
+# test_heuristik.py
+# Goldener Test für die Zeilenklassifikation: Heuristik() muss für Beispiele/Skelett.txt genau die Typen liefern,
+# die die ursprüngliche Heuristik (vor den Zeilenmerkmalen, lib.Heuristik.Zeilenmerkmale) geliefert hat.
+# Erzeugt mit dem Stand vor der ersten Änderung an der Heuristik. Ändert sich die Klassifikation absichtlich,
+# muss diese Liste mit einer Begründung angepasst werden.
+import os
+
+from lib.Heuristik.Heuristik import Heuristik
+
+_skelett = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Beispiele", "Skelett.txt")
+
+# (gewählter Typ, zweiter Typ) je Zeile
+erwartet = [
+    ('Überschrift', 'Leer'),  # Titel des Liedes [<erste zeile>]
+    ('Überschrift', 'Textzeile'),  # wuw: Worte und Weise falls es die gleiche Person ist
+    ('Überschrift', 'Leer'),  # jahr: jahr für worte und weise, alternativ j:
+    ('Überschrift', 'Leer'),  # mel: Autor der Melodie
+    ('Überschrift', 'Leer'),  # melj: jahr der Melodie. Alternativ meljahr
+    ('Überschrift', 'Leer'),  # txt: Autor des Textes
+    ('Überschrift', 'Leer'),  # txtj: Jahr des Textes
+    ('Überschrift', 'Leer'),  # alb: Album (für Kommerzkacke)
+    ('Überschrift', 'Leer'),  # lager: Lager auf dem Das Lied geschrieben wurde
+    ('Überschrift', 'Leer'),  # bo: Seite im Bock
+    ('Überschrift', 'Leer'),  # vq: vasquaner (1)
+    ('Überschrift', 'Leer'),  # biest:
+    ('Überschrift', 'Leer'),  # tf: Turmfalke
+    ('Überschrift', 'Leer'),  # gb: Gnorkenbüdel
+    ('Überschrift', 'Leer'),  # HVP: Heinrich von Plauen
+    ('Überschrift', 'Leer'),  # tb: Tarmina Burgundi
+    ('Leer', 'Überschrift'),
+    ('Leer', 'Überschrift'),
+    ('Akkordzeile', 'Leer'),  #     a      e     F           C
+    ('Textzeile', 'Leer'),  # 1) Das hier ist die erste Strophe,
+    ('Akkordzeile', 'Textzeile'),  #    Esus4     H       G7
+    ('Textzeile', 'Leer'),  # Man schreibt die Akkorde einfach
+    ('Akkordzeile', 'Textzeile'),  #  E     d      H
+    ('Textzeile', 'Leer'),  # über den Text.
+    ('Leer', 'Überschrift'),
+    ('Akkordzeile', 'Textzeile'),  # G    F     E    D    C
+    ('Textzeile', 'Leer'),  # Das hier ist auch eine Strophe,
+    ('Akkordzeile', 'Textzeile'),  #  G         H    c   
+    ('Textzeile', 'Leer'),  # alerdings ohne Nummer
+    ('Leer', 'Überschrift'),
+    ('Akkordzeile', 'Textzeile'),  #        Esus2
+    ('Textzeile', 'Leer'),  # Ref. Das ist der Refrain. Der funktioniert wie alle Strop...
+    ('Leer', 'Überschrift'),
+    ('Leer', 'Überschrift'),
+    ('Textzeile', 'Leer'),  # 2) Die Nummerierten strophen werden weitergezählt.
+    ('Textzeile', 'Leer'),  # Das hier ist also die zweite Strophe. Hier stehen
+    ('Textzeile', 'Leer'),  # keine Akkorde.
+    ('Akkordzeile', 'Textzeile'),  #  C      D    E
+    ('Textzeile', 'Leer'),  # Nur in der letzten zeile stehen Akkorde
+    ('Leer', 'Überschrift'),
+    ('Akkordzeile', 'Leer'),  #     C#         E5                   C    D Dsus2 D e 
+    ('Textzeile', 'Leer'),  # 3) Die Dritte Strophe hat wieder Akkorde
+    ('Akkordzeile', 'Leer'),  #    C                                         a
+    ('Textzeile', 'Leer'),  # warum auch immer. vielleicht ist die Melodie anders.
+    ('Leer', 'Überschrift'),
+    ('Textzeile', 'Leer'),  # dieser Vers hat keine Akkorde. Beachte, dass durch den le...
+    ('Akkordzeile', 'Leer'),  #   D          E                      f#   
+    ('Textzeile', 'Leer'),  # neue Strophe entsteht. Hier gibt es akkorde.
+    ('Textzeile', 'Leer'),  # so schreibt man einen vers ohne Akkorde. 
+    ('Leer', 'Überschrift'),
+    ('Leer', 'Überschrift'),
+    ('Leer', 'Überschrift'),
+]
+
+
+def test_skelett_typen():
+    with open(_skelett, encoding='utf-8') as file:
+        zeilen = file.read().split('\n')
+    erg = Heuristik(zeilen)
+    assert [zeile for zeile, _, _ in erg] == zeilen
+    assert [(typ, zweiter) for _, typ, zweiter in erg] == erwartet
@@ -0,0 +1,73 @@
+# test_server.py
+# server.py als Unterprozess, angesprochen mit lib.server.client.Client über stdin/stdout und über einen Unix-Socket:
+# mehrere Anfragen gleichzeitig, statistik und ein sauberes Ende mit "ende".
+import os
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+
+from benchmark import korpus
+from lib.server.client import Client
+
+_haupt = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_server = [sys.executable, os.path.join(_haupt, "server.py")]
+
+
+@pytest.fixture(autouse=True)
+def umgebung(monkeypatch):
+    monkeypatch.setenv("SONGBOOK_CACHE", "")  # nichts nach ~/.cache schreiben
+    monkeypatch.chdir(_haupt)  # server.py findet das Template im aktuellen Verzeichnis
+
+
+def anfragen_pruefen(client):
+    rnd = random.Random(3)
+    lieder = [korpus.lied(rnd, nr) for nr in range(5)]
+    anfragen = [dict(id="lied-{}".format(nr), text=lied) for nr, lied in enumerate(lieder)]
+    anfragen.append(dict(id="kaputt", text="\n\nkein titel\n"))
+    antworten = client.senden(anfragen)
+
+    assert [antwort["id"] for antwort in antworten] == [anfrage["id"] for anfrage in anfragen]
+    for lied, antwort in zip(lieder, antworten):
+        assert "fehler" not in antwort
+        assert antwort["latex"].startswith(r"\beginsong")
+        assert [zeile["text"] for zeile in antwort["zeilen"]] == lied.split('\n')
+    assert "fehler" in antworten[-1] and "latex" not in antworten[-1]
+
+    statistik = client.statistik()
+    assert statistik["anfragen"] == len(anfragen)
+    assert statistik["fehler"] == 1
+
+
+@pytest.mark.parametrize("argumente", [[], ["--threads", "-j", "2"]])
+def test_stdio(argumente):
+    client = Client(argumente=_server + argumente)
+    prozess = client._prozess
+    try:
+        anfragen_pruefen(client)
+        # stdin bleibt offen, der Server muss trotzdem enden
+        assert client.senden([dict(befehl="ende")])[0]["ende"]
+        assert prozess.wait(timeout=10) == 0
+    finally:
+        client.close()
+
+
+def test_socket(tmp_path):
+    pfad = str(tmp_path / "server.sock")
+    prozess = subprocess.Popen(_server + ["--socket", pfad], stdin=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        frist = time.monotonic() + 30
+        while not os.path.exists(pfad):
+            assert prozess.poll() is None and time.monotonic() < frist
+            time.sleep(0.05)
+        with Client(socket_pfad=pfad) as client:
+            anfragen_pruefen(client)
+            client.ende()
+        assert prozess.wait(timeout=10) == 0
+        assert not os.path.exists(pfad)
+    finally:
+        if prozess.poll() is None:
+            prozess.kill()
+            prozess.wait()
@@ -0,0 +1,63 @@
+# test_threads.py
+# Mehrere Threads teilen sich einen SongConverter (wie server.py --threads). Die Ergebnisse müssen genau dieselben
+# sein wie nacheinander, und es darf nichts ausgegeben werden.
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmark import korpus
+from benchmark.bench_threads import fehlerhaft
+from lib.Heuristik.Heuristik import _p085
+from song_converter import SongConverter
+
+_template = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Template.jinja")
+
+
+@pytest.fixture
+def converter(monkeypatch):
+    monkeypatch.setenv("SONGBOOK_CACHE", "")  # nichts nach ~/.cache schreiben
+    return SongConverter(template_path=_template)
+
+
+def lieder(anzahl=60, seed=1):
+    rnd = random.Random(seed)
+    erg = []
+    for nr in range(anzahl):
+        lied = korpus.lied(rnd, nr)
+        if nr % 5 == 0:
+            lied = fehlerhaft(lied, rnd)  # mit Hinweisen
+        if nr % 7 == 0:
+            # Zeile mit vielen fremden Zeichen, für _p085 über das Ende der Tabelle hinaus
+            lied += "\n\n" + "#" * (600 + nr) + "\n"
+        erg.append(lied)
+    return erg
+
+
+def test_p085_wie_wiederholtes_multiplizieren():
+    erwartet = 1
+    for n in range(1000):
+        assert _p085(n) == erwartet
+        erwartet *= 0.85
+
+
+def test_p085_gleichzeitig():
+    werte = list(range(1000)) * 8
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        gleichzeitig = list(pool.map(_p085, werte))
+    assert gleichzeitig == [_p085(n) for n in werte]
+
+
+def test_threads_wie_nacheinander(converter, capsys):
+    texte = lieder()
+    jobs = list(range(len(texte))) * 3
+    # zuerst gleichzeitig, damit alle Tabellen und Caches unter Last entstehen
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        gleichzeitig = list(pool.map(lambda i: converter.umwandeln(texte[i]), jobs))
+    nacheinander = [converter.umwandeln(text) for text in texte]
+    assert any(diagnosen for _, diagnosen in nacheinander)
+    for i, ergebnis in zip(jobs, gleichzeitig):
+        assert ergebnis == nacheinander[i], "Lied {} mit Threads anders als nacheinander".format(i)
+    ausgabe = capsys.readouterr()
+    assert ausgabe.out == "" and ausgabe.err == ""
@@ -0,0 +1,27 @@
+# test_zwischenformat.py
+# Ein Lied aus dem Zwischenspeicher muss dieselbe Ausgabe und dieselben Hinweise haben wie neu gelesen.
+import os
+import random
+
+from benchmark import korpus
+from benchmark.bench_threads import fehlerhaft
+from lib.zwischenformat.zwischenformat import Zwischenspeicher
+from song_converter import SongConverter, VERSION
+
+_template = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Template.jinja")
+
+
+def test_hinweise_aus_dem_zwischenspeicher(tmp_path, monkeypatch):
+    monkeypatch.setenv("SONGBOOK_CACHE", "")  # nichts nach ~/.cache schreiben
+    rnd = random.Random(2)
+    lied = fehlerhaft(korpus.lied(rnd, 0), rnd)
+    latex, diagnosen = SongConverter(template_path=_template).umwandeln(lied)
+    assert diagnosen
+
+    speicher = Zwischenspeicher(str(tmp_path), VERSION)
+    converter = SongConverter(template_path=_template, zwischenspeicher=speicher)
+    assert converter.umwandeln(lied) == (latex, diagnosen)  # neu gelesen und gespeichert
+    assert speicher.laden(lied) is not None
+    assert converter.umwandeln(lied) == (latex, diagnosen)  # aus dem Speicher
+    nur_rendern = SongConverter(template_path=_template, zwischenspeicher=speicher, nur_rendern=True)
+    assert nur_rendern.umwandeln(lied) == (latex, diagnosen)